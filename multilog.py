@@ -23,6 +23,16 @@ if __name__ == "__main__":
         help="directory where to put the output [optional, default='.']",
         default=".",
     )
+    parser.add_argument(
+        "--headless",
+        help="run without GUI, start recording immediately and publish the data for viewers [optional]",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--attach",
+        metavar="DIRECTORY",
+        help="open a viewer for the run in DIRECTORY (output directory of a run with --headless or live-store) instead of recording [optional]",
+    )
     parser.add_argument(
         "-v",
         "--version",
@@ -30,4 +40,9 @@ if __name__ == "__main__":
         version=f"{parser.prog} version {__version__}",
     )
     args = parser.parse_args()
-    main(args.config, args.out_dir)
+    if args.attach:
+        from multilog.viewer import main as viewer_main
+
+        viewer_main(args.attach)
+    else:
+        main(args.config, args.out_dir, args.headless)
@@ -0,0 +1,179 @@
+"""Compression of time series in fixed-size blocks.
+
+Floating point values are XOR-encoded with their predecessor and integer
+timestamps are encoded as delta of delta, both in the style of Facebook's
+Gorilla time series database. For slowly changing signals (set points,
+thermocouples, constant process conditions) and regular sampling, most
+of the resulting 64 bit words are zero or have only a few non-zero
+bytes.
+
+Instead of Gorilla's bit stream, the words are stored byte-aligned: one
+header byte per value holds the position and number of the non-zero
+bytes, followed by these bytes in the payload. This compresses slightly
+worse but allows encoding and decoding a whole block with vectorized
+numpy operations. Blocks with constant values are stored with a single
+header byte."""
+import numpy as np
+
+
+def _pack(words):
+    """Store the non-zero bytes of 64 bit words.
+
+    Args:
+        words (numpy.array): uint64 words.
+
+    Returns:
+        tuple(numpy.array, numpy.array): header, payload (uint8)
+    """
+    matrix = np.ascontiguousarray(words, dtype="<u8").view(np.uint8).reshape(-1, 8)
+    nonzero = matrix != 0
+    used = nonzero.any(axis=1)
+    low = np.where(used, np.argmax(nonzero, axis=1), 0)
+    high = 7 - np.argmax(nonzero[:, ::-1], axis=1)
+    count = np.where(used, high - low + 1, 0)
+    position = np.arange(8)
+    selected = (position >= low[:, None]) & (position < (low + count)[:, None])
+    header = (low << 4 | count).astype(np.uint8)
+    if len(header) > 1 and not header[1:].any():  # constant block
+        header = header[:1].copy()
+    return header, matrix[selected]
+
+
+def _unpack(header, payload, length):
+    """Restore the 64 bit words stored with _pack.
+
+    Args:
+        header (numpy.array): header bytes.
+        payload (numpy.array): payload bytes.
+        length (int): number of words.
+
+    Returns:
+        numpy.array: uint64 words.
+    """
+    if len(header) < length:
+        header = np.concatenate((header, np.zeros(length - len(header), np.uint8)))
+    low = (header >> 4).astype(np.int64)
+    count = (header & 15).astype(np.int64)
+    matrix = np.zeros((length, 8), dtype=np.uint8)
+    starts = np.cumsum(count) - count
+    rows = np.repeat(np.arange(length), count)
+    columns = np.arange(len(payload)) - np.repeat(starts - low, count)
+    matrix[rows, columns] = payload
+    return matrix.view("<u8").ravel()
+
+
+def encode(values):
+    """Encode a block of values. float64 values are XOR-encoded, int64
+    values (e.g. timestamps in ns) delta-of-delta encoded.
+
+    Args:
+        values (numpy.array): float64 or int64 values.
+
+    Returns:
+        tuple(numpy.array, numpy.array): header, payload (uint8)
+    """
+    values = np.ascontiguousarray(values)
+    if values.dtype == np.float64:
+        bits = values.view(np.uint64)
+        words = bits.copy()
+        words[1:] ^= bits[:-1]
+    elif values.dtype == np.int64:
+        delta_of_delta = np.diff(np.diff(values, prepend=0), prepend=0)
+        words = ((delta_of_delta << 1) ^ (delta_of_delta >> 63)).view(np.uint64)
+    else:
+        raise ValueError(f"Cannot encode values of type {values.dtype}.")
+    return _pack(words)
+
+
+def decode(header, payload, length, dtype=np.float64):
+    """Decode a block encoded with encode.
+
+    Args:
+        header (numpy.array): header bytes.
+        payload (numpy.array): payload bytes.
+        length (int): number of values.
+        dtype (numpy.dtype, optional): data type of the values. Defaults
+            to numpy.float64.
+
+    Returns:
+        numpy.array: values.
+    """
+    words = _unpack(header, payload, length)
+    if np.dtype(dtype) == np.float64:
+        return np.bitwise_xor.accumulate(words).view(np.float64)
+    delta_of_delta = (words >> 1).view(np.int64) ^ -(words & 1).view(np.int64)
+    return np.cumsum(np.cumsum(delta_of_delta))
+
+
+class CompressedBlock:
+    """Read-only block of values stored with encode. Supports len(),
+    np.asarray() and indexing (which decodes the block)."""
+
+    def __init__(self, values):
+        """Compress the values.
+
+        Args:
+            values (numpy.array): float64 or int64 values.
+        """
+        values = np.asarray(values)
+        self.dtype = values.dtype
+        self.length = len(values)
+        self.first = values[0]
+        self.last = values[-1]
+        self.header, self.payload = encode(values)
+        self.mapped = False  # stored in a memory-mapped file
+
+    def __len__(self):
+        return self.length
+
+    def __array__(self, dtype=None, copy=None):
+        values = self.decode()
+        if dtype is not None and values.dtype != dtype:
+            return values.astype(dtype)
+        return values
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            if index in (0, -self.length):
+                return self.first
+            if index in (-1, self.length - 1):
+                return self.last
+        return self.decode()[index]
+
+    @property
+    def nbytes(self):
+        """Size of the compressed data in bytes."""
+        return self.header.nbytes + self.payload.nbytes
+
+    def decode(self):
+        """Get the values.
+
+        Returns:
+            numpy.array: values (read-only).
+        """
+        values = decode(self.header, self.payload, self.length, self.dtype)
+        values.flags.writeable = False
+        return values
+
+    def tobytes(self):
+        """Get the compressed data for writing it to a file."""
+        return self.header.tobytes() + self.payload.tobytes()
+
+    def remap(self, buffer, position):
+        """Get a copy of the block that references the compressed data
+        in a buffer (e.g. a numpy.memmap) instead of RAM.
+
+        Args:
+            buffer (numpy.array): uint8 buffer containing tobytes().
+            position (int): position of the block in the buffer.
+
+        Returns:
+            CompressedBlock: block referencing the buffer.
+        """
+        block = object.__new__(CompressedBlock)
+        block.__dict__.update(self.__dict__)
+        end = position + len(self.header)
+        block.header = buffer[position:end]
+        block.payload = buffer[end : end + len(self.payload)]
+        block.mapped = True
+        return block
@@ -0,0 +1,339 @@
+"""Live dashboard in the browser, served from the acquisition process.
+
+A small HTTP server (python standard library only, no internet access
+required) runs in a background thread and serves a single page that
+shows the measurement histories of all devices and thumbnails of the
+latest camera images. The page receives the data as Server-Sent Events.
+
+The data is decimated on the server with the min/max pyramid of the
+histories (Series.decimate) and each payload is computed at most once
+per update interval for all clients viewing the same time window.
+Additional viewers therefore only cost sending the cached bytes. Each
+client is rate limited."""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import parse_qs, unquote, urlparse
+
+import numpy as np
+
+from .history import device_histories
+
+logger = logging.getLogger(__name__)
+
+WINDOWS = (60, 600, 1800, 3600, 0)  # s, selectable time windows, 0: all
+
+
+def _to_list(values):
+    """Convert values to a list for JSON, with None instead of NaN."""
+    values = np.asarray(values, dtype=np.float64)
+    result = values.tolist()
+    for i in np.flatnonzero(~np.isfinite(values)):
+        result[i] = None
+    return result
+
+
+class RateLimiter:
+    """Minimum interval between requests of the same client and limit
+    of the number of simultaneous streams per client."""
+
+    def __init__(self, interval, max_streams=4):
+        """Create rate limiter.
+
+        Args:
+            interval (float): minimum interval between requests in s.
+            max_streams (int, optional): maximum number of open streams
+                per client. Defaults to 4.
+        """
+        self.interval = interval
+        self.max_streams = max_streams
+        self.last_request = {}  # (client, path) : time
+        self.streams = {}  # client : number of open streams
+        self.lock = threading.Lock()
+
+    def allow(self, client, path):
+        """Check if a request is allowed (and register it).
+
+        Args:
+            client (str): client address.
+            path (str): requested resource.
+
+        Returns:
+            bool: True if the request is allowed.
+        """
+        now = time.monotonic()
+        with self.lock:
+            if now - self.last_request.get((client, path), -np.inf) < self.interval:
+                return False
+            self.last_request[(client, path)] = now
+            return True
+
+    def open_stream(self, client):
+        """Register a new stream of a client.
+
+        Returns:
+            bool: True if the stream is allowed.
+        """
+        with self.lock:
+            if self.streams.get(client, 0) >= self.max_streams:
+                return False
+            self.streams[client] = self.streams.get(client, 0) + 1
+            return True
+
+    def close_stream(self, client):
+        with self.lock:
+            self.streams[client] -= 1
+
+
+class Dashboard:
+    """HTTP server providing the live dashboard."""
+
+    def __init__(
+        self, devices, host="0.0.0.0", port=8080, max_points=1000, dt=1000
+    ):
+        """Setup dashboard, call start() to run the server.
+
+        Args:
+            devices (dict): {device name: device}, the measurement data
+                is taken from the meas_data attribute of the devices.
+            host (str, optional): address to listen on. Defaults to
+                "0.0.0.0" (all interfaces).
+            port (int, optional): port. Defaults to 8080.
+            max_points (int, optional): maximum number of points per
+                series. Defaults to 1000.
+            dt (int, optional): update interval in ms. Defaults to 1000.
+        """
+        self.devices = devices
+        self.host = host
+        self.port = port
+        self.max_points = max_points
+        self.interval = dt / 1000
+        self.rate_limiter = RateLimiter(self.interval / 2)
+        self.cache = {}  # key : (time, bytes)
+        self.cache_lock = threading.Lock()
+        self.info = {}  # general information shown on the page
+        self.running = False
+        self.server = None
+        with open(
+            os.path.join(os.path.dirname(__file__), "dashboard.html"), "rb"
+        ) as f:
+            self.page = f.read()
+
+    def start(self):
+        """Start the server in a background thread."""
+        dashboard = self
+
+        class Handler(DashboardRequestHandler):
+            pass
+
+        Handler.dashboard = dashboard
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.running = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        logger.info(f"Dashboard running on http://{self.host}:{self.port}")
+
+    def stop(self):
+        """Stop the server."""
+        self.running = False
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def set_info(self, **info):
+        """Set general information shown on the page (e.g. start time).
+        Values must be JSON serializable."""
+        self.info.update(info)
+
+    def cached(self, key, function):
+        """Get a result from the cache or compute it if it is older than
+        the update interval. Concurrent requests for the same key wait
+        for a single computation.
+
+        Args:
+            key (hashable): cache key.
+            function (callable): function computing the result (bytes).
+
+        Returns:
+            bytes: result.
+        """
+        with self.cache_lock:
+            entry = self.cache.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.interval:
+                return entry[1]
+            result = function()
+            self.cache[key] = (time.monotonic(), result)
+            return result
+
+    def cameras(self):
+        """Get the names of the devices with an image as data."""
+        return [
+            device_name
+            for device_name, device in self.devices.items()
+            if isinstance(getattr(device, "meas_data", None), np.ndarray)
+            and device.meas_data.ndim >= 2
+        ]
+
+    def series_payload(self, window):
+        """Compute the data of all histories decimated to max_points.
+
+        Args:
+            window (float): time window in s, 0 for the complete history.
+
+        Returns:
+            bytes: JSON data.
+        """
+        groups = {}
+        end = 0
+        for name, history in device_histories(self.devices):
+            length = history.length
+            if length == 0:
+                continue
+            time_rel = history.time
+            end = max(end, time_rel[length - 1])
+            start = 0
+            if window > 0:
+                start = time_rel.searchsorted(time_rel[length - 1] - window)
+            group = {}
+            for channel in history:
+                indices, values = history[channel].decimate(
+                    start, length, self.max_points
+                )
+                group[channel] = {
+                    "x": _to_list(time_rel.take(indices)),
+                    "y": _to_list(values),
+                }
+            groups[name] = group
+        payload = {
+            "time": end,
+            "window": window,
+            "info": self.info,
+            "series": groups,
+            "cameras": self.cameras(),
+        }
+        return json.dumps(payload).encode()
+
+    def thumbnail(self, device_name, size=320):
+        """Compute a png thumbnail of the latest image of a camera.
+
+        Args:
+            device_name (str): name of the camera.
+            size (int, optional): maximum width / height. Defaults to
+                320.
+
+        Returns:
+            bytes: png image.
+        """
+        import matplotlib.image
+
+        device = self.devices[device_name]
+        image = device.meas_data
+        step = max(int(np.ceil(max(image.shape[:2]) / size)), 1)
+        image = image[::step, ::step]
+        buffer = io.BytesIO()
+        if image.ndim == 2:
+            if hasattr(device, "to_temperature"):  # raw IR image
+                image = device.to_temperature(image)
+            matplotlib.image.imsave(buffer, image, cmap="turbo", format="png")
+        else:
+            matplotlib.image.imsave(buffer, image, format="png")
+        return buffer.getvalue()
+
+
+class DashboardRequestHandler(BaseHTTPRequestHandler):
+    """Request handler of the dashboard, dashboard is set by
+    Dashboard.start."""
+
+    dashboard = None
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+    def send(self, content, content_type, status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(content)
+
+    def too_many_requests(self):
+        self.send_response(429)
+        self.send_header("Retry-After", str(max(int(self.dashboard.interval), 1)))
+        self.end_headers()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        client = self.client_address[0]
+        try:
+            if url.path in ("/", "/index.html"):
+                self.send(self.dashboard.page, "text/html; charset=utf-8")
+            elif url.path == "/api/series":
+                if not self.dashboard.rate_limiter.allow(client, url.path):
+                    return self.too_many_requests()
+                window = self.window(query)
+                data = self.dashboard.cached(
+                    ("series", window),
+                    lambda: self.dashboard.series_payload(window),
+                )
+                self.send(data, "application/json")
+            elif url.path == "/api/stream":
+                self.stream(client, self.window(query))
+            elif url.path.startswith("/api/camera/"):
+                device_name = unquote(url.path[len("/api/camera/") :])
+                if device_name not in self.dashboard.cameras():
+                    return self.send_error(404)
+                if not self.dashboard.rate_limiter.allow(client, url.path):
+                    return self.too_many_requests()
+                data = self.dashboard.cached(
+                    ("camera", device_name),
+                    lambda: self.dashboard.thumbnail(device_name),
+                )
+                self.send(data, "image/png")
+            else:
+                self.send_error(404)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client disconnected
+        except Exception:
+            logger.exception(f"Error in dashboard request {self.path}")
+            self.send_error(500)
+
+    @staticmethod
+    def window(query):
+        """Get the selectable time window closest to the requested one."""
+        try:
+            window = float(query.get("window", ["600"])[0])
+        except ValueError:
+            window = 600
+        return min(WINDOWS, key=lambda w: abs(w - window))
+
+    def stream(self, client, window):
+        """Send the data as Server-Sent Events, once per update interval.
+
+        Args:
+            client (str): client address.
+            window (float): time window in s.
+        """
+        if not self.dashboard.rate_limiter.open_stream(client):
+            return self.too_many_requests()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            while self.dashboard.running:
+                data = self.dashboard.cached(
+                    ("series", window),
+                    lambda: self.dashboard.series_payload(window),
+                )
+                self.wfile.write(b"data: " + data + b"\n\n")
+                self.wfile.flush()
+                time.sleep(self.dashboard.interval)
+        finally:
+            self.dashboard.rate_limiter.close_stream(client)
@@ -1,10 +1,15 @@
 from copy import deepcopy
 import datetime
 import logging
+import os
 import numpy as np
 from serial import Serial, SerialException
+import time
 import yaml
 
+from ..history import History
+from .. import thermocouple
+
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +23,9 @@ class SerialMock:
     def readline(self):
         return "".encode()
 
+    def read(self, size=1):
+        return "".encode()
+
 
 class Daq6510:
     """Keythley multimeter DAQ6510. Implementation bases on v1 of
@@ -41,7 +49,6 @@ class Daq6510:
             self.serial = SerialMock()
         self.reset()
         # bring the data from config into multilog v1 compatible structure
-        self.nb_reading_values = len(config["channels"])
         self.reading_str = "(@"
 
         self.ch_list_tc = []
@@ -49,6 +56,7 @@ class Daq6510:
         self.ch_list_pt1000 = []
         self.ch_list_dcv = []
         self.ch_list_acv = []
+        self.ch_list_dig = []  # digitize channels, not part of the scan
 
         self.ch_str_tc = "(@"
         self.ch_str_tc_k = "(@"
@@ -66,10 +74,12 @@ class Daq6510:
         self.nb_acv = 0
 
         self.latestSample = np.nan
+        self.tc_types = {}  # channel : thermocouple type
 
         for channel in config["channels"]:
-            self.reading_str += f"{channel},"
             sensor_type = config["channels"][channel]["type"].lower()
+            if sensor_type != "digitize":
+                self.reading_str += f"{channel},"
             if sensor_type == "temperature":
                 subtype = config["channels"][channel]["sensor-id"].split("_")[0].lower()
                 if subtype == "te":  # thermo couple
@@ -78,6 +88,7 @@ class Daq6510:
                     tc_type = (
                         config["channels"][channel]["sensor-id"].split("_")[-1].lower()
                     )
+                    self.tc_types.update({channel: tc_type.upper()})
                     if tc_type == "k":
                         self.nb_tc_k += 1
                         self.ch_str_tc_k += f"{channel},"
@@ -100,10 +111,16 @@ class Daq6510:
                 self.ch_list_acv.append(channel)
                 self.nb_acv += 1
                 self.ch_str_acv += f"{channel},"
+            elif sensor_type == "digitize":
+                self.ch_list_dig.append(channel)
             else:
                 raise ValueError(
                     f"Unknown sensor type {sensor_type} at channel {channel}."
                 )
+        self.scan_channels = [
+            channel for channel in config["channels"] if channel not in self.ch_list_dig
+        ]
+        self.nb_reading_values = len(self.scan_channels)
 
         self.reading_str = self.reading_str[:-1] + ")"
         self.ch_str_tc = self.ch_str_tc[:-1] + ")"
@@ -131,11 +148,62 @@ class Daq6510:
         else:
             adel = "OFF"
 
+        # continuous mode: hardware-timed scans, read out in bulk
+        self.scan_interval = config["settings"].get("scan-interval")
+        if self.scan_interval is not None and self.ch_list_dig:
+            raise ValueError(
+                "Digitize channels cannot be used with continuous scanning (scan-interval)."
+            )
+        if self.scan_interval is not None and not self.scan_channels:
+            raise ValueError("Continuous scanning (scan-interval) requires scan channels.")
+        buffer_size = config["settings"].get("buffer-size", 100000)
+        # whole scans only, so that a scan never wraps around the buffer end
+        self.buffer_size = max(
+            buffer_size // max(self.nb_reading_values, 1), 2
+        ) * self.nb_reading_values
+        self.buffer_index = 0  # last reading fetched from the buffer
+        self.scan_start = None  # time of the start of the continuous scan
+        self.batch = None  # (time after scan start, values) of the last sampling
+        # bursts are captured one channel per sampling, each channel every
+        # burst-interval seconds, to keep the cadence of the scan
+        self.burst_interval = config["settings"].get("burst-interval", 10)  # s
+        self.burst_due = {channel: 0.0 for channel in self.ch_list_dig}
+
+        # thermocouples measured as raw voltages and linearized on the host
+        self.tc_raw = config["settings"].get("tc-raw", False)
+        self.cold_junction_channel = config["settings"].get("cold-junction-channel")
+        if self.tc_raw:
+            for channel, tc_type in self.tc_types.items():
+                if tc_type not in thermocouple.TYPES:
+                    raise ValueError(
+                        f"Thermocouple type {tc_type} at channel {channel} not supported with tc-raw."
+                    )
+            if self.cold_junction_channel is None:
+                if config["settings"]["internal-cold-junction"]:
+                    logger.warning(
+                        f"{self.name}: internal cold junction not available with tc-raw, using 0.0°C. Configure a cold-junction-channel."
+                    )
+            elif (
+                self.cold_junction_channel not in config["channels"]
+                or self.cold_junction_channel in self.ch_list_tc
+            ):
+                raise ValueError(
+                    f"Cold junction channel {self.cold_junction_channel} must be a configured channel measuring temperature with an RTD."
+                )
+
         cmds = [
             ":SYSTEM:CLEAR\n",
-            "FORM:DATA ASCII\n",
         ]
-        if self.nb_tc_k + self.nb_tc_j > 0:  # if there are thermo couples
+        if self.nb_tc_k + self.nb_tc_j > 0 and self.tc_raw:
+            cmds.append(f'FUNC "VOLT:DC", {self.ch_str_tc}\n')
+            cmds.append(f"VOLT:RANG 0.1, {self.ch_str_tc}\n")
+            cmds.append(f"VOLT:LINE:SYNC {lsync}, {self.ch_str_tc}\n")
+            cmds.append(f"VOLT:AZER {azer}, {self.ch_str_tc}\n")
+            cmds.append(f"VOLT:DEL:AUTO {adel}, {self.ch_str_tc}\n")
+            cmds.append(f"VOLT:AVER OFF, {self.ch_str_tc}\n")
+            for channel in self.ch_list_tc:
+                cmds.append(f'VOLT:NPLC {config["settings"]["nplc"]}, (@{channel})\n')
+        elif self.nb_tc_k + self.nb_tc_j > 0:  # if there are thermo couples
             cmds.append(f'FUNC "TEMP", {self.ch_str_tc}\n')
             cmds.append(f"TEMP:TRAN TC, {self.ch_str_tc}\n")
             if self.nb_tc_k > 0:
@@ -209,15 +277,32 @@ class Daq6510:
             # only signals with frequency greater than the detector bandwidth are measured
             # detectors bandwith: 3, 30 or 300 Hz, default = 3
             cmds.append(f"VOLT:AC:DET:BAND 300, {self.ch_str_acv}\n")
+        if self.ch_list_dig:
+            # captured in bursts after the scan, see read_bursts
+            for channel in self.ch_list_dig:
+                channel_config = config["channels"][channel]
+                cmds.append(f'DIG:FUNC "VOLT", (@{channel})\n')
+                cmds.append(
+                    f'DIG:VOLT:SRAT {channel_config.get("sample-rate", 100000)}, (@{channel})\n'
+                )
+                cmds.append(f"DIG:VOLT:APER AUTO, (@{channel})\n")
+                cmds.append(
+                    f'DIG:VOLT:RANG {channel_config.get("range", 10)}, (@{channel})\n'
+                )
+            samples = max(
+                config["channels"][channel].get("samples", 1000)
+                for channel in self.ch_list_dig
+            )
+            cmds.append(f'TRAC:MAKE "digbuffer", {max(samples, 10)}\n')
         cmds.append("DISP:CLE\n")
         cmds.append("DISP:LIGH:STAT ON50\n")
         cmds.append('DISP:USER1:TEXT "ready to start ..."\n')
 
         for cmd in cmds:
             self.serial.write(cmd.encode())
+        self.configure_scan()
 
         # container for measurement data, allocation of channel_id and name
-        self.meas_data = {}
         self.channel_id_names = {}
         for channel in config["channels"]:
             if "position" in config["channels"][channel]:
@@ -225,8 +310,31 @@ class Daq6510:
             else:
                 name = f'{config["channels"][channel]["sensor-id"]}'
             name = name.replace(",", "")
-            self.meas_data.update({name: []})
             self.channel_id_names.update({channel: name})
+        # raw voltages of the thermocouples are saved additionally (tc-raw)
+        self.raw_names = {}
+        if self.tc_raw:
+            for channel in self.ch_list_tc:
+                self.raw_names.update({channel: f"{self.channel_id_names[channel]} raw"})
+        # summary values of the bursts of the digitize channels
+        self.burst_names = {}
+        for channel in self.ch_list_dig:
+            name = self.channel_id_names[channel]
+            self.burst_names.update(
+                {channel: [f"{name} RMS", f"{name} mean", f"{name} peak"]}
+            )
+        self.sensor_channels = {}  # sensor name : channel, in column order
+        for channel in self.scan_channels:
+            self.sensor_channels.update({self.channel_id_names[channel]: channel})
+        for channel, name in self.raw_names.items():
+            self.sensor_channels.update({name: channel})
+        for channel, names in self.burst_names.items():
+            for name in names:
+                self.sensor_channels.update({name: channel})
+        self.sensor_names = list(self.sensor_channels)
+        self.meas_data = History(self.sensor_names)
+        self.bursts = {}  # channel : waveform of the last sampling (to be saved)
+        self.latest_bursts = {}  # sensor name : (sample rate, waveform) for the view
 
         # unit conversion (for dcv and acv channels)
         self.conversion_factor = {}
@@ -237,7 +345,7 @@ class Daq6510:
             if type == "temperature":
                 self.unit.update({name: "°C"})
                 self.conversion_factor.update({name: 1})
-            else:  # acv, dcv
+            else:  # acv, dcv, digitize
                 if "unit" in config["channels"][channel]:
                     self.unit.update({name: config["channels"][channel]["unit"]})
                 else:
@@ -248,6 +356,30 @@ class Daq6510:
                     )
                 else:
                     self.conversion_factor.update({name: 1})
+        self.conversion_factors = np.array(
+            [
+                self.conversion_factor[self.channel_id_names[channel]]
+                for channel in self.scan_channels
+            ],
+            dtype=np.float64,
+        )
+        for name in self.raw_names.values():
+            self.unit.update({name: "V"})
+        for channel, names in self.burst_names.items():
+            for name in names:
+                self.unit.update({name: self.unit[self.channel_id_names[channel]]})
+
+        # columns of the readings for the linearization (tc-raw)
+        channels = self.scan_channels
+        self.tc_indices = [channels.index(channel) for channel in self.raw_names]
+        self.tc_type_indices = {}  # type : columns
+        for channel in self.raw_names:
+            self.tc_type_indices.setdefault(self.tc_types[channel], []).append(
+                channels.index(channel)
+            )
+        self.cold_junction_index = None
+        if self.cold_junction_channel is not None:
+            self.cold_junction_index = channels.index(self.cold_junction_channel)
 
     def init_output(self, directory="./"):
         """Initialize the csv output file.
@@ -266,6 +398,15 @@ class Daq6510:
         with open(self.filename, "w", encoding="utf-8") as f:
             f.write(units)
             f.write(header)
+        if self.ch_list_dig:
+            self.waveform_directory = f"{directory}/{self.name}-waveforms"
+            os.makedirs(self.waveform_directory, exist_ok=True)
+            for channel in self.ch_list_dig:
+                with open(
+                    f"{self.waveform_directory}/{channel}.csv", "w", encoding="utf-8"
+                ) as f:
+                    f.write(f"# {self.channel_id_names[channel]}, samples in {self.unit[self.channel_id_names[channel]]}\n")
+                    f.write("time_abs,time_rel,first_sample,samples,sample_rate,\n")
         self.write_nomad_file(directory)
 
     def write_nomad_file(self, directory="./"):
@@ -285,8 +426,7 @@ class Daq6510:
                 "data_file": self.filename.split("/")[-1],
             }
         )
-        for channel in self.channel_id_names:
-            sensor_name = self.channel_id_names[channel]
+        for sensor_name, channel in self.sensor_channels.items():
             sensor_name_nomad = sensor_name.replace(" ", "_").replace("-", "_")
             data.update(
                 {
@@ -326,6 +466,9 @@ class Daq6510:
             time_rel (float): relative time of measurement.
             sampling (dict): sampling data, as returned from sample()
         """
+        if self.scan_interval is not None:
+            self.save_batch(time_abs, time_rel)
+            return
         timediff = (
             datetime.datetime.now(datetime.timezone.utc).astimezone() - time_abs
         ).total_seconds()
@@ -333,13 +476,148 @@ class Daq6510:
             logger.warning(
                 f"{self.name} save_measurement: time difference between event and saving of {timediff} seconds for samplint timestep {time_abs.isoformat(timespec='milliseconds').replace('T', ' ')} - {time_rel}"
             )
+        self.meas_data.append(sampling, time_abs, time_rel)
         line = f"{time_abs.isoformat(timespec='milliseconds').replace('T', ' ')},{time_rel},"
         for sensor in self.meas_data:
-            self.meas_data[sensor].append(sampling[sensor])
             line += f"{sampling[sensor]},"
         line += "\n"
         with open(self.filename, "a") as f:
             f.write(line)
+        self.save_bursts(time_abs, time_rel)
+
+    def read_bursts(self):
+        """Capture a burst on a digitize channel after the scan and fetch
+        it in binary (32 bit). To keep the cadence of the scan, at most
+        one channel is digitized per sampling: the channel whose burst
+        is overdue longest, each channel every burst-interval seconds.
+
+        Returns:
+            numpy.array: RMS, mean and peak value of each channel
+                (1 x 3 * digitize channels), NaN if no burst was captured
+                or a burst failed.
+        """
+        summaries = np.full((1, 3 * len(self.ch_list_dig)), np.nan)
+        self.bursts = {}
+        now = time.monotonic()
+        channel = min(self.burst_due, key=self.burst_due.get)
+        if self.burst_due[channel] > now:
+            return summaries
+        self.burst_due[channel] = now + self.burst_interval
+        index = self.ch_list_dig.index(channel)
+        channel_config = self.config["channels"][channel]
+        samples = channel_config.get("samples", 1000)
+        name = self.channel_id_names[channel]
+        try:
+            cmd = (
+                f"ROUT:CLOS (@{channel});:DIG:COUN {samples};"
+                ':TRAC:CLE "digbuffer";:TRAC:TRIG:DIG "digbuffer";*WAI;'
+                f':FORM:DATA SREAL;:TRAC:DATA? 1,{samples},"digbuffer",READ\n'
+            )
+            self.serial.write(cmd.encode())
+            try:
+                data = self.read_block()
+            finally:
+                self.serial.write(b"FORM:DATA REAL;:ROUT:OPEN:ALL\n")
+            waveform = np.frombuffer(data, dtype=">f4").astype(np.float32)
+            if len(waveform) != samples:
+                raise ValueError(f"Expected {samples} samples but got {len(waveform)}")
+        except ValueError as e:
+            logger.error(f"Burst of {self.name} channel {channel} failed. {e}")
+            return summaries
+        waveform *= self.conversion_factor[name]
+        self.bursts.update({channel: waveform})
+        self.latest_bursts.update(
+            {name: (channel_config.get("sample-rate", 100000), waveform)}
+        )
+        summaries[0, 3 * index : 3 * index + 3] = [
+            np.sqrt(np.mean(np.square(waveform, dtype=np.float64))),
+            np.mean(waveform, dtype=np.float64),
+            np.max(np.abs(waveform)),
+        ]
+        return summaries
+
+    def save_bursts(self, time_abs, time_rel):
+        """Append the bursts of the last sampling to the waveform files:
+        {device name}-waveforms/{channel}.bin with the samples (little
+        endian float32) and {channel}.csv with one line per burst (time,
+        first sample, number of samples, sample rate).
+
+        Args:
+            time_abs (datetime): measurement timestamp.
+            time_rel (float): relative time of measurement.
+        """
+        for channel, waveform in self.bursts.items():
+            filename = f"{self.waveform_directory}/{channel}"
+            with open(f"{filename}.bin", "ab") as f:
+                first_sample = f.tell() // 4
+                f.write(waveform.astype("<f4").tobytes())
+            with open(f"{filename}.csv", "a", encoding="utf-8") as f:
+                f.write(
+                    f"{time_abs.isoformat(timespec='milliseconds').replace('T', ' ')},{time_rel},{first_sample},{len(waveform)},{self.config['channels'][channel].get('sample-rate', 100000)},\n"
+                )
+        self.bursts = {}
+
+    def linearize(self, values):
+        """Convert the raw thermocouple voltages into temperatures (tc-raw)
+        using the cold junction channel of the same scan.
+
+        Args:
+            values (numpy.array): readings (scans x channels).
+
+        Returns:
+            numpy.array: readings with temperatures, followed by the raw
+                voltages of the thermocouples (scans x sensor_names).
+        """
+        raw = values[:, self.tc_indices]
+        if self.cold_junction_index is None:
+            cold_junction = 0.0
+        else:
+            cold_junction = values[:, [self.cold_junction_index]]
+        values = values.copy()
+        for tc_type, indices in self.tc_type_indices.items():
+            values[:, indices] = thermocouple.linearize(
+                tc_type, values[:, indices], cold_junction
+            )
+        return np.hstack([values, raw])
+
+    def save_batch(self, time_abs, time_rel):
+        """Write the scans of the last sampling in continuous mode to
+        file, with the timestamps of the instrument.
+
+        Args:
+            time_abs (datetime): timestamp of the sampling step, used to
+                compute the relative time of the scans.
+            time_rel (float): relative time of the sampling step.
+        """
+        if self.batch is None or len(self.batch[0]) == 0:
+            return
+        times, values = self.batch
+        self.batch = None
+        scan_times = [
+            self.scan_start + datetime.timedelta(seconds=t) for t in times.tolist()
+        ]
+        rel_times = np.round(
+            time_rel + (times - (time_abs - self.scan_start).total_seconds()), 3
+        )
+        start_ns = (
+            self.scan_start - datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+        ) // datetime.timedelta(microseconds=1) * 1000
+        self.meas_data.extend(
+            {
+                sensor: values[:, i]
+                for i, sensor in enumerate(self.sensor_names)
+            },
+            start_ns + np.round(times * 1e9).astype(np.int64),
+            rel_times,
+        )
+        lines = ""
+        for scan_time, rel_time, row in zip(
+            scan_times, rel_times.tolist(), values.tolist()
+        ):
+            lines += f"{scan_time.isoformat(timespec='milliseconds').replace('T', ' ')},{rel_time},"
+            lines += ",".join(str(value) for value in row) + ",\n"
+        with open(self.filename, "a") as f:
+            f.write(lines)
 
     @property
     def device_id(self):
@@ -373,49 +651,165 @@ class Daq6510:
         cmd = "*RST\n"
         self.serial.write(cmd.encode())
 
-    def read(self):
-        """Read out all channels.
-
-        Returns:
-            str: measurement data
-        """
+    def configure_scan(self):
+        """Configure scan list, buffer and binary data format. This is
+        done once at initialization and again after a failed sampling
+        (e.g. if the device was switched off in the meantime), the
+        sampling itself only triggers the scan and fetches the readings.
+        In continuous mode (scan-interval configured) the scan is started
+        here and runs until the device is reset. Without scan channels
+        (digitize channels only) there is nothing to configure."""
+        if not self.scan_channels:
+            self.scan_configured = True
+            return
         cmds = [
-            "TRAC:CLE\n",
-            "TRAC:POIN 100\n",
+            "FORM:DATA REAL\n",  # 64 bit floating point, binary block transfer
+            "FORM:BORD NORM\n",  # big endian
             f"ROUT:SCAN:CRE {self.reading_str}\n",
-            "ROUT:SCAN:COUN:SCAN 1\n",
-            "INIT\n",
-            "*WAI\n",
-            f'TRAC:DATA? 1,{self.nb_reading_values},"defbuffer1", CHAN, READ\n',
         ]
+        if self.scan_interval is None:
+            cmds += [
+                "TRAC:POIN 100\n",
+                "ROUT:SCAN:COUN:SCAN 1\n",
+            ]
+        else:
+            cmds += [
+                "ABOR\n",
+                f"TRAC:POIN {self.buffer_size}\n",
+                "TRAC:FILL:MODE CONT\n",  # ring buffer
+                "ROUT:SCAN:COUN:SCAN 0\n",  # infinite
+                f"ROUT:SCAN:INT {self.scan_interval}\n",
+                "TRAC:CLE\n",
+                "INIT\n",
+            ]
         for cmd in cmds:
             self.serial.write(cmd.encode())
-        return self.serial.readline().decode().strip()
+        self.buffer_index = 0
+        self.scan_start = datetime.datetime.now(datetime.timezone.utc).astimezone()
+        self.scan_configured = True
+
+    def read_block(self):
+        """Read an IEEE 488.2 definite length block:
+        #<number of digits><length><data>
+
+        Returns:
+            bytes: data.
+        """
+        header = self.serial.read(2)
+        if len(header) != 2 or header[:1] != b"#":
+            raise ValueError(f"Invalid block header {header!r}")
+        digits = int(header[1:2])
+        length = int(self.serial.read(digits))
+        data = self.serial.read(length)
+        self.serial.readline()  # terminator
+        if len(data) != length:
+            raise ValueError(f"Expected {length} bytes but got {len(data)}")
+        return data
+
+    def read(self):
+        """Read out all channels: clear the buffer, trigger the scan and
+        fetch the readings in a single transfer. The readings are
+        returned in the order of the scan list (i.e. of the channels in
+        the configuration).
+
+        Returns:
+            bytes: binary block with the readings (big endian float64),
+                without header.
+        """
+        if not self.scan_configured:
+            self.configure_scan()
+        cmd = (
+            "TRAC:CLE;:INIT;*WAI;"
+            f':TRAC:DATA? 1,{self.nb_reading_values},"defbuffer1",READ\n'
+        )
+        self.serial.write(cmd.encode())
+        return self.read_block()
+
+    def read_buffer(self):
+        """Fetch all complete scans measured since the last call in
+        continuous mode, including the relative timestamps of the
+        instrument.
+
+        Returns:
+            tuple(numpy.array, numpy.array): time of the scans after the
+                start of the continuous scan in s (n), readings
+                (n x channels).
+        """
+        if not self.scan_configured:
+            self.configure_scan()
+        self.serial.write(b'TRAC:ACT:END? "defbuffer1"\n')
+        end = int(self.serial.readline().decode().strip())
+        available = (end - self.buffer_index) % self.buffer_size
+        if available > self.buffer_size - 2 * self.nb_reading_values:
+            logger.warning(
+                f"{self.name}: buffer almost full, readings may be lost. Reduce dt-main or increase buffer-size."
+            )
+        count = available - available % self.nb_reading_values
+        ranges = []
+        start = self.buffer_index + 1
+        if count > 0 and start + count - 1 > self.buffer_size:  # wrapped
+            ranges.append((start, self.buffer_size))
+            count -= self.buffer_size - start + 1
+            start = 1
+        if count > 0:
+            ranges.append((start, start + count - 1))
+        data = b""
+        for first, last in ranges:
+            self.serial.write(
+                f'TRAC:DATA? {first},{last},"defbuffer1",READ,REL\n'.encode()
+            )
+            data += self.read_block()
+        if ranges:
+            self.buffer_index = ranges[-1][1] % self.buffer_size
+        values = np.frombuffer(data, dtype=">f8").reshape(-1, 2)
+        readings = values[:, 0].reshape(-1, self.nb_reading_values)
+        times = values[:: self.nb_reading_values, 1]  # first channel of each scan
+        return times, readings
 
     def sample(self):
         """Read sampling form device and convert values to specified format.
+        In continuous mode, all scans measured since the last sampling
+        are kept in batch (written by save_measurement) and the latest
+        scan is returned.
 
         Returns:
             dict: {sensor name: measurement value}
         """
-        data = self.read().split(",")  # = ['channel', 'value', 'channel', 'value', ...]
-
-        if len(data) != 2 * self.nb_reading_values:  # there is an error in the sampling
-            logging.error(
-                f"Sampling of Daq6510 '{self.name}' failed. Expected {2* self.nb_reading_values} values but got {data}"
-            )
-            return {v: np.nan for _, v in self.channel_id_names.items()}
-        sampling = {}
-        for i in range(int(len(data) / 2)):
-            channel = int(data[2 * i])
-            sensor_name = self.channel_id_names[channel]
-            measurement_value = (
-                float(data[2 * i + 1]) * self.conversion_factor[sensor_name]
+        try:
+            if not self.scan_channels:  # digitize channels only
+                values = np.empty((1, 0))
+            elif self.scan_interval is None:
+                values = np.frombuffer(self.read(), dtype=">f8")
+                if len(values) != self.nb_reading_values:
+                    raise ValueError(
+                        f"Expected {self.nb_reading_values} values but got {values}"
+                    )
+                values = values.reshape(1, -1)
+            else:
+                times, values = self.read_buffer()
+        except ValueError as e:  # there is an error in the sampling
+            logger.error(f"Sampling of Daq6510 '{self.name}' failed. {e}")
+            self.scan_configured = False  # configure again with the next sampling
+            self.batch = None
+            return {name: np.nan for name in self.sensor_names}
+        values = values * self.conversion_factors
+        invalid = ~(values < 10e5)  # overflow is reported as 9.9e37
+        if invalid.any():
+            logger.error(
+                f"Sampling of Daq6510 '{self.name}' failed. Measurement_value optianed but not realistic: {values[invalid]}"
             )
-            if measurement_value < 10e5: sampling.update({sensor_name: measurement_value})
-            else: 
-                logging.error(f"Sampling of Daq6510 '{self.name}' failed. Measurement_value optianed but not realistic: {measurement_value}")
-                sampling.update({sensor_name: np.nan()})
+            values[invalid] = np.nan
+        if self.tc_raw:
+            values = self.linearize(values)
+        if self.ch_list_dig:
+            values = np.hstack([values, self.read_bursts()])
+        if self.scan_interval is not None:
+            self.batch = (times, values)
+            if len(values) == 0:  # no new scan
+                if isinstance(self.latestSample, dict):
+                    return self.latestSample
+                return {name: np.nan for name in self.sensor_names}
+        sampling = dict(zip(self.sensor_names, values[-1].tolist()))
         self.setLatestSample(sampling)
         return sampling
 
@@ -2,10 +2,14 @@ from copy import deepcopy
 import datetime
 import logging
 import numpy as np
-from serial import Serial, SerialException
+from serial import SerialException
 import yaml
 import socket
 import json
+import time
+
+from ..history import History
+from .. import serial_bus
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +23,14 @@ class SerialMock:
     def readline(self):
         return "".encode()
 
+    def read(self, size=1):
+        return "".encode()
+
+    in_waiting = 0
+
+    def reset_input_buffer(self):
+        pass
+
 
 class Eurotherm:
     def __init__(self, config, name="Eurotherm"):
@@ -37,18 +49,21 @@ class Eurotherm:
             self.conectionType = "serial"
             self.read_temperature = "\x040000PV\x05"
             self.read_op          = "\x040000OP\x05"
-            self.meas_data = {"Temperature": [], "Operating point": []}
+            self.meas_data = History(["Temperature", "Operating point"])
+            self.bus_priority = config.get("bus-priority", 0)
             try:
-                self.serial = Serial(**config["serial-interface"])
+                self.bus = serial_bus.get_bus(config["serial-interface"])
+                self.serial = self.bus.serial
             except SerialException as e:
                 logger.exception(f"Connection to {self.name} not possible.")
                 self.serial = SerialMock()
+                self.bus = serial_bus.SerialBus(self.serial, name)
                 
         elif self.config.get("tcp-interface") != None: # tcp conection
             self.conectionType = "tcp"
             self.vifconIP      = config["tcp-interface"]["IP"]
             self.vifconPort    = config["tcp-interface"]["Port"]
-            self.meas_data = {"IWT": [], "SWT": [], "Operating point": []}
+            self.meas_data = History(["IWT", "SWT", "Operating point"])
             try:
                 self.s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
                 self.s.connect((self.vifconIP, self.vifconPort))
@@ -68,10 +83,10 @@ class Eurotherm:
         """
         if self.conectionType == "serial":
             try:
-                self.serial.write(self.read_temperature.encode())
-                temperature = float(self.serial.readline().decode()[3:-2])
-                self.serial.write(self.read_op.encode())
-                op = float(self.serial.readline().decode()[3:-2])
+                with self.bus.transaction(self.bus_priority, self.name):
+                    self.bus.resync(0)  # e.g. late responses to other devices
+                    temperature = self.query(self.read_temperature)
+                    op = self.query(self.read_op)
             except Exception as e:
                 logger.exception(f"Could not sample Eurotherm.")
                 temperature = np.nan
@@ -95,6 +110,31 @@ class Eurotherm:
             return {"IWT": IWT, "SWT": SWT, "Operating point": op}
         
 
+    def query(self, request):
+        """Read a parameter via the serial bus (within a transaction). The
+        response (STX, mnemonic, value, ETX, BCC) is checked, so that
+        responses to other devices on the bus are not taken as value.
+
+        Args:
+            request (str): poll message of the parameter.
+
+        Returns:
+            float: value of the parameter.
+        """
+        self.serial.write(request.encode())
+        response = self.bus.read_until(
+            b"\x03", time.perf_counter() + self.bus.timeout, trailer=1
+        )
+        if response is None:
+            raise TimeoutError(f"No response to {request!r}.")
+        frame = response[response.rfind(b"\x02") :]
+        bcc = 0
+        for byte in frame[1:-1]:
+            bcc ^= byte
+        if frame[1:3] != request[-3:-1].encode() or frame[-1] != bcc:
+            raise ValueError(f"Invalid response {response!r} to {request!r}.")
+        return float(frame[3:-2].decode())
+
     def save_measurement(self, time_abs, time_rel, sampling):
         """Write measurement data to file.
 
@@ -111,13 +151,10 @@ class Eurotherm:
                 f"{self.name} save_measurement: time difference between event and saving of {timediff} seconds for samplint timestep {time_abs.isoformat(timespec='milliseconds').replace('T', ' ')} - {time_rel}"
             )
             
-        self.meas_data["Operating point"].append(sampling["Operating point"])
+        self.meas_data.append(sampling, time_abs, time_rel)
         if self.conectionType == "serial":
-            self.meas_data["Temperature"].append(sampling["Temperature"])
             line = f"{time_abs.isoformat(timespec='milliseconds').replace('T', ' ')},{time_rel},{sampling['Temperature']},{sampling['Operating point']},\n"
         elif self.conectionType == "tcp":
-            self.meas_data["IWT"].append(sampling["IWT"])
-            self.meas_data["SWT"].append(sampling["SWT"])
             line = f"{time_abs.isoformat(timespec='milliseconds').replace('T', ' ')},{time_rel},{sampling['IWT']},{sampling['SWT']},{sampling['Operating point']},\n"
         
         with open(self.filename, "a", encoding="utf-8") as f:
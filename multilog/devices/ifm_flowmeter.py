@@ -1,4 +1,4 @@
-import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 import datetime
 import logging
@@ -6,12 +6,15 @@ import matplotlib.pyplot as plt
 import multiprocessing
 import numpy as np
 import os
-from os.path import expanduser
 from serial import Serial, SerialException
 import subprocess
+import time
 import traceback
 import yaml
 
+from ..history import History
+from .. import notification
+
 logger = logging.getLogger(__name__)
 
 # required for camera
@@ -19,36 +22,114 @@ try:
     import requests
 except Exception as e:
     logger.warning("Could not import requests.", exc_info=True)
-# required for discord bot
-try:
-    from dotenv import load_dotenv
-except Exception as e:
-    logger.warning("Could not import dotenv.", exc_info=True)
-try:
-    from discord.ext import commands
-except Exception as e:
-    logger.warning("Could not import discord.", exc_info=True)
 
+# decoding of the process data: {sensor type: ((temperature word, factor),
+# (flow word, factor))}, words of 16 bit counted from the end of the data
+SENSOR_TYPES = {
+    "SM-8020": ((-2, 0.01), (-4, 0.0166667)),
+    "SV-4200": ((-1, 0.1 / 4), (-2, 0.1)),
+    "SBG-233": ((-1, 1.0 / 4), (-2, 0.1)),
+}
 
-def send_discord_message(msg):
-    """Bot for sending discord messages on a pre-configured computer.
-    Refer to the discord docs for additional information."""
-    logger.info(f"Sending discord message '{msg}'")
-    asyncio.set_event_loop(asyncio.new_event_loop())
-    load_dotenv(expanduser("~") + "/discord.env")
-    DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
-    DISCORD_CHANNEL = int(os.getenv("DISCORD_CHANNEL"))
 
-    bot = commands.Bot(command_prefix="cmd!", description="I am NemoOneBot")
+class FlowBalance:
+    """Leak detection by balancing in- and outflows, averaged over
+    rolling time windows to suppress the noise of single samplings. The
+    flows of all sensors are kept in a ring buffer (samplings x
+    sensors); all groups and windows are evaluated at once with array
+    operations."""
 
-    @bot.event
-    async def on_ready():
-        channel = bot.get_channel(DISCORD_CHANNEL)
-        await channel.send(msg)
-        await asyncio.sleep(0.5)
-        await bot.close()
+    def __init__(self, groups, sensors, capacity=256):
+        """Set up the balance.
 
-    bot.run(DISCORD_TOKEN)  # blocking call!
+        Args:
+            groups (dict): {group name: {"inflow": [sensor names],
+                "outflow": [sensor names], "tolerance": l/min, "window":
+                s (default: 10)}}. tolerance and window may be lists
+                (of the same length) to check several windows, e.g., a
+                short window for large and a long one for small leaks.
+            sensors (list): names of all sensors.
+            capacity (int, optional): initial number of samplings in the
+                ring buffer, extended if required for the longest
+                window. Defaults to 256.
+        """
+        self.groups = list(groups)
+        # balance matrix: +1 inflow, -1 outflow (groups x sensors)
+        self.matrix = np.zeros((len(groups), len(sensors)))
+        checks = []  # (group index, window, tolerance)
+        for i, group in enumerate(groups.values()):
+            for sensor in group["inflow"]:
+                self.matrix[i, sensors.index(sensor)] += 1
+            for sensor in group["outflow"]:
+                self.matrix[i, sensors.index(sensor)] -= 1
+            windows = np.atleast_1d(group.get("window", 10))
+            tolerances = np.atleast_1d(group["tolerance"])
+            if len(windows) == 1:
+                windows = np.repeat(windows, len(tolerances))
+            if len(tolerances) != len(windows):
+                raise ValueError(
+                    f"Flow balance {list(groups)[i]}: window and tolerance of different length."
+                )
+            checks += zip([i] * len(windows), windows, tolerances)
+        self.windows = np.unique([window for _, window, _ in checks]).astype(float)
+        self.check_group = np.array([group for group, _, _ in checks], dtype=int)
+        self.check_window = np.searchsorted(
+            self.windows, [window for _, window, _ in checks]
+        )
+        self.tolerance = np.array([tolerance for _, _, tolerance in checks], float)
+        self.time = np.full(capacity, -np.inf)
+        self.flow = np.full((capacity, len(sensors)), np.nan)
+        self.position = 0
+
+    def add(self, now, flow):
+        """Add a sampling to the ring buffer.
+
+        Args:
+            now (float): monotonic time in s.
+            flow (numpy.array): flow of each sensor.
+        """
+        if self.time[self.position] >= now - self.windows[-1]:
+            # oldest sampling still required: double the capacity
+            self.time = np.concatenate(
+                [self.time[self.position :], self.time[: self.position]]
+            )
+            self.flow = np.concatenate(
+                [self.flow[self.position :], self.flow[: self.position]]
+            )
+            self.position = len(self.time)
+            self.time = np.concatenate([self.time, np.full(len(self.time), -np.inf)])
+            self.flow = np.concatenate([self.flow, np.full(self.flow.shape, np.nan)])
+        self.time[self.position] = now
+        self.flow[self.position] = flow
+        self.position = (self.position + 1) % len(self.time)
+
+    def evaluate(self, now):
+        """Balance the flows averaged over the windows.
+
+        Args:
+            now (float): monotonic time in s.
+
+        Returns:
+            tuple(numpy.array, numpy.array): loss (inflow - outflow) in
+                l/min and leakage detected for each check (NaN / False
+                if a sensor of the group has no valid values within the
+                window).
+        """
+        # windows x samplings
+        in_window = (self.time >= now - self.windows[:, None]).astype(float)
+        valid = np.isfinite(self.flow)
+        sums = in_window @ np.where(valid, self.flow, 0)  # windows x sensors
+        counts = in_window @ valid
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = sums / counts  # NaN without values
+        # windows x groups, only the sensors of a group count (NaN * 0 is NaN)
+        balance = np.where(
+            self.matrix != 0, self.matrix * mean[:, None, :], 0
+        ).sum(axis=-1)
+        loss = balance[self.check_window, self.check_group]
+        with np.errstate(invalid="ignore"):
+            leakage = np.abs(loss) > self.tolerance
+        return loss, leakage
 
 
 class IfmFlowmeter:
@@ -65,57 +146,145 @@ class IfmFlowmeter:
         self.name = name
         self.ip = config["IP"]
         self.ports = config["ports"]
-        self.meas_data = {"Temperature": {}, "Flow": {}}
-        for port_id in self.ports:
-            name = self.ports[port_id]["name"]
-            self.meas_data["Temperature"].update({name: []})
-            self.meas_data["Flow"].update({name: []})
+        for port in self.ports:
+            if self.ports[port]["type"] not in SENSOR_TYPES:
+                raise ValueError(
+                    f"Unknown sensor type {self.ports[port]['type']} at port {port}."
+                )
+        self.timeout = config.get("timeout", 1.0)  # s, per request
+        self.getdatamulti = config.get("getdatamulti", False)
+        # keep-alive connections to the IO-Link master, one per port
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(len(self.ports), 1))
+        self.session.mount("http://", adapter)
+        self.executor = None
+        if not self.getdatamulti:
+            self.executor = ThreadPoolExecutor(
+                max_workers=len(self.ports), thread_name_prefix=name
+            )
+        # decoding table per port, in the order of the ports
+        decoding = [SENSOR_TYPES[self.ports[port]["type"]] for port in self.ports]
+        self.words = np.array([[word for word, _ in fields] for fields in decoding])
+        self.factors = np.array([[factor for _, factor in fields] for fields in decoding])
+        sensors = [self.ports[port_id]["name"] for port_id in self.ports]
+        self.meas_data = {"Temperature": History(sensors), "Flow": History(sensors)}
         self.last_sampling = {"Temperature": {}, "Flow": {}}
+        self.flow_balance = None
         if "flow-balance" in config:
-            self.inflow_sensors = config["flow-balance"]["inflow"]
-            self.outflow_sensors = config["flow-balance"]["outflow"]
-            self.tolerance = config["flow-balance"]["tolerance"]
-            for sensor in self.inflow_sensors + self.outflow_sensors:
+            groups = config["flow-balance"]
+            if "inflow" in groups:  # single balance
+                groups = {"total": groups}
+            self.flow_balance = FlowBalance(groups, sensors)
+            for sensor in sensors:
                 self.last_sampling["Flow"].update({sensor: 0})
 
+    def get_port(self, port):
+        """Request the process data of a port.
+
+        Args:
+            port (int): port of the IO-Link master.
+
+        Returns:
+            str: process data (hex), None if the request failed.
+        """
+        try:
+            r = self.session.get(
+                f"http://{self.ip}/iolinkmaster/port[{port}]/iolinkdevice/pdin/getdata",
+                timeout=self.timeout,
+            )
+            return r.json()["data"]["value"]
+        except Exception as e:
+            logger.error(
+                f"Could not sample IfmFlowmeter port '{self.ports[port]['name']}': {e!r}"
+            )
+            return None
+
+    def get_ports(self):
+        """Request the process data of all ports in a single request
+        (getdatamulti service of the IoT-Core).
+
+        Returns:
+            list: process data (hex) of each port, None if not available.
+        """
+        addresses = [
+            f"/iolinkmaster/port[{port}]/iolinkdevice/pdin" for port in self.ports
+        ]
+        try:
+            r = self.session.post(
+                f"http://{self.ip}/",
+                json={
+                    "code": "request",
+                    "cid": 1,
+                    "adr": "/getdatamulti",
+                    "data": {"datatosend": addresses},
+                },
+                timeout=self.timeout,
+            )
+            data = r.json()["data"]
+        except Exception as e:
+            logger.error(f"Could not sample IfmFlowmeter '{self.name}': {e!r}")
+            return [None] * len(addresses)
+        values = []
+        for port, address in zip(self.ports, addresses):
+            if data.get(address, {}).get("code") == 200:
+                values.append(data[address]["data"])
+            else:
+                logger.error(
+                    f"Could not sample IfmFlowmeter port '{self.ports[port]['name']}': {data.get(address)}"
+                )
+                values.append(None)
+        return values
+
+    def decode(self, values):
+        """Decode the process data of all ports at once using the table
+        SENSOR_TYPES.
+
+        Args:
+            values (list): process data (hex) of each port, None if not
+                available.
+
+        Returns:
+            numpy.array: temperature and flow of each port (ports x 2),
+                NaN if not available.
+        """
+        result = np.full(self.factors.shape, np.nan)
+        words = []
+        valid = []
+        for i, data_hex in enumerate(values):
+            try:
+                data = bytes.fromhex(data_hex[len(data_hex) % 4 :])
+                words.append(np.frombuffer(data, ">u2")[self.words[i]])
+                valid.append(i)
+            except (TypeError, ValueError, IndexError):
+                if data_hex is not None:
+                    logger.error(
+                        f"Invalid data of IfmFlowmeter port '{list(self.ports.values())[i]['name']}': {data_hex!r}"
+                    )
+        if valid:
+            result[valid] = np.array(words) * self.factors[valid]
+        return result
+
     def sample(self):
         """Read sampling form device and convert values to readable format.
+        The ports are requested concurrently (or in a single request with
+        getdatamulti), each request with a timeout.
 
         Returns:
             dict: {sensor name: measurement value}
         """
+        if self.getdatamulti:
+            values = self.get_ports()
+        else:
+            values = list(self.executor.map(self.get_port, self.ports))
+        decoded = self.decode(values)
+        if self.flow_balance is not None:
+            self.check_leakage(decoded[:, 1])
+        decoded = decoded.tolist()
         sampling = {"Temperature": {}, "Flow": {}}
-        for port in self.ports:
-            try:
-                name = self.ports[port]["name"]
-                sensor_type = self.ports[port]["type"]
-                r = requests.get(
-                    f"http://{self.ip}/iolinkmaster/port[{port}]/iolinkdevice/pdin/getdata"
-                )
-                data = r.json()
-                data_hex = data["data"]["value"]
-                l = len(data_hex)
-                if sensor_type == "SM-8020":
-                    data_hex_t = data_hex[l - 8 : l - 4]
-                    data_hex_f = data_hex[l - 16 : l - 12]
-                    data_dec_t = 0.01 * int(data_hex_t, 16)
-                    data_dec_f = 0.0166667 * int(data_hex_f, 16)
-                elif sensor_type == "SV-4200":
-                    data_hex_t = data_hex[l - 4 :]
-                    data_hex_f = data_hex[l - 8 : l - 4]
-                    data_dec_t = 0.1 * int(data_hex_t, 16) / 4
-                    data_dec_f = 0.1 * int(data_hex_f, 16)
-                elif sensor_type == "SBG-233":
-                    data_hex_t = data_hex[l - 4 :]
-                    data_hex_f = data_hex[l - 8 : l - 4]
-                    data_dec_t = 1.0 * int(data_hex_t, 16) / 4
-                    data_dec_f = 0.1 * int(data_hex_f, 16)
-            except Exception as e:
-                logger.exception(f"Could not sample IfmFlowmeter port '{name}'.")
-                data_dec_t = np.nan
-                data_dec_f = np.nan
-            sampling["Temperature"].update({name: data_dec_t})
-            sampling["Flow"].update({name: data_dec_f})
+        for port, (temperature, flow) in zip(self.ports, decoded):
+            name = self.ports[port]["name"]
+            sampling["Temperature"].update({name: temperature})
+            sampling["Flow"].update({name: flow})
         self.last_sampling = deepcopy(sampling)
         return sampling
 
@@ -134,14 +303,12 @@ class IfmFlowmeter:
             logger.warning(
                 f"{self.name} save_measurement: time difference between event and saving of {timediff} seconds for samplint timestep {time_abs.isoformat(timespec='milliseconds').replace('T', ' ')} - {time_rel}"
             )
+        self.meas_data["Flow"].append(sampling["Flow"], time_abs, time_rel)
+        self.meas_data["Temperature"].append(sampling["Temperature"], time_abs, time_rel)
         line = f"{time_abs.isoformat(timespec='milliseconds').replace('T', ' ')},{time_rel},"
         for sensor in self.meas_data["Flow"]:
-            self.meas_data["Flow"][sensor].append(sampling["Flow"][sensor])
             line += f"{sampling['Flow'][sensor]},"
         for sensor in self.meas_data["Temperature"]:
-            self.meas_data["Temperature"][sensor].append(
-                sampling["Temperature"][sensor]
-            )
             line += f"{sampling['Temperature'][sensor]},"
         line += "\n"
         with open(self.filename, "a", encoding="utf-8") as f:
@@ -225,20 +392,37 @@ class IfmFlowmeter:
         with open(f"{directory}/{self.name}.archive.yaml", "w", encoding="utf-8") as f:
             yaml.safe_dump(nomad_dict, f, sort_keys=False)
 
-    def check_leakage(self):
-        """Evaluate flow balance as specified in config to check for
-        leakage. If leakage is detected a discord message is sent."""
-        inflow = 0
-        for sensor in self.inflow_sensors:
-            inflow += self.last_sampling["Flow"][sensor]
-        outflow = 0
-        for sensor in self.outflow_sensors:
-            outflow += self.last_sampling["Flow"][sensor]
-        loss = inflow - outflow
-        if abs(loss) > self.tolerance:
-            logger.warning(
-                f"Detected possible cooling water leakage, difference of {loss} l/min"
-            )
-            send_discord_message(
-                f"There may be a cooling water leakage.\nThe difference between measured in- and outflow is {loss} l/min."
+    def check_leakage(self, flow):
+        """Evaluate the flow balances as specified in config to check for
+        leakage (called in the sampling thread). The result of each
+        balance is reported to the notifications (see notification
+        module), a message is sent if leakage is detected.
+
+        Args:
+            flow (numpy.array): flow of each sensor.
+        """
+        now = time.monotonic()
+        self.flow_balance.add(now, flow)
+        loss, leakage = self.flow_balance.evaluate(now)
+        for i, group in enumerate(self.flow_balance.groups):
+            checks = self.flow_balance.check_group == i
+            if np.isnan(loss[checks]).any():
+                continue  # sensor failed, no decision
+            windows = self.flow_balance.windows[self.flow_balance.check_window[checks]]
+            losses = ", ".join(
+                f"{l:.2f} l/min ({w:g} s)" for l, w in zip(loss[checks], windows)
             )
+            if leakage[checks].any():
+                logger.warning(
+                    f"Detected possible cooling water leakage in {group}, difference of {losses}"
+                )
+                notification.alert(
+                    f"{self.name}-{group}-leakage",
+                    f"There may be a cooling water leakage ({self.name}, {group}).\nThe difference between measured in- and outflow is {losses}.",
+                )
+            else:
+                notification.alert(
+                    f"{self.name}-{group}-leakage",
+                    f"The difference between measured in- and outflow ({self.name}, {group}) is {losses}.",
+                    active=False,
+                )
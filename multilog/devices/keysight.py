@@ -5,6 +5,8 @@ import numpy as np
 import usbtmc
 import yaml
 
+from ..history import History
+
 logger = logging.getLogger(__name__)
 
 
@@ -77,7 +79,7 @@ class Keysight:
             name_KS = self.serial.read()
         logger.info(f'Device identity ({self.name}): {name_KS}')
 
-        self.meas_data = {"VRMS AC Ch.1":[],"VRMS AC Ch.2":[],"VRMS AC Ch.3":[],"VRMS AC Ch.4":[],"VRMS DC Ch.1":[],"VRMS DC Ch.2":[],"VRMS DC Ch.3":[],"VRMS DC Ch.4":[], "Frequency Ch.1":[],"Frequency Ch.2":[],"Frequency Ch.3":[],"Frequency Ch.4":[], 'WaveGen V':[], 'WaveGen f':[]}
+        self.meas_data = History(["VRMS AC Ch.1","VRMS AC Ch.2","VRMS AC Ch.3","VRMS AC Ch.4","VRMS DC Ch.1","VRMS DC Ch.2","VRMS DC Ch.3","VRMS DC Ch.4", "Frequency Ch.1","Frequency Ch.2","Frequency Ch.3","Frequency Ch.4", 'WaveGen V', 'WaveGen f'])
         self.channel = {1: self.channel_1_activ, 2: self.channel_2_activ, 3: self.channel_3_activ, 4: self.channel_4_activ}
 
     def sample(self):
@@ -204,20 +206,7 @@ class Keysight:
             logger.warning(
                 f"{self.name} save_measurement: time difference between event and saving of {timediff} seconds for samplint timestep {time_abs.isoformat(timespec='milliseconds').replace('T', ' ')} - {time_rel}"
             )
-        self.meas_data["VRMS AC Ch.1"].append(sampling["VRMS AC Ch.1"])
-        self.meas_data["VRMS AC Ch.2"].append(sampling["VRMS AC Ch.2"])
-        self.meas_data["VRMS AC Ch.3"].append(sampling["VRMS AC Ch.3"])
-        self.meas_data["VRMS AC Ch.4"].append(sampling["VRMS AC Ch.4"])
-        self.meas_data["VRMS DC Ch.1"].append(sampling["VRMS DC Ch.1"])
-        self.meas_data["VRMS DC Ch.2"].append(sampling["VRMS DC Ch.2"])
-        self.meas_data["VRMS DC Ch.3"].append(sampling["VRMS DC Ch.3"])
-        self.meas_data["VRMS DC Ch.4"].append(sampling["VRMS DC Ch.4"])
-        self.meas_data["Frequency Ch.1"].append(sampling["Frequency Ch.1"])
-        self.meas_data["Frequency Ch.2"].append(sampling["Frequency Ch.2"])
-        self.meas_data["Frequency Ch.3"].append(sampling["Frequency Ch.3"])
-        self.meas_data["Frequency Ch.4"].append(sampling["Frequency Ch.4"])
-        self.meas_data["WaveGen V"].append(sampling["WaveGen V"])
-        self.meas_data["WaveGen f"].append(sampling["WaveGen f"])
+        self.meas_data.append(sampling, time_abs, time_rel)
         line = f"{time_abs.isoformat(timespec='milliseconds').replace('T', ' ')},{time_rel},{sampling['VRMS AC Ch.1']},{sampling['VRMS AC Ch.2']},{sampling['VRMS AC Ch.3']},{sampling['VRMS AC Ch.4']},{sampling['VRMS DC Ch.1']},{sampling['VRMS DC Ch.2']},{sampling['VRMS DC Ch.3']},{sampling['VRMS DC Ch.4']},{sampling['Frequency Ch.1']},{sampling['Frequency Ch.2']},{sampling['Frequency Ch.3']},{sampling['Frequency Ch.4']},{sampling['WaveGen V']},{sampling['WaveGen f']},\n"
         with open(self.filename, "a", encoding="utf-8") as f:
             f.write(line)
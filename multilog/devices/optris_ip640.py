@@ -93,18 +93,42 @@ class OptrisIP640:
             self.emissivity, self.transmissivity, self.t_ambient
         )
         self.w, self.h = optris.get_thermal_image_size()
+        # false color image of the SDK for display, instead of multilog's colormap
+        self.sdk_palette = config.get("sdk-palette", False)
+        self.palette_image = None
+        if self.sdk_palette:
+            self.palette_w, self.palette_h = optris.get_palette_image_size()
         self.meas_data = []
         self.image_counter = 1
 
     def sample(self):
-        """Read image form device.
+        """Read image form device. If sdk-palette is configured, the
+        false color image of the SDK is read as well and stored in
+        palette_image.
 
         Returns:
-            numpy.array: IR image (2D temperature filed)
+            numpy.array: raw IR image (2D uint16 array, use to_temperature
+                for conversion)
         """
-        raw_image = optris.get_thermal_image(self.w, self.h)
-        thermal_image = (raw_image - 1000.0) / 10.0  # convert to temperature
-        return thermal_image
+        if self.sdk_palette:
+            raw_image, self.palette_image = optris.get_thermal_palette_image(
+                self.w, self.h, self.palette_w, self.palette_h
+            )
+        else:
+            raw_image = optris.get_thermal_image(self.w, self.h)
+        return raw_image
+
+    @staticmethod
+    def to_temperature(raw_image):
+        """Convert raw IR image to temperature.
+
+        Args:
+            raw_image (numpy.array): raw image as returned from sample()
+
+        Returns:
+            numpy.array: 2D temperature field
+        """
+        return (raw_image - 1000.0) / 10.0
 
     @staticmethod
     def plot_to_file(sampling, filename):
@@ -113,7 +137,7 @@ class OptrisIP640:
         threadsave.
 
         Args:
-            sampling (numpy array): IR image as returned from sample()
+            sampling (numpy array): temperature field (see to_temperature)
             filename (str): filepath of plot
         """
         fig, ax = plt.subplots()
@@ -171,6 +195,7 @@ class OptrisIP640:
             time_rel (float): relative time of measurement.
             sampling (numpy.array): sampling data, as returned from sample()
         """
+        thermal_image = self.to_temperature(sampling)
         timediff = (
             datetime.datetime.now(datetime.timezone.utc).astimezone() - time_abs
         ).total_seconds()
@@ -180,11 +205,11 @@ class OptrisIP640:
             )
         self.meas_data = sampling
         img_name = f"img_{self.image_counter:06}"
-        np.savetxt(f"{self.directory}/{img_name}.csv", sampling, "%.2f")
+        np.savetxt(f"{self.directory}/{img_name}.csv", thermal_image, "%.2f")
         # plot in separate process because matplotlib is not threadsave
         multiprocessing.Process(
             target=self.plot_to_file,
-            args=(sampling, f"{self.directory}/{img_name}.png"),
+            args=(thermal_image, f"{self.directory}/{img_name}.png"),
         ).start()
         # self.plot_to_file(sampling, f"{self.directory}/{img_name}.png")
         with open(f"{self.directory}/_images.csv", "a", encoding="utf-8") as f:
@@ -2,9 +2,13 @@ from copy import deepcopy
 import datetime
 import logging
 import numpy as np
-from serial import Serial, SerialException
+from serial import SerialException
+import time
 import yaml
 
+from ..history import History
+from .. import serial_bus
+
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +22,14 @@ class SerialMock:
     def readline(self):
         return "".encode()
 
+    def read(self, size=1):
+        return "".encode()
+
+    in_waiting = 0
+
+    def reset_input_buffer(self):
+        pass
+
 
 class PyrometerArrayLumasense:
     """Lumasense pyrometer, e.g. Series 600."""
@@ -34,13 +46,15 @@ class PyrometerArrayLumasense:
         self.config = config
         self.device_id = config["device-id"]
         self.name = name
+        self.bus_priority = config.get("bus-priority", 0)
         try:
-            self.serial = Serial(**config["serial-interface"])
+            self.bus = serial_bus.get_bus(config["serial-interface"])
+            self.serial = self.bus.serial
         except SerialException as e:
             logger.exception(f"Connection to {self.name} not possible.")
             self.serial = SerialMock()
+            self.bus = serial_bus.SerialBus(self.serial, name)
         self.t90_dict = config["t90-dict"]
-        self.meas_data = {}
         self.head_numbering = {}
         self.sensors = []
         self.emissivities = {}
@@ -49,7 +63,6 @@ class PyrometerArrayLumasense:
             self.sensors.append(sensor)
             head_number = config["sensors"][sensor]["head-number"]
             self.head_numbering.update({sensor: head_number})
-            self.meas_data.update({sensor: []})
             self.emissivities.update({sensor: config["sensors"][sensor]["emissivity"]})
             self.t90s.update({sensor: config["sensors"][sensor]["t90"]})
             if type(self.serial) != SerialMock:
@@ -57,7 +70,20 @@ class PyrometerArrayLumasense:
                     head_number, config["sensors"][sensor]["emissivity"]
                 )
                 self.set_emissivity(head_number, config["sensors"][sensor]["t90"])
+        self.meas_data = History(self.sensors)
         self.latestSample = np.nan
+        # pipelined reading: requests of all heads are sent at once
+        self.pipeline = config.get("pipeline", True)
+        self.max_timeout = config.get("response-timeout", 0.5)  # s
+        self.min_timeout = 0.02  # s
+        self.requests = [
+            f"{self.device_id}A{self.head_numbering[sensor]}ms\r".encode()
+            for sensor in self.sensors
+        ]
+        self.response_time = np.full(len(self.sensors), np.nan)  # s, average
+        self.timeouts = np.full(len(self.sensors), self.max_timeout)  # s
+        # heads that did not respond, requested separately until they do
+        self.silent = np.zeros(len(self.sensors), dtype=bool)
 
     def _get_ok(self):
         """Check if command was accepted."""
@@ -68,12 +94,14 @@ class PyrometerArrayLumasense:
         string_val = self.serial.readline().decode().strip()
         return float(f"{string_val[:-1]}.{string_val[-1:]}")
 
+    @serial_bus.transaction
     def get_heat_id(self, head_number):
         """Get the id of a certain head."""
         cmd = f"{self.device_id}A{head_number}sn\r"
         self.serial.write(cmd.encode())
         return self.serial.readline().decode().strip()
 
+    @serial_bus.transaction
     def set_emissivity(self, head_number, emissivity):
         """Set emissivity for a certain head."""
         logger.info(
@@ -85,6 +113,7 @@ class PyrometerArrayLumasense:
         self.serial.write(cmd.encode())
         self._get_ok()
 
+    @serial_bus.transaction
     def set_t90(self, head_number, t90):
         """Set t90 for a certain head."""
         logger.info(f"{self.name} - setting t90 {t90} for heat {head_number}")
@@ -92,28 +121,131 @@ class PyrometerArrayLumasense:
         self.serial.write(cmd.encode())
         self._get_ok()
 
+    @serial_bus.transaction
     def read_sensor(self, head_number):
         """Read temperature of a certain head."""
         cmd = f"{self.device_id}A{head_number}ms\r"
         self.serial.write(cmd.encode())
         return self._get_float()
 
-    def sample(self):
-        """Read temperature form all heads.
+    def _parse(self, i, response):
+        """Convert the response (bytes) of head i to a temperature, NaN if
+        invalid."""
+        response = response.decode(errors="replace").strip()
+        try:
+            return float(f"{response[:-1]}.{response[-1:]}")
+        except ValueError:
+            logger.error(
+                f"Could not sample PyrometerArrayLumasense head '{self.sensors[i]}': invalid response {response!r}."
+            )
+            return np.nan
+
+    def _update_timeout(self, i, response_time):
+        """Update the average response time and the timeout of head i."""
+        if np.isnan(self.response_time[i]):
+            self.response_time[i] = response_time
+        else:
+            self.response_time[i] += 0.2 * (response_time - self.response_time[i])
+        self.timeouts[i] = np.clip(
+            4 * self.response_time[i], self.min_timeout, self.max_timeout
+        )
+
+    def _read_pipelined(self, heads, values):
+        """Write the requests of the heads at once and read the responses.
 
         Returns:
-            dict: {head name: temperature}.
+            bool: True if all heads responded, otherwise the values of the
+                heads are discarded.
+        """
+        self.serial.write(b"".join(self.requests[i] for i in heads))
+        last = time.perf_counter()
+        for n, i in enumerate(heads):
+            response = self.bus.read_line(last + self.timeouts[i])
+            now = time.perf_counter()
+            if response is None:
+                # wait only as long as the outstanding heads need to respond
+                outstanding = heads[n + 1 :]
+                expected = np.where(
+                    np.isnan(self.response_time[outstanding]),
+                    self.timeouts[outstanding],
+                    self.response_time[outstanding],
+                ).sum()
+                self.bus.resync(np.clip(expected, self.min_timeout, self.max_timeout))
+                logger.warning(
+                    f"{self.name}: response missing in pipelined request, requesting heads one by one."
+                )
+                values[heads] = np.nan
+                return False
+            values[i] = self._parse(i, response)
+            if np.isnan(values[i]):
+                continue
+            self._update_timeout(i, now - last)
+            last = now
+        return True
+
+    def _read_single(self, i, values, timeout, adaptive=False):
+        """Request a single head. A head that does not respond is marked
+        as silent, a silent head that responds again is reset.
+
+        Args:
+            i (int): index of the head.
+            values (numpy.array): temperatures, updated in place.
+            timeout (float): time to wait for the response in s.
+            adaptive (bool, optional): update the response time of the
+                head. Defaults to False.
         """
-        sampling = {}
-        for sensor in self.head_numbering:
-            try:
-                sampling.update({sensor: self.read_sensor(self.head_numbering[sensor])})
-            except Exception as e:
-                logger.exception(
-                    f"Could not sample PyrometerArrayLumasense heat '{sensor}'."
+        self.serial.write(self.requests[i])
+        last = time.perf_counter()
+        response = self.bus.read_line(last + timeout)
+        now = time.perf_counter()
+        if response is None:
+            self.bus.resync(self.min_timeout)
+            if not self.silent[i]:
+                logger.error(
+                    f"Could not sample PyrometerArrayLumasense head '{self.sensors[i]}': timeout after {timeout:.3f} s, requesting it separately until it responds."
                 )
-                sampling.update({sensor: np.nan})
+            self.silent[i] = True
+            return
+        if self.silent[i]:
+            logger.info(f"{self.name}: head '{self.sensors[i]}' responds again.")
+            self.silent[i] = False
+        values[i] = self._parse(i, response)
+        if adaptive and not np.isnan(values[i]):
+            self._update_timeout(i, now - last)
 
+    @serial_bus.transaction
+    def sample(self):
+        """Read temperature form all heads. With pipeline (default), the
+        requests of all heads are written at once and the responses are
+        parsed as they arrive, so that a sampling takes about one round
+        trip instead of one per head. The sampling is one transaction on
+        the serial bus. The timeout of each head adapts to
+        its measured response time. As the responses do not contain the
+        head number, a missing response makes the assignment of the whole
+        batch unknown: it is discarded and the heads are requested one
+        by one instead. Heads that did not respond are left out of the
+        pipeline and requested separately with a short timeout (at most
+        the serial timeout) until they respond again.
+
+        Returns:
+            dict: {head name: temperature}.
+        """
+        values = np.full(len(self.sensors), np.nan)
+        if type(self.serial) == SerialMock:
+            self.setLatestSample(dict(zip(self.sensors, values.tolist())))
+            return self.latestSample
+        self.bus.resync(0)  # e.g. late responses to other devices
+        heads = np.flatnonzero(~self.silent).tolist()
+        silent = np.flatnonzero(self.silent).tolist()
+        if not self.pipeline:
+            for i in heads:
+                self._read_single(i, values, self.timeouts[i], adaptive=True)
+        elif len(heads) == 1 or not self._read_pipelined(heads, values):
+            for i in heads:
+                self._read_single(i, values, self.max_timeout)
+        for i in silent:
+            self._read_single(i, values, min(self.timeouts[i], self.bus.timeout))
+        sampling = dict(zip(self.sensors, values.tolist()))
         self.setLatestSample(sampling)
         return sampling
 
@@ -211,9 +343,9 @@ class PyrometerArrayLumasense:
             logger.warning(
                 f"{self.name} save_measurement: time difference between event and saving of {timediff} seconds for samplint timestep {time_abs.isoformat(timespec='milliseconds').replace('T', ' ')} - {time_rel}"
             )
+        self.meas_data.append(sampling, time_abs, time_rel)
         line = f"{time_abs.isoformat(timespec='milliseconds').replace('T', ' ')},{time_rel},"
         for sensor in sampling:
-            self.meas_data[sensor].append(sampling[sensor])
             line += f"{sampling[sensor]},"
         line += "\n"
         with open(self.filename, "a", encoding="utf-8") as f:
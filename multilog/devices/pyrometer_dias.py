@@ -7,6 +7,8 @@ from serial import Serial, SerialException
 import serial
 import yaml
 
+from ..history import History
+
 logger = logging.getLogger(__name__)
 
 
@@ -39,7 +41,7 @@ class PyrometerDias:
         self.latestSample = np.nan
 
         if self.config.get("serial-interface") != None: # serial conection
-            self.meas_data = []
+            self.meas_data = History(["Temperature"])
             
             try:
                 self.instrument = minimalmodbus.Instrument(self.config['serial-interface']['port'], 1)
@@ -149,7 +151,7 @@ class PyrometerDias:
             logger.warning(
                 f"{self.name} save_measurement: time difference between event and saving of {timediff} seconds for samplint timestep {time_abs.isoformat(timespec='milliseconds').replace('T', ' ')} - {time_rel}"
             )
-        self.meas_data.append(sampling)
+        self.meas_data.append({"Temperature": sampling}, time_abs, time_rel)
         line = f"{time_abs.isoformat(timespec='milliseconds').replace('T', ' ')},{time_rel},{sampling},\n"
         with open(self.filename, "a", encoding="utf-8") as f:
             f.write(line)
@@ -1,10 +1,18 @@
+import contextlib
 from copy import deepcopy
 import datetime
+import functools
 import logging
 import numpy as np
-from serial import Serial, SerialException
+import re
+from serial import SerialException
+import threading
+import time
 import yaml
 
+from ..history import History
+from .. import serial_bus
+
 logger = logging.getLogger(__name__)
 
 
@@ -17,6 +25,179 @@ class SerialMock:
     def readline(self):
         return "".encode()
 
+    def read(self, size=1):
+        return "".encode()
+
+    in_waiting = 0
+
+    def reset_input_buffer(self):
+        pass
+
+
+class StreamReader(threading.Thread):
+    """Reads the temperatures pushed by the pyrometer in continuous output
+    mode into a ring buffer. Garbled frames are discarded up to the next
+    CR; if no valid value is received for timeout seconds, the
+    continuous output is restarted."""
+
+    FRAME = re.compile(rb"-?\d{1,6}")  # temperature in 0.1 °C
+
+    def __init__(self, serial, start_command, stop_command, capacity, timeout, name):
+        """Create reader, the continuous output is started by start().
+
+        Args:
+            serial (Serial): serial interface.
+            start_command (bytes): command starting the continuous output.
+            stop_command (bytes): command stopping the continuous output.
+            capacity (int): number of values in the ring buffer.
+            timeout (float): time in s without valid values after which
+                the output is restarted.
+            name (str): device name.
+        """
+        super().__init__(name=f"{name}-stream", daemon=True)
+        self.serial = serial
+        self.start_command = start_command
+        self.stop_command = stop_command
+        self.timeout = timeout
+        self.times = np.zeros(capacity, np.int64)  # ns since epoch
+        self.values = np.full(capacity, np.nan)
+        self.count = 0  # number of values received
+        self.taken = 0  # number of values handed over by take()
+        self.errors = 0  # number of garbled frames
+        self.lock = threading.Lock()  # ring buffer
+        self.command_lock = threading.RLock()  # pause / resume
+        self.depth = 0  # nesting of paused()
+        self.streaming = threading.Event()
+        self.idle = threading.Event()
+
+    def start(self):
+        super().start()
+        self.resume()
+
+    def run(self):
+        buffer = bytearray()
+        last_read = None  # time of the last read with values
+        last_valid = time.monotonic()
+        while True:
+            if not self.streaming.is_set():
+                self.idle.set()
+                self.streaming.wait(0.1)
+                buffer.clear()
+                last_read = None
+                last_valid = time.monotonic()
+                continue
+            # blocks for the serial timeout at most if nothing is available
+            buffer += self.serial.read(self.serial.in_waiting or 1)
+            now = time.time_ns()
+            *frames, rest = buffer.split(b"\r")
+            buffer = bytearray(rest)
+            if len(buffer) > 32:  # no CR in garbage
+                self.errors += 1
+                buffer.clear()
+            values = []
+            for frame in frames:
+                frame = frame.strip()
+                if self.FRAME.fullmatch(frame):
+                    values.append(int(frame) / 10)
+                elif frame:
+                    self.errors += 1
+                    logger.debug(f"{self.name}: discarded garbled frame {bytes(frame)!r}")
+            if values:
+                self.store(now, last_read, values)
+                last_read = now
+                last_valid = time.monotonic()
+            elif time.monotonic() - last_valid > self.timeout:
+                if not self.command_lock.acquire(blocking=False):
+                    continue  # being paused
+                try:
+                    if self.streaming.is_set():
+                        logger.warning(f"{self.name}: no data received, restarting output.")
+                        self.serial.write(self.stop_command)
+                        time.sleep(0.05)
+                        self.serial.reset_input_buffer()
+                        self.serial.write(self.start_command)
+                finally:
+                    self.command_lock.release()
+                buffer.clear()
+                last_read = None
+                last_valid = time.monotonic()
+
+    def store(self, now, last_read, values):
+        """Add the values of one read to the ring buffer. They are
+        distributed evenly since the previous read, as they were pushed
+        at a constant rate."""
+        n = len(values)
+        if last_read is None or n == 1:
+            times = np.full(n, now)
+        else:
+            times = now - (now - last_read) * np.arange(n - 1, -1, -1) // n
+        positions = (self.count + np.arange(n)) % len(self.values)
+        with self.lock:
+            self.times[positions] = times
+            self.values[positions] = values
+            self.count += n
+
+    def take(self):
+        """Get the values received since the last call.
+
+        Returns:
+            tuple(numpy.array, numpy.array): times (ns since epoch),
+                temperatures.
+        """
+        with self.lock:
+            n = self.count - self.taken
+            if n > len(self.values):
+                logger.warning(
+                    f"{self.name}: ring buffer overflow, {n - len(self.values)} values lost."
+                )
+                n = len(self.values)
+            positions = (self.count - n + np.arange(n)) % len(self.values)
+            self.taken = self.count
+            return self.times[positions], self.values[positions]
+
+    def pause(self):
+        self.idle.clear()
+        self.streaming.clear()
+        self.idle.wait(1)
+        self.serial.write(self.stop_command)
+        time.sleep(0.05)
+        self.serial.reset_input_buffer()
+
+    def resume(self):
+        self.serial.reset_input_buffer()
+        self.serial.write(self.start_command)
+        self.streaming.set()
+
+    @contextlib.contextmanager
+    def paused(self):
+        """Stop the continuous output to send commands (nestable)."""
+        with self.command_lock:
+            self.depth += 1
+            try:
+                if self.depth == 1:
+                    self.pause()
+                yield
+            finally:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.resume()
+
+
+def exclusive(method):
+    """Decorator for methods sending commands: executed as one transaction
+    on the serial bus, the continuous output is paused meanwhile (if
+    used)."""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.bus.transaction(self.bus_priority, self.name):
+            if self.stream_reader is None:
+                return method(self, *args, **kwargs)
+            with self.stream_reader.paused():
+                return method(self, *args, **kwargs)
+
+    return wrapper
+
 
 class PyrometerLumasense:
     """Lumasense pyrometer, e.g. IGA-6-23 or IGAR-6-adv."""
@@ -35,19 +216,40 @@ class PyrometerLumasense:
         self.name = name
         self.t90_dict = config["t90-dict"]
         self.latestSample = np.nan
+        self.stream = config.get("stream", False)  # False, latest, average, all
+        if self.stream not in (False, "latest", "average", "all"):
+            raise ValueError(f"Unknown stream mode {self.stream} of {name}.")
+        self.stream_reader = None
+        self.batch = None  # (times, values) of the last sampling in stream mode all
+        self.bus_priority = config.get("bus-priority", 0)
+        self.bus_batching = config.get("bus-batching", False)
 
         if self.config.get("serial-interface") != None: # serial conection
-            self.meas_data = []
+            self.meas_data = History(["Temperature"])
             
             try:
-                self.serial = Serial(**config["serial-interface"])
+                self.bus = serial_bus.get_bus(
+                    config["serial-interface"], exclusive=bool(self.stream)
+                )
+                self.serial = self.bus.serial
             except SerialException as e:
                 logger.exception(f"Connection to {self.name} not possible.")
                 self.serial = SerialMock()
+                self.bus = serial_bus.SerialBus(self.serial, name)
             if type(self.serial) != SerialMock:
                 self.set_emissivity(config["emissivity"])
                 self.set_transmissivity(config["transmissivity"])
                 self.set_t90(config["t90"])
+                if self.stream:
+                    self.stream_reader = StreamReader(
+                        self.serial,
+                        f"{self.device_id}{config.get('stream-start', 'ms*')}\r".encode(),
+                        f"{self.device_id}{config.get('stream-stop', 'ms')}\r".encode(),
+                        config.get("buffer-size", 100000),
+                        config.get("stream-timeout", 2.0),
+                        name,
+                    )
+                    self.stream_reader.start()
         """        
         if self.config.get("tcp-interface") != None: # tcp conection
             self.conectionType = "tcp"
@@ -70,6 +272,7 @@ class PyrometerLumasense:
         return float(f"{string_val[:-1]}.{string_val[-1:]}")
 
     @property
+    @exclusive
     def focus(self):
         """Get focuspoint."""
         cmd = f"{self.device_id}df\r"
@@ -77,6 +280,7 @@ class PyrometerLumasense:
         return self.serial.readline().decode().strip()
 
     @property
+    @exclusive
     def intrument_id(self):
         """Get the instrument id."""
         if type(self.serial) == SerialMock:
@@ -86,6 +290,7 @@ class PyrometerLumasense:
         return self.serial.readline().decode().strip()
 
     @property
+    @exclusive
     def emissivity(self):
         """Read the current emissivity."""
         if type(self.serial) == SerialMock:
@@ -95,6 +300,7 @@ class PyrometerLumasense:
         return self._get_float()
 
     @property
+    @exclusive
     def transmissivity(self):
         """Read the current transmissivity."""
         if type(self.serial) == SerialMock:
@@ -104,6 +310,7 @@ class PyrometerLumasense:
         return self._get_float()
 
     @property
+    @exclusive
     def t90(self):
         """Reat the current t90 value."""
         if type(self.serial) == SerialMock:
@@ -114,6 +321,7 @@ class PyrometerLumasense:
         t90_dict_inverted = {v: k for k, v in self.t90_dict.items()}
         return t90_dict_inverted[idx]
 
+    @exclusive
     def set_emissivity(self, emissivity):
         """Set emissivity and check if it was accepted."""
         logger.info(f"{self.name} - setting emissivity {emissivity}")
@@ -122,6 +330,7 @@ class PyrometerLumasense:
         self._get_ok()
         assert self.emissivity == emissivity * 100
 
+    @exclusive
     def set_transmissivity(self, transmissivity):
         """Set transmissivity and check if it was accepted."""
         logger.info(f"{self.name} - setting transmissivity {transmissivity}")
@@ -130,6 +339,7 @@ class PyrometerLumasense:
         self._get_ok()
         assert self.transmissivity == transmissivity * 100
 
+    @exclusive
     def set_t90(self, t90):
         """Set t90 and check if it was accepted."""
         logger.info(f"{self.name} - setting t90 {t90}")
@@ -139,16 +349,39 @@ class PyrometerLumasense:
         assert self.t90 == t90
 
     def sample(self):
-        """Read temperature form device.
+        """Read temperature form device. In stream mode, the values
+        received since the last sampling are taken from the ring buffer:
+        the latest value (latest), their mean (average) or all of them
+        (all, kept in batch for save_measurement, the latest is
+        returned).
 
         Returns:
             float: temperature reading.
         """
-        
+        if self.stream_reader is not None:
+            times, values = self.stream_reader.take()
+            if self.stream == "all":
+                self.batch = (times, values)
+            if len(values) == 0:
+                logger.error(f"No new values of PyrometerLumasense {self.name}.")
+                val = np.nan
+            elif self.stream == "average":
+                val = float(np.mean(values))
+            else:
+                val = float(values[-1])
+            self.setLatestSample(val)
+            return val
         try:
-            cmd = f"{self.device_id}ms\r"
-            self.serial.write(cmd.encode())
-            val = self._get_float()
+            response = self.bus.query(
+                f"{self.device_id}ms\r".encode(),
+                self.bus_priority,
+                self.name,
+                batch=self.bus_batching,
+            )
+            if response is None:
+                raise TimeoutError("No response.")
+            string_val = response.decode().strip()
+            val = float(f"{string_val[:-1]}.{string_val[-1:]}")
         except Exception as e:
             logger.exception(f"Could not sample PyrometerLumasense.")
             val = np.nan
@@ -236,6 +469,9 @@ class PyrometerLumasense:
             time_rel (float): relative time of measurement.
             sampling (float): temperature, as returned from sample()
         """
+        if self.stream == "all" and self.stream_reader is not None:
+            self.save_batch(time_abs, time_rel)
+            return
         timediff = (
             datetime.datetime.now(datetime.timezone.utc).astimezone() - time_abs
         ).total_seconds()
@@ -243,7 +479,33 @@ class PyrometerLumasense:
             logger.warning(
                 f"{self.name} save_measurement: time difference between event and saving of {timediff} seconds for samplint timestep {time_abs.isoformat(timespec='milliseconds').replace('T', ' ')} - {time_rel}"
             )
-        self.meas_data.append(sampling)
+        self.meas_data.append({"Temperature": sampling}, time_abs, time_rel)
         line = f"{time_abs.isoformat(timespec='milliseconds').replace('T', ' ')},{time_rel},{sampling},\n"
         with open(self.filename, "a", encoding="utf-8") as f:
             f.write(line)
+
+    def save_batch(self, time_abs, time_rel):
+        """Write all values received in the last sampling (stream mode
+        all) to file, with their time of reception.
+
+        Args:
+            time_abs (datetime): timestamp of the sampling step, used to
+                compute the relative time of the values.
+            time_rel (float): relative time of the sampling step.
+        """
+        if self.batch is None or len(self.batch[0]) == 0:
+            return
+        times, values = self.batch
+        self.batch = None
+        epoch = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+        time_abs_ns = (time_abs - epoch) // datetime.timedelta(microseconds=1) * 1000
+        rel_times = np.round(time_rel + (times - time_abs_ns) / 1e9, 3)
+        self.meas_data.extend({"Temperature": values}, times, rel_times)
+        lines = ""
+        for t, rel_time, value in zip(times.tolist(), rel_times.tolist(), values.tolist()):
+            t = (epoch + datetime.timedelta(microseconds=t // 1000)).astimezone(
+                time_abs.tzinfo
+            )
+            lines += f"{t.isoformat(timespec='milliseconds').replace('T', ' ')},{rel_time},{value},\n"
+        with open(self.filename, "a", encoding="utf-8") as f:
+            f.write(lines)
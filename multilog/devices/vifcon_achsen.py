@@ -7,6 +7,8 @@ from copy import deepcopy
 import time
 import numpy as np
 
+from ..history import History
+
 logger = logging.getLogger(__name__)
 
 class Vifcon_achsen:
@@ -84,13 +86,13 @@ class Vifcon_achsen:
         # Build measData
         self.meas_data = {}
         for axis in self.hub:
-            self.meas_data.update({f"{axis}": {"IWs": [], "IWv": [], "SWv": [], "SWs": [], "oGs": [], "uGs": []}})
+            self.meas_data.update({f"{axis}": History(["IWs", "IWv", "SWv", "SWs", "oGs", "uGs"])})
 
         for axis in self.rot:
-            self.meas_data.update({f"{axis}": {"IWv": [], "IWw": [], "SWv": []}})
+            self.meas_data.update({f"{axis}": History(["IWv", "IWw", "SWv"])})
 
         for axis in self.pi:
-            self.meas_data.update({f"{axis}": {"IWs": [], "IWv": []}})
+            self.meas_data.update({f"{axis}": History(["IWs", "IWv"])})
 
     def sample(self):
         # send trigger
@@ -160,12 +162,7 @@ class Vifcon_achsen:
 
         line = f"""{time_abs.isoformat(timespec='milliseconds').replace('T', ' ')},{time_rel}"""
         for axis in self.hub:
-            self.meas_data[f"{axis}"]["IWs"].append(sampling[f"{axis}"]["IWs"])
-            self.meas_data[f"{axis}"]["SWs"].append(sampling[f"{axis}"]["SWs"])
-            self.meas_data[f"{axis}"]["oGs"].append(sampling[f"{axis}"]["oGs"])
-            self.meas_data[f"{axis}"]["uGs"].append(sampling[f"{axis}"]["uGs"])
-            self.meas_data[f"{axis}"]["IWv"].append(sampling[f"{axis}"]["IWv"])
-            self.meas_data[f"{axis}"]["SWv"].append(sampling[f"{axis}"]["SWv"])
+            self.meas_data[f"{axis}"].append(sampling[f"{axis}"], time_abs, time_rel)
             
             line = line + ',' + str(sampling[f"{axis}"]["IWs"])
             line = line + ',' + str(sampling[f"{axis}"]["SWs"])
@@ -175,17 +172,14 @@ class Vifcon_achsen:
             line = line + ',' + str(sampling[f"{axis}"]["SWv"])
             
         for axis in self.rot:
-            self.meas_data[f"{axis}"]["IWw"].append(sampling[f"{axis}"]["IWw"])
-            self.meas_data[f"{axis}"]["IWv"].append(sampling[f"{axis}"]["IWv"])
-            self.meas_data[f"{axis}"]["SWv"].append(sampling[f"{axis}"]["SWv"])
+            self.meas_data[f"{axis}"].append(sampling[f"{axis}"], time_abs, time_rel)
 
             line = line + ',' + str(sampling[f"{axis}"]["IWw"])
             line = line + ',' + str(sampling[f"{axis}"]["IWv"])
             line = line + ',' + str(sampling[f"{axis}"]["SWv"])
         
         for axis in self.pi:
-            self.meas_data[f"{axis}"]["IWs"].append(sampling[f"{axis}"]["IWs"])
-            self.meas_data[f"{axis}"]["IWv"].append(sampling[f"{axis}"]["IWv"])
+            self.meas_data[f"{axis}"].append(sampling[f"{axis}"], time_abs, time_rel)
 
             line = line + ',' + str(sampling[f"{axis}"]["IWs"])
             line = line + ',' + str(sampling[f"{axis}"]["IWv"])
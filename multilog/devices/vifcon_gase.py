@@ -6,6 +6,8 @@ import yaml
 from copy import deepcopy
 import numpy as np
 
+from ..history import History
+
 logger = logging.getLogger(__name__)
 
 class Vifcon_gase:
@@ -32,7 +34,7 @@ class Vifcon_gase:
         except Exception as e:
             logger.exception(f"Connection to {self.name} not possible.")
 
-        self.meas_data = {"MFC24": [], "MFC25": [], "MFC26": [], "MFC27": [], "DM21": [], "PP21": [], "PP22": [], "PP22I": []}
+        self.meas_data = History(["MFC24", "MFC25", "MFC26", "MFC27", "DM21", "PP21", "PP22", "PP22I"])
 
     def sample(self):
         # send trigger
@@ -71,14 +73,16 @@ class Vifcon_gase:
         pp21Formated = "{:.2E}".format(sampling["PP21"])
         pp22Formated = "{:.2E}".format(sampling["PP22"])
 
-        self.meas_data["MFC24"].append(sampling["MFC24"])
-        self.meas_data["MFC25"].append(sampling["MFC25"])
-        self.meas_data["MFC26"].append(sampling["MFC26"])
-        self.meas_data["MFC27"].append(sampling["MFC27"])
-        self.meas_data["DM21"].append(dm21Formated)
-        self.meas_data["PP21"].append(pp21Formated)
-        self.meas_data["PP22"].append(pp22Formated)
-        self.meas_data["PP22I"].append(sampling["PP22I"])
+        self.meas_data.append(
+            {
+                **sampling,
+                "DM21": float(dm21Formated),
+                "PP21": float(pp21Formated),
+                "PP22": float(pp22Formated),
+            },
+            time_abs,
+            time_rel,
+        )
         line = f"{time_abs.isoformat(timespec='milliseconds').replace('T', ' ')},{time_rel},{sampling['MFC24']},{sampling['MFC25']},{sampling['MFC26']},{sampling['MFC27']},{dm21Formated},{pp21Formated},{pp22Formated},{sampling['PP22I']},\n"
         with open(self.filename, "a", encoding="utf-8") as f:
             f.write(line)
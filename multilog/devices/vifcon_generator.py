@@ -6,6 +6,8 @@ import yaml
 from copy import deepcopy
 import numpy as np
 
+from ..history import History
+
 logger = logging.getLogger(__name__)
 
 class Vifcon_generator:
@@ -32,7 +34,7 @@ class Vifcon_generator:
         except Exception as e:
             logger.exception(f"Connection to {self.name} not possible.")
 
-        self.meas_data = {"IWP": [], "IWU": [], "IWI": [], "IWf": [], "SWP": [], "SWU": [], "SWI": []}
+        self.meas_data = History(["IWP", "IWU", "IWI", "IWf", "SWP", "SWU", "SWI"])
 
     def sample(self):
         # send trigger
@@ -61,14 +63,7 @@ class Vifcon_generator:
             logger.warning(
                 f"{self.name} save_measurement: time difference between event and saving of {timediff} seconds for samplint timestep {time_abs.isoformat(timespec='milliseconds').replace('T', ' ')} - {time_rel}"
             )
-        self.meas_data["IWP"].append(sampling["IWP"])
-        self.meas_data["IWU"].append(sampling["IWU"])
-        self.meas_data["IWI"].append(sampling["IWI"])
-        self.meas_data["IWf"].append(sampling["IWf"])
-        
-        self.meas_data["SWP"].append(sampling["SWP"])
-        self.meas_data["SWU"].append(sampling["SWU"])
-        self.meas_data["SWI"].append(sampling["SWI"])
+        self.meas_data.append(sampling, time_abs, time_rel)
         line = f"{time_abs.isoformat(timespec='milliseconds').replace('T', ' ')},{time_rel},{sampling['IWP']},{sampling['IWU']},{sampling['IWI']},{sampling['IWf']},{sampling['SWP']},{sampling['SWU']},{sampling['SWI']}\n"
         with open(self.filename, "a", encoding="utf-8") as f:
             f.write(line)
@@ -0,0 +1,820 @@
+"""In-memory storage of measurement time series.
+
+The measurement history of each device is kept in preallocated NumPy
+arrays that grow by doubling their capacity, instead of Python lists.
+The GUI reads zero-copy, read-only views of these arrays.
+
+Each device writes its samplings from its own sampler thread while the
+GUI thread reads the history. All columns of a History share one
+committed length that is only increased after every column has been
+written, so a reader always gets a consistent snapshot.
+
+For plotting of long runs, a min/max/mean pyramid of each channel is
+updated with every sampling. The plot requests only as many points as
+it can display (Series.decimate), so that the redraw cost does not grow
+with the duration of the run.
+
+The memory used by the histories can be limited (limit_memory). Older
+values are then moved into memory-mapped files in the run directory and
+stay accessible through the same interface; the operating system reads
+them back from disk only when they are accessed."""
+import bisect
+from collections.abc import Mapping
+import datetime
+import itertools
+import logging
+import os
+import weakref
+
+import numpy as np
+
+from .compression import CompressedBlock
+
+
+logger = logging.getLogger(__name__)
+
+_histories = weakref.WeakValueDictionary()  # {id: history}, for limit_memory
+_history_ids = itertools.count()
+_memory_limit = None  # (bytes per column, directory), set by limit_memory
+_block_size = None  # set by use_compression
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def limit_memory(limit, directory):
+    """Limit the memory used by all histories. If a column grows beyond
+    its share of the limit, its older values are moved into
+    memory-mapped files. The limit applies to histories created later,
+    too. It is approximate as pyramids and reallocations are included
+    with an estimate only.
+
+    Args:
+        limit (float): memory limit in bytes.
+        directory (str): directory for the memory-mapped files.
+    """
+    global _memory_limit
+    histories = list(_histories.values())
+    columns = max(sum(len(history) + 2 for history in histories), 1)  # incl. time
+    # raw values incl. reallocation (x2), pyramid levels and the copy of
+    # the most recent values while spilling
+    nbytes = max(int(limit / columns / 4), 65536)
+    os.makedirs(directory, exist_ok=True)
+    logger.info(
+        f"Limiting history memory to {limit / 1e6:.0f} MB "
+        f"({nbytes / 1e3:.0f} kB per column), spilling to {directory}."
+    )
+    _memory_limit = (nbytes, directory)
+    for history in histories:
+        history.limit_memory(nbytes, directory)
+
+
+def use_compression(block_size=1024):
+    """Compress the histories created afterwards in blocks of the given
+    number of values (see multilog.compression). Reading compressed
+    values requires decoding the blocks, which is fast enough for
+    plotting but slower than reading uncompressed arrays.
+
+    Args:
+        block_size (int, optional): number of values per block, None to
+            disable compression. Defaults to 1024.
+    """
+    global _block_size
+    _block_size = block_size
+
+
+class GrowableArray:
+    """One-dimensional numpy array with amortized O(1) append."""
+
+    def __init__(self, capacity=1024, dtype=np.float64):
+        """Allocate the array.
+
+        Args:
+            capacity (int, optional): initial capacity. Defaults to 1024.
+            dtype (numpy.dtype, optional): data type. Defaults to
+                numpy.float64.
+        """
+        self._data = np.empty(max(int(capacity), 1), dtype=dtype)
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def __array__(self, dtype=None, copy=None):
+        view = self.view()
+        if dtype is not None and view.dtype != dtype:
+            return view.astype(dtype)
+        return view
+
+    @property
+    def capacity(self):
+        """Number of values that fit into the array without reallocation."""
+        return len(self._data)
+
+    @property
+    def dtype(self):
+        return self._data.dtype
+
+    def _reserve(self, capacity):
+        """Make sure that the array can hold at least capacity values.
+        The buffer is replaced (not resized in place), views handed out
+        before stay valid."""
+        if capacity <= len(self._data):
+            return
+        new_capacity = max(2 * len(self._data), capacity)
+        data = np.empty(new_capacity, dtype=self._data.dtype)
+        data[: self._length] = self._data[: self._length]
+        self._data = data
+
+    def __setitem__(self, index, value):
+        self._data[: self._length][index] = value
+
+    def clear(self):
+        """Remove all values but keep the memory. Views handed out before
+        are overwritten by values appended afterwards."""
+        self._length = 0
+
+    def append(self, value):
+        """Append a single value."""
+        self._reserve(self._length + 1)
+        self._data[self._length] = value
+        self._length += 1
+
+    def extend(self, values):
+        """Append several values at once."""
+        values = np.asarray(values, dtype=self._data.dtype).ravel()
+        self._reserve(self._length + len(values))
+        self._data[self._length : self._length + len(values)] = values
+        self._length += len(values)
+
+    def view(self, length=None):
+        """Get a read-only view of the stored values.
+
+        Args:
+            length (int, optional): number of values to include.
+                Defaults to all stored values.
+
+        Returns:
+            numpy.array: read-only view (no copy).
+        """
+        if length is None:
+            length = self._length
+        view = self._data[:length]
+        view.flags.writeable = False
+        return view
+
+
+class Column:
+    """Column of a History: optional sealed segments (compressed blocks
+    and / or memory-mapped files) followed by a GrowableArray holding
+    the most recent values in RAM. As long as nothing was sealed the
+    whole column is one contiguous array and reading it does not copy."""
+
+    def __init__(self, capacity=1024, dtype=np.float64, block_size=None):
+        """Create empty column.
+
+        Args:
+            capacity (int, optional): initial capacity of the RAM part.
+                Defaults to 1024.
+            dtype (numpy.dtype, optional): data type. Defaults to
+                numpy.float64.
+            block_size (int, optional): if given, older values are
+                compressed in blocks of this size. Defaults to None.
+        """
+        # replaced as a whole when sealing values, so that readers always
+        # get matching segments, segment starts, offset and tail
+        self._state = ((), (), 0, GrowableArray(capacity, dtype))
+        self._length = 0
+        self._block_size = block_size
+        self._compressed_bytes = 0  # compressed blocks in RAM
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def dtype(self):
+        return self._state[3].dtype
+
+    @property
+    def nbytes(self):
+        """Memory allocated in RAM in bytes."""
+        tail = self._state[3]
+        return tail.capacity * tail.dtype.itemsize + self._compressed_bytes
+
+    @property
+    def in_memory(self):
+        """Size of the values kept in RAM in bytes."""
+        tail = self._state[3]
+        return len(tail) * tail.dtype.itemsize + self._compressed_bytes
+
+    def append(self, value):
+        """Append a single value."""
+        tail = self._state[3]
+        tail.append(value)
+        self._length += 1
+        if self._block_size and len(tail) >= 2 * self._block_size:
+            self._compress()
+
+    def extend(self, values):
+        """Append several values at once."""
+        tail = self._state[3]
+        length = len(tail)
+        tail.extend(values)
+        self._length += len(tail) - length
+        while self._block_size and len(self._state[3]) >= 2 * self._block_size:
+            self._compress()
+
+    def _compress(self):
+        """Move the oldest block of values in RAM into a compressed
+        block."""
+        segments, starts, offset, tail = self._state
+        values = tail.view()
+        block = CompressedBlock(values[: self._block_size])
+        new_tail = GrowableArray(tail.capacity, tail.dtype)
+        new_tail.extend(values[self._block_size :])
+        self._compressed_bytes += block.nbytes
+        self._state = (
+            segments + (block,),
+            starts + (offset,),
+            offset + self._block_size,
+            new_tail,
+        )
+
+    def slice(self, start, stop):
+        """Get the values [start, stop). The caller has to make sure that
+        stop does not exceed the (committed) length.
+
+        Returns:
+            numpy.array: read-only view if the range is in one
+                uncompressed segment or in RAM, a copy otherwise.
+        """
+        segments, starts, offset, tail = self._state
+        stop = max(start, stop)
+        parts = []
+        if start < offset:
+            i = max(bisect.bisect_right(starts, start) - 1, 0)
+            while i < len(segments) and starts[i] < stop:
+                segment = segments[i]
+                end = starts[i] + len(segment)
+                if start < end:
+                    parts.append(
+                        segment[max(start - starts[i], 0) : min(stop, end) - starts[i]]
+                    )
+                i += 1
+        if stop > offset:
+            parts.append(tail.view(stop - offset)[max(start - offset, 0) :])
+        if len(parts) == 1:
+            return parts[0]
+        if not parts:
+            return np.empty(0, dtype=tail.dtype)
+        return np.concatenate(parts)
+
+    def take(self, indices, length):
+        """Get the values at the given indices (all < length).
+
+        Returns:
+            numpy.array: values (copy).
+        """
+        segments, starts, offset, tail = self._state
+        indices = np.asarray(indices, dtype=np.int64)
+        if not segments:
+            return tail.view(length)[indices]
+        values = np.empty(len(indices), dtype=tail.dtype)
+        selected = indices >= offset
+        values[selected] = tail.view(length - offset)[indices[selected] - offset]
+        numbers = np.searchsorted(starts, indices[~selected], side="right") - 1
+        for i in np.unique(numbers):
+            selected = (indices >= starts[i]) & (indices < starts[i] + len(segments[i]))
+            values[selected] = np.asarray(segments[i])[indices[selected] - starts[i]]
+        return values
+
+    def searchsorted(self, value, length, side="left"):
+        """Find the index where value would be inserted into the first
+        length values to maintain order (like numpy.searchsorted). The
+        column has to be sorted, e.g. a time column."""
+        segments, starts, offset, tail = self._state
+        # first segment whose last value is not below value
+        low, high = 0, len(segments)
+        while low < high:
+            middle = (low + high) // 2
+            last = segments[middle][-1]
+            if value < last or (side == "left" and value == last):
+                high = middle
+            else:
+                low = middle + 1
+        # values sealed after length was committed must not be found
+        if low < len(segments):
+            segment = np.asarray(segments[low])
+            return min(starts[low] + int(np.searchsorted(segment, value, side)), length)
+        if length <= offset:
+            return length
+        return offset + int(np.searchsorted(tail.view(length - offset), value, side))
+
+    def spill(self, prefix, keep):
+        """Move values from RAM into a new memory-mapped segment file:
+        the compressed blocks if the column is compressed, all but the
+        most recent values otherwise. Must be called from the writing
+        thread.
+
+        Args:
+            prefix (str): path and file name prefix of the segment files.
+            keep (int): number of uncompressed values to keep in RAM.
+        """
+        segments, starts, offset, tail = self._state
+        filename = f"{prefix}_{len(segments):04}.bin"
+        blocks = [
+            i
+            for i, segment in enumerate(segments)
+            if isinstance(segment, CompressedBlock) and not segment.mapped
+        ]
+        if blocks:
+            with open(filename, "wb") as f:
+                for i in blocks:
+                    f.write(segments[i].tobytes())
+            data = np.memmap(filename, dtype=np.uint8, mode="r")
+            segments = list(segments)
+            position = 0
+            for i in blocks:
+                segments[i] = segments[i].remap(data, position)
+                position += segments[i].nbytes
+            self._state = (tuple(segments), starts, offset, tail)
+            self._compressed_bytes = 0
+            return
+        count = len(tail) - keep
+        if count <= 0 or self._block_size:
+            return
+        values = tail.view()
+        values[:count].tofile(filename)
+        segment = np.memmap(filename, dtype=tail.dtype, mode="r", shape=(count,))
+        new_tail = GrowableArray(tail.capacity, tail.dtype)
+        new_tail.extend(values[count:])
+        self._state = (
+            segments + (segment,),
+            starts + (offset,),
+            offset + count,
+            new_tail,
+        )
+
+
+class Pyramid:
+    """Level-of-detail pyramid (min, max and mean per bucket) of one
+    column, updated incrementally as samples arrive. A bucket of level k
+    aggregates factor**k raw samples, only complete buckets are stored."""
+
+    def __init__(self, factor=8, block_size=None):
+        """Create empty pyramid.
+
+        Args:
+            factor (int, optional): number of buckets / samples
+                aggregated into one bucket of the next level. Defaults
+                to 8.
+            block_size (int, optional): compress the levels in blocks of
+                this size. Defaults to None.
+        """
+        self.factor = factor
+        self.block_size = block_size
+        self.levels = []  # [{"min": Column, "max": ..., "mean": ...}]
+        self._lengths = []  # committed number of buckets per level
+
+    def _add_bucket(self, level, minimum, maximum, mean):
+        if level == len(self.levels):
+            self.levels.append(
+                {
+                    stat: Column(256, block_size=self.block_size)
+                    for stat in ["min", "max", "mean"]
+                }
+            )
+            self._lengths.append(0)
+        buckets = self.levels[level]
+        buckets["min"].append(minimum)
+        buckets["max"].append(maximum)
+        buckets["mean"].append(mean)
+        self._lengths[level] += 1
+        if self._lengths[level] % self.factor == 0:  # next level bucket complete
+            start = self._lengths[level] - self.factor
+            stop = self._lengths[level]
+            self._add_bucket(
+                level + 1,
+                *self._aggregate(
+                    buckets["min"].slice(start, stop),
+                    buckets["max"].slice(start, stop),
+                    buckets["mean"].slice(start, stop),
+                ),
+            )
+
+    def _add_buckets(self, level, minima, maxima, means):
+        """Vectorized _add_bucket for several buckets at once."""
+        if level == len(self.levels):
+            self._add_bucket(level, minima[0], maxima[0], means[0])
+            minima, maxima, means = minima[1:], maxima[1:], means[1:]
+            if len(minima) == 0:
+                return
+        buckets = self.levels[level]
+        buckets["min"].extend(minima)
+        buckets["max"].extend(maxima)
+        buckets["mean"].extend(means)
+        old = self._lengths[level]
+        self._lengths[level] += len(minima)
+        start = old // self.factor * self.factor
+        stop = self._lengths[level] // self.factor * self.factor
+        if stop > start:  # next level buckets complete
+            shape = (-1, self.factor)
+            self._add_buckets(
+                level + 1,
+                *self._aggregate_rows(
+                    buckets["min"].slice(start, stop).reshape(shape),
+                    buckets["max"].slice(start, stop).reshape(shape),
+                    buckets["mean"].slice(start, stop).reshape(shape),
+                ),
+            )
+
+    @staticmethod
+    def _aggregate_rows(minima, maxima, means):
+        """Vectorized _aggregate of the rows of 2D arrays."""
+        finite = np.isfinite(means)
+        count = finite.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            minimum = np.where(finite, minima, np.inf).min(axis=1)
+            maximum = np.where(finite, maxima, -np.inf).max(axis=1)
+            mean = np.where(finite, means, 0).sum(axis=1) / count
+        empty = count == 0
+        minimum[empty] = maximum[empty] = mean[empty] = np.nan
+        return minimum, maximum, mean
+
+    @staticmethod
+    def _aggregate(minima, maxima, means):
+        finite = np.isfinite(means)
+        if not finite.any():
+            return np.nan, np.nan, np.nan
+        return (
+            minima[finite].min(),
+            maxima[finite].max(),
+            means[finite].mean(),
+        )
+
+    def update(self, raw, length):
+        """Add all complete level-1 buckets of the raw data.
+
+        Args:
+            raw (Column): raw values.
+            length (int): number of valid raw values.
+        """
+        done = self.factor * (self._lengths[0] if self._lengths else 0)
+        count = (length - done) // self.factor
+        if count == 1:  # usual case, one sampling appended
+            values = raw.slice(done, done + self.factor)
+            self._add_bucket(0, *self._aggregate(values, values, values))
+        elif count > 1:  # bulk update, e.g. History.extend
+            values = raw.slice(done, done + count * self.factor).reshape(-1, self.factor)
+            self._add_buckets(0, *self._aggregate_rows(values, values, values))
+
+    def bucket_size(self, level):
+        """Number of raw samples in a bucket of the given level (1, 2,
+        ...)."""
+        return self.factor**level
+
+    @property
+    def depth(self):
+        """Number of available levels."""
+        return len(self._lengths)
+
+    def query(self, raw, start, stop, level):
+        """Get min/max envelope of the raw samples [start, stop) using
+        buckets of the given level. Samples not yet aggregated at this
+        level are taken from the finer levels and the raw data.
+
+        Args:
+            raw (Column): raw values.
+            start (int): first sample index.
+            stop (int): sample index after the last sample.
+            level (int): pyramid level (1, 2, ...).
+
+        Returns:
+            tuple(numpy.array, numpy.array): sample indices (bucket
+                centers), values; two points (min, max) per bucket.
+        """
+        indices = []
+        values = []
+        position = start
+        for level in range(min(level, self.depth), 0, -1):
+            size = self.bucket_size(level)
+            first = position // size
+            last = min(self._lengths[level - 1], -(-stop // size))
+            if last <= first:
+                continue
+            centers = np.arange(first, last) * size + size // 2
+            indices.append(np.repeat(centers, 2))
+            values.append(
+                np.column_stack(
+                    (
+                        self.levels[level - 1]["min"].slice(first, last),
+                        self.levels[level - 1]["max"].slice(first, last),
+                    )
+                ).ravel()
+            )
+            position = last * size
+            if position >= stop:
+                break
+        if position < stop:
+            indices.append(np.arange(position, stop))
+            values.append(raw.slice(position, stop))
+        if not indices:
+            return np.arange(0), np.arange(0, dtype=float)
+        return np.concatenate(indices), np.concatenate(values)
+
+
+class Series:
+    """Read-only handle to one column of a History. The length is fixed
+    when the handle is created, so that several handles taken at the
+    same time are consistent. Behaves like a read-only numpy array
+    (np.asarray(series) does not copy unless parts of the column were
+    moved to disk). For long series, prefer slice, take, searchsorted
+    and decimate, which only read the required parts."""
+
+    def __init__(self, column, pyramid, length, time=None):
+        self._column = column
+        self._pyramid = pyramid
+        self._length = length
+        self.time = time  # Series with the relative time of the values
+
+    @classmethod
+    def from_values(cls, values):
+        """Create a series without pyramid from a list or array (copy).
+
+        Args:
+            values (list/numpy.array): values.
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        column = Column(len(values))
+        column.extend(values)
+        return cls(column, None, len(column))
+
+    def __len__(self):
+        return self._length
+
+    def __array__(self, dtype=None, copy=None):
+        view = self.values
+        if dtype is not None and view.dtype != dtype:
+            return view.astype(dtype)
+        return view
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if step == 1:
+                return self.slice(start, stop)
+            return self.values[index]
+        if isinstance(index, (int, np.integer)):
+            if index < 0:
+                index += self._length
+            if not 0 <= index < self._length:
+                raise IndexError("Series index out of range.")
+            return self._column.slice(index, index + 1)[0]
+        return self.take(index)
+
+    @property
+    def values(self):
+        """Read-only numpy array of all values."""
+        return self._column.slice(0, self._length)
+
+    def slice(self, start, stop):
+        """Get the values [start, stop) as read-only numpy array."""
+        stop = min(stop, self._length)
+        return self._column.slice(max(0, min(start, stop)), stop)
+
+    def take(self, indices):
+        """Get the values at the given indices as numpy array."""
+        return self._column.take(indices, self._length)
+
+    def searchsorted(self, value, side="left"):
+        """Find the insertion index of value in a sorted series (like
+        numpy.searchsorted)."""
+        return self._column.searchsorted(value, self._length, side)
+
+    def decimate(self, start=0, stop=None, max_points=2000):
+        """Get the samples [start, stop) reduced to at most about
+        max_points points using the min/max pyramid. If the range is
+        small enough, the raw values are returned.
+
+        Args:
+            start (int, optional): first sample index. Defaults to 0.
+            stop (int, optional): index after the last sample. Defaults
+                to the length of the series.
+            max_points (int, optional): maximum number of points.
+                Defaults to 2000.
+
+        Returns:
+            tuple(numpy.array, numpy.array): sample indices, values.
+        """
+        if stop is None or stop > self._length:
+            stop = self._length
+        start = max(0, min(start, stop))
+        count = stop - start
+        if count <= max_points or self._pyramid is None:
+            return np.arange(start, stop), self._column.slice(start, stop)
+        level = 1
+        while (
+            level < self._pyramid.depth
+            and 2 * count / self._pyramid.bucket_size(level) > max_points
+        ):
+            level += 1
+        return self._pyramid.query(self._column, start, stop, level)
+
+
+def device_histories(devices):
+    """Get the histories of devices. Devices with several histories
+    (dict of History, e.g. the IFM flowmeter) get one entry per history
+    named "{device name} - {key}".
+
+    Args:
+        devices (dict): {device name: device}
+
+    Yields:
+        tuple(str, History): name, history
+    """
+    for device_name, device in devices.items():
+        meas_data = getattr(device, "meas_data", None)
+        if isinstance(meas_data, History):
+            yield device_name, meas_data
+        elif isinstance(meas_data, dict):
+            for key, value in meas_data.items():
+                if isinstance(value, History):
+                    yield f"{device_name} - {key}", value
+
+
+def _to_ns(time_abs):
+    """Convert a timestamp (datetime, numpy.datetime64 or ns) to ns since
+    the epoch."""
+    if isinstance(time_abs, datetime.datetime):
+        if time_abs.tzinfo is None:
+            time_abs = time_abs.astimezone()
+        return (time_abs - _EPOCH) // datetime.timedelta(microseconds=1) * 1000
+    if isinstance(time_abs, np.datetime64):
+        return int(time_abs.astype("datetime64[ns]").astype(np.int64))
+    return int(time_abs)
+
+
+class History(Mapping):
+    """Columnar measurement history of one device. Behaves like a
+    read-only dict {channel name: Series}. A min/max pyramid is
+    maintained for each channel for fast plotting of long time series.
+    Each history stores the time of its samplings, so that devices
+    sampled at different rates or missing samplings keep correct time
+    axes. A history without channels can be used as time base."""
+
+    def __init__(self, channels, capacity=1024):
+        """Create empty history.
+
+        Args:
+            channels (list): channel names.
+            capacity (int, optional): initial capacity of each column.
+                Defaults to 1024.
+        """
+        self._columns = {
+            channel: Column(capacity, block_size=_block_size) for channel in channels
+        }
+        self._pyramids = {channel: Pyramid(block_size=_block_size) for channel in channels}
+        self._time_abs = Column(capacity, np.int64, _block_size)  # ns since epoch
+        self._time_rel = Column(capacity, np.float64, _block_size)  # s
+        self._length = 0
+        self._id = next(_history_ids)
+        self._memory_limit = None
+        _histories[self._id] = self
+        if _memory_limit is not None:
+            self.limit_memory(*_memory_limit)
+
+    def __getitem__(self, channel):
+        length = self._length
+        return Series(
+            self._columns[channel],
+            self._pyramids[channel],
+            length,
+            Series(self._time_rel, None, length),
+        )
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns)
+
+    @property
+    def length(self):
+        """Number of samplings stored in the history."""
+        return self._length
+
+    @property
+    def time(self):
+        """Relative time of the samplings in s (Series)."""
+        return Series(self._time_rel, None, self._length)
+
+    @property
+    def time_abs(self):
+        """Absolute time of the samplings in ns since the epoch (Series
+        of int64)."""
+        return Series(self._time_abs, None, self._length)
+
+    @property
+    def nbytes(self):
+        """Memory allocated in RAM by the history in bytes."""
+        return sum(column.nbytes for _, column in self._all_columns())
+
+    def _all_columns(self):
+        """Yield (file name, column) of the time, the raw data and the
+        pyramid levels."""
+        yield "time-abs", self._time_abs
+        yield "time-rel", self._time_rel
+        for i, (channel, column) in enumerate(self._columns.items()):
+            yield f"{i:03}", column
+            for level, buckets in enumerate(self._pyramids[channel].levels):
+                for stat, bucket_column in buckets.items():
+                    yield f"{i:03}_level{level + 1}-{stat}", bucket_column
+
+    def limit_memory(self, nbytes, directory):
+        """Keep at most about the given number of bytes per column in
+        RAM, older values are moved into memory-mapped files. Usually
+        set for all histories with the module function limit_memory.
+
+        Args:
+            nbytes (int): maximum size of the values of a column in RAM.
+            directory (str): directory for the memory-mapped files.
+        """
+        self._memory_limit = (nbytes, directory)
+
+    def append(self, sampling, time_abs, time_rel):
+        """Append one sampling. Channels missing in the sampling are
+        filled with NaN, values that cannot be converted to float are
+        logged and stored as NaN.
+
+        Args:
+            sampling (dict): {channel name: value}
+            time_abs (datetime): measurement timestamp.
+            time_rel (float): relative time of measurement in s.
+        """
+        self._time_abs.append(_to_ns(time_abs))
+        self._time_rel.append(time_rel)
+        for channel, column in self._columns.items():
+            value = sampling.get(channel, np.nan)
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                logger.error(f"Could not store value {value!r} of {channel}.")
+                value = np.nan
+            column.append(value)
+        self._length += 1  # commit after all columns were written
+        for channel, column in self._columns.items():
+            self._pyramids[channel].update(column, self._length)
+        if self._memory_limit is not None and self._length % 256 == 0:
+            self._spill()
+
+    def extend(self, values, time_abs, time_rel):
+        """Append several samplings at once, e.g. data received from
+        another process (see live module).
+
+        Args:
+            values (dict): {channel name: numpy.array}, missing channels
+                are filled with NaN.
+            time_abs (numpy.array): timestamps in ns since the epoch.
+            time_rel (numpy.array): relative time of measurement in s.
+        """
+        count = len(time_rel)
+        if count == 0:
+            return
+        self._time_abs.extend(np.asarray(time_abs, dtype=np.int64))
+        self._time_rel.extend(time_rel)
+        for channel, column in self._columns.items():
+            if channel in values:
+                column.extend(values[channel])
+            else:
+                column.extend(np.full(count, np.nan))
+        self._length += count  # commit after all columns were written
+        for channel, column in self._columns.items():
+            self._pyramids[channel].update(column, self._length)
+        if (
+            self._memory_limit is not None
+            and self._length // 256 != (self._length - count) // 256
+        ):
+            self._spill()
+
+    def _spill(self):
+        nbytes, directory = self._memory_limit
+        for name, column in self._all_columns():
+            if column.in_memory > nbytes:
+                try:
+                    column.spill(
+                        f"{directory}/history{self._id:02}_{name}",
+                        nbytes // 2 // column.dtype.itemsize,
+                    )
+                except OSError:
+                    logger.exception(f"Could not move history to {directory}.")
+                    self._memory_limit = None  # keep everything in RAM
+                    return
+
+    def snapshot(self):
+        """Get the values of all channels with a common length.
+
+        Returns:
+            dict: {channel name: read-only numpy array}
+        """
+        length = self._length
+        return {
+            channel: column.slice(0, length) for channel, column in self._columns.items()
+        }
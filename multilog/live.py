@@ -0,0 +1,294 @@
+"""Handoff of the measurement data from the acquisition process to GUI
+processes through memory-mapped files.
+
+In headless mode (see main module) the acquisition runs without GUI and
+publishes the histories of the devices and the latest camera images in
+the subdirectory *live* of the output directory. Any number of viewer
+processes (see viewer module) can attach to it, detach, crash or be
+restarted without affecting the recording.
+
+Each history is stored column-wise in segment files of SEGMENT_SIZE
+values, created with their full size so that they never need to be
+remapped. The number of published samplings is stored in a separate
+counter that is only increased after all columns were written, the
+same commit protocol as in the history module. Camera images are
+written into a fixed-size file protected by a sequence counter (odd
+while the image is written), readers discard images for which the
+counter changed while they were copying."""
+import json
+import logging
+import os
+import re
+
+import numpy as np
+
+from .history import History
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SIZE = 65536  # values per segment file
+FRAME_HEADER = 8  # int64 values: sequence, dtype, ndim, shape (3), unused
+FRAME_DTYPES = [np.uint8, np.uint16, np.float32, np.float64]
+
+
+class SegmentedArray:
+    """1D array stored in memory-mapped files of SEGMENT_SIZE values."""
+
+    def __init__(self, prefix, dtype, writable=False):
+        """Open array.
+
+        Args:
+            prefix (str): file path without segment number.
+            dtype (numpy.dtype): data type of the values.
+            writable (bool, optional): create the files (writer). Defaults
+                to False (reader).
+        """
+        self.prefix = prefix
+        self.dtype = np.dtype(dtype)
+        self.writable = writable
+        self.segments = []
+
+    def _segment(self, number):
+        while len(self.segments) <= number:
+            self.segments.append(
+                np.memmap(
+                    f"{self.prefix}_{len(self.segments):04}.bin",
+                    self.dtype,
+                    "w+" if self.writable else "r",
+                    shape=(SEGMENT_SIZE,),
+                )
+            )
+        return self.segments[number]
+
+    def write(self, start, values):
+        """Write values starting at the given position.
+
+        Args:
+            start (int): position of the first value.
+            values (numpy.array): values.
+        """
+        position = 0
+        while position < len(values):
+            number, offset = divmod(start + position, SEGMENT_SIZE)
+            count = min(SEGMENT_SIZE - offset, len(values) - position)
+            self._segment(number)[offset : offset + count] = values[
+                position : position + count
+            ]
+            position += count
+
+    def read(self, start, stop):
+        """Read the values [start, stop).
+
+        Returns:
+            numpy.array: copy of the values.
+        """
+        parts = []
+        while start < stop:
+            number, offset = divmod(start, SEGMENT_SIZE)
+            count = min(SEGMENT_SIZE - offset, stop - start)
+            parts.append(np.array(self._segment(number)[offset : offset + count]))
+            start += count
+        if not parts:
+            return np.empty(0, self.dtype)
+        return np.concatenate(parts)
+
+
+def _directory_name(index, name):
+    return f"{index:02}_{re.sub('[^A-Za-z0-9_.-]', '_', name)}"
+
+
+class LiveWriter:
+    """Publishes histories and camera images (acquisition process)."""
+
+    def __init__(self, directory):
+        """Create the live directory.
+
+        Args:
+            directory (str): directory for the memory-mapped files.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.tables = {}  # name : (columns, counter)
+        self.frames = {}  # name : (header, data)
+
+    def _create(self, name):
+        index = len(self.tables) + len(self.frames)
+        directory = f"{self.directory}/{_directory_name(index, name)}"
+        os.makedirs(directory)
+        return directory
+
+    def _write_manifest(self, directory, manifest):
+        # written last and atomically, readers only open complete entries
+        with open(f"{directory}/manifest.tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(f"{directory}/manifest.tmp", f"{directory}/manifest.json")
+
+    def publish(self, name, history):
+        """Write the samplings added to a history since the last call.
+
+        Args:
+            name (str): name of the history (e.g. device name).
+            history (History): history.
+        """
+        if name not in self.tables:
+            manifest = {"name": name, "type": "history", "channels": list(history)}
+            directory = self._create(name)
+            columns = {
+                "time-abs": SegmentedArray(f"{directory}/time-abs", np.int64, True),
+                "time-rel": SegmentedArray(f"{directory}/time-rel", np.float64, True),
+            }
+            for i, channel in enumerate(history):
+                columns[channel] = SegmentedArray(f"{directory}/{i:03}", np.float64, True)
+            counter = np.memmap(f"{directory}/length.bin", np.int64, "w+", shape=(1,))
+            self._write_manifest(directory, manifest)
+            self.tables[name] = (columns, counter)
+        columns, counter = self.tables[name]
+        start = int(counter[0])
+        stop = history.length
+        if stop <= start:
+            return
+        columns["time-abs"].write(start, history.time_abs.slice(start, stop))
+        columns["time-rel"].write(start, history.time.slice(start, stop))
+        for channel in history:
+            columns[channel].write(start, history[channel].slice(start, stop))
+        counter[0] = stop  # commit after all columns were written
+
+    def publish_frame(self, name, image):
+        """Write the latest image of a camera. The file is sized for the
+        first image, larger images are skipped.
+
+        Args:
+            name (str): name of the camera.
+            image (numpy.array): 2D (grayscale) or 3D (color) image.
+        """
+        image = np.ascontiguousarray(image)
+        if image.dtype not in FRAME_DTYPES:
+            image = image.astype(np.float64)
+        if name not in self.frames:
+            manifest = {"name": name, "type": "frame", "nbytes": image.nbytes}
+            directory = self._create(name)
+            data = np.memmap(
+                f"{directory}/frame.bin",
+                np.uint8,
+                "w+",
+                shape=(FRAME_HEADER * 8 + image.nbytes,),
+            )
+            self._write_manifest(directory, manifest)
+            self.frames[name] = (
+                data[: FRAME_HEADER * 8].view(np.int64),
+                data[FRAME_HEADER * 8 :],
+            )
+        header, data = self.frames[name]
+        if image.nbytes > len(data) or image.ndim > 3:
+            logger.warning(f"Image of {name} does not fit into live frame, skipped.")
+            return
+        header[0] += 1  # odd: writing
+        header[1] = FRAME_DTYPES.index(image.dtype)
+        header[2] = image.ndim
+        header[3:6] = image.shape + (1,) * (3 - image.ndim)
+        data[: image.nbytes] = image.view(np.uint8).ravel()
+        header[0] += 1
+
+
+class LiveReader:
+    """Reads the histories and camera images published by a LiveWriter
+    (GUI process). The histories are copied into local History objects,
+    only new samplings are read with each update."""
+
+    def __init__(self, directory):
+        """Attach to a live directory.
+
+        Args:
+            directory (str): live directory (or output directory of the
+                run containing it).
+        """
+        if os.path.isdir(f"{directory}/live"):
+            directory = f"{directory}/live"
+        self.directory = directory
+        self.histories = {}  # name : History
+        self.frame_names = []
+        self._tables = {}  # name : (columns, counter)
+        self._frames = {}  # name : (header, data)
+        self._known = set()  # entries in the directory
+
+    def _discover(self):
+        """Open new entries of the live directory.
+
+        Returns:
+            list: names of the new histories and cameras.
+        """
+        new = []
+        for entry in sorted(os.listdir(self.directory)):
+            if entry in self._known:
+                continue
+            directory = f"{self.directory}/{entry}"
+            if not os.path.exists(f"{directory}/manifest.json"):
+                continue  # not complete yet
+            with open(f"{directory}/manifest.json", encoding="utf-8") as f:
+                manifest = json.load(f)
+            name = manifest["name"]
+            if manifest["type"] == "history":
+                columns = {
+                    "time-abs": SegmentedArray(f"{directory}/time-abs", np.int64),
+                    "time-rel": SegmentedArray(f"{directory}/time-rel", np.float64),
+                }
+                for i, channel in enumerate(manifest["channels"]):
+                    columns[channel] = SegmentedArray(f"{directory}/{i:03}", np.float64)
+                counter = np.memmap(f"{directory}/length.bin", np.int64, "r", shape=(1,))
+                self._tables[name] = (columns, counter)
+                self.histories[name] = History(manifest["channels"])
+            else:
+                data = np.memmap(f"{directory}/frame.bin", np.uint8, "r")
+                self._frames[name] = (
+                    data[: FRAME_HEADER * 8].view(np.int64),
+                    data[FRAME_HEADER * 8 :],
+                )
+                self.frame_names.append(name)
+            self._known.add(entry)
+            new.append(name)
+        return new
+
+    def update(self):
+        """Read the new samplings of all histories.
+
+        Returns:
+            list: names of histories and cameras published since the
+                last update.
+        """
+        new = self._discover()
+        for name, (columns, counter) in self._tables.items():
+            history = self.histories[name]
+            start = history.length
+            stop = int(counter[0])
+            if stop <= start:
+                continue
+            history.extend(
+                {
+                    channel: column.read(start, stop)
+                    for channel, column in columns.items()
+                    if channel not in ("time-abs", "time-rel")
+                },
+                columns["time-abs"].read(start, stop),
+                columns["time-rel"].read(start, stop),
+            )
+        return new
+
+    def frame(self, name):
+        """Get the latest image of a camera.
+
+        Args:
+            name (str): name of the camera.
+
+        Returns:
+            numpy.array: image, None if no (consistent) image is available.
+        """
+        header, data = self._frames[name]
+        sequence = int(header[0])
+        if sequence == 0 or sequence % 2:
+            return None  # no image yet / being written
+        dtype = np.dtype(FRAME_DTYPES[int(header[1])])
+        shape = tuple(int(n) for n in header[3 : 3 + int(header[2])])
+        image = np.array(data[: dtype.itemsize * int(np.prod(shape))]).view(dtype)
+        if int(header[0]) != sequence:
+            return None  # overwritten while copying
+        return image.reshape(shape)
@@ -2,9 +2,10 @@
 communication between device and visualization and manages the sampling
 loop."""
 from copy import deepcopy
+from functools import partial
 import shutil
 from PyQt5.QtWidgets import QApplication, QMessageBox
-from PyQt5.QtCore import QTimer, QThread, QObject, pyqtSignal
+from PyQt5.QtCore import QCoreApplication, QTimer, QThread, QObject, pyqtSignal
 import numpy as np
 import datetime
 import yaml
@@ -13,8 +14,12 @@ import os
 import subprocess
 import platform
 import logging
+import signal
 import time
 
+from .history import History, device_histories, limit_memory, use_compression
+from . import notification
+
 
 logger = logging.getLogger(__name__)
 
@@ -89,12 +94,15 @@ class Controller(QObject):
     signal_sample_camera = pyqtSignal(dict)  # sample, update view and save
     signal_Vifcon     = pyqtSignal() 
 
-    def __init__(self, config, output_dir) -> None:
+    def __init__(self, config, output_dir, headless=False) -> None:
         """Initialize and run multilog.
 
         Args:
             config (str): File path of configuration file.
             output_dir (str): Directory where to put the output.
+            headless (bool, optional): run without GUI, recording is
+                started immediately and the data is published for
+                viewer processes (see live module). Defaults to False.
         """
         super().__init__()
 
@@ -106,6 +114,10 @@ class Controller(QObject):
         logging.info(f"configuration: {self.config}")
 
         self.output_dir = output_dir
+        self.headless = headless
+        self.live = None  # LiveWriter, set up in init_output_files
+        if self.config["settings"].get("history-compression", False):
+            use_compression()
 
         # do that after logging has been configured to log possible errors
         from .devices.daq6510 import Daq6510
@@ -125,6 +137,7 @@ class Controller(QObject):
         from .devices.vifcon import Vifcon
 
         from .view.main_window import MainWindow
+        from .view.base_classes import LazyWidget
         from .view.daq6510 import Daq6510Widget
         from .view.basler_camera import BaslerCameraWidget
         from .view.ifm_flowmeter import IfmFlowmeterWidget
@@ -160,19 +173,28 @@ class Controller(QObject):
             self.config["settings"]["dt-camera-update"]
         )
         self.timer_update_camera.timeout.connect(self.update_camera)
+        # refresh of the plots, independent of the sampling
+        self.timer_update_view = QTimer()
+        self.timer_update_view.setInterval(self.config["settings"].get("dt-view", 500))
+        self.timer_update_view.timeout.connect(self.refresh_view)
+        self.pending_view = {}  # device name : (sampling started, data)
+        self.camera_refresh_pending = False
 
         # time information is stored globally
         # TODO this may be the reason for the race condition in IFM-flowmeter sampling
         self.start_time = None
-        self.abs_time = []
-        self.rel_time = []
+        self.time = History([])  # time base of the main sampling loop
 
         # setup main window
-        app = QApplication(sys.argv)
-        self.main_window = MainWindow(self.start, self.exit)
-        if app.desktop().screenGeometry().width() == 1280:
-            self.main_window.resize(1180, 900)
-            self.main_window.move(10, 10)
+        if headless:
+            app = QCoreApplication(sys.argv)
+            self.main_window = None
+        else:
+            app = QApplication(sys.argv)
+            self.main_window = MainWindow(self.start, self.exit)
+            if app.desktop().screenGeometry().width() == 1280:
+                self.main_window.resize(1180, 900)
+                self.main_window.move(10, 10)
 
         # setup devices & tabs
         self.devices = {}
@@ -188,51 +210,51 @@ class Controller(QObject):
             if not skip: 
                 if "DAQ-6510" in device_name:
                     device = Daq6510(self.config["devices"][device_name], device_name)
-                    widget = Daq6510Widget(device)
+                    widget_class = Daq6510Widget
                 elif "IFM-flowmeter" in device_name:
                     device = IfmFlowmeter(self.config["devices"][device_name], device_name)
-                    widget = IfmFlowmeterWidget(device)
+                    widget_class = IfmFlowmeterWidget
                 elif "Eurotherm" in device_name:
                     device = Eurotherm(self.config["devices"][device_name], device_name)
-                    widget = EurothermWidget(device)
+                    widget_class = EurothermWidget
                 elif "Optris-IP-640" in device_name:
                     device = OptrisIP640(self.config["devices"][device_name], device_name)
-                    widget = OptrisIP640Widget(device)
+                    widget_class = OptrisIP640Widget
                     self.cameras.append(device_name)
                 elif ("IGA-6-23" in device_name or "IGAR-6-adv" in device_name):
                     device = PyrometerLumasense(
                         self.config["devices"][device_name], device_name
                     )
-                    widget = PyrometerLumasenseWidget(device)
+                    widget_class = PyrometerLumasenseWidget
                 elif "Series-600" in device_name:
                     device = PyrometerArrayLumasense(
                         self.config["devices"][device_name], device_name
                     )
-                    widget = PyrometerArrayLumasenseWidget(device)
+                    widget_class = PyrometerArrayLumasenseWidget
                 elif "Basler" in device_name:
                     device = BaslerCamera(self.config["devices"][device_name], device_name)
-                    widget = BaslerCameraWidget(device)
+                    widget_class = BaslerCameraWidget
                     self.cameras.append(device_name)
                 elif "Process-Condition-Logger" in device_name:
                     device = ProcessConditionLogger(
                         self.config["devices"][device_name], device_name
                     )
-                    widget = ProcessConditionLoggerWidget(device)
+                    widget_class = ProcessConditionLoggerWidget
                 elif "Vifcon_achsen" in device_name:
                     device = Vifcon_achsen(self.config["devices"][device_name], device_name)
-                    widget = Vifcon_achsenWidget(device)
+                    widget_class = Vifcon_achsenWidget
                 elif "Vifcon_gase" in device_name:
                     device = Vifcon_gase(self.config["devices"][device_name], device_name)
-                    widget = Vifcon_gaseWidget(device)
+                    widget_class = Vifcon_gaseWidget
                 elif "Vifcon_generator" in device_name:
                     device = Vifcon_generator(self.config["devices"][device_name], device_name)
-                    widget = Vifcon_generatorWidget(device)
+                    widget_class = Vifcon_generatorWidget
                 elif "Dias" in device_name:
                     device = PyrometerDias(self.config["devices"][device_name], device_name)
-                    widget = PyrometerDiasWidget(device)
+                    widget_class = PyrometerDiasWidget
                 elif "Keysight" in device_name:
                     device = Keysight(self.config["devices"][device_name], device_name)
-                    widget = KeysightWidget(device)
+                    widget_class = KeysightWidget
                 #######################
                 # add new devices here!
                 #######################
@@ -240,13 +262,16 @@ class Controller(QObject):
                     raise ValueError(f"unknown device {device_name} in config file.")
 
                 self.devices.update({device_name: device})
+                if not headless:
+                    # the widget is created when the tab is shown the first time
+                    widget = LazyWidget(partial(widget_class, device))
 
-                if "Basler" in device_name:
-                    self.main_window.add_tab(widget, f"{device_name} ({device._model_number})") # widget name is the name of the Basler camera model number, not just the name in the config
-                else:
-                    self.main_window.add_tab(widget, device_name) # config-name for all other devices except Basler cameras
+                    if "Basler" in device_name:
+                        self.main_window.add_tab(widget, f"{device_name} ({device._model_number})") # widget name is the name of the Basler camera model number, not just the name in the config
+                    else:
+                        self.main_window.add_tab(widget, device_name) # config-name for all other devices except Basler cameras
 
-                self.tabs.update({device_name: widget})
+                    self.tabs.update({device_name: widget})
 
                 ### VIFCON CONECTION
                 # Ist der Port Null, wird keine Verbindung hergestellt:
@@ -291,31 +316,141 @@ class Controller(QObject):
             self.signal_Vifcon.connect(self.VifconLink.event_Loop)
             self.signal_Vifcon.emit()
 
+        # notifications about alerts (e.g. leakage), sent in the background;
+        # discord bot by default for the flow balance
+        if "notifications" in self.config["settings"] or any(
+            "flow-balance" in self.config["devices"][name] for name in self.devices
+        ):
+            notification.setup(self.config["settings"].get("notifications"))
+
+        # optional live view in the browser
+        self.dashboard = None
+        if "dashboard" in self.config["settings"]:
+            from .dashboard import Dashboard
+
+            dashboard_config = self.config["settings"]["dashboard"] or {}
+            try:
+                self.dashboard = Dashboard(
+                    self.devices,
+                    dashboard_config.get("host", "0.0.0.0"),
+                    dashboard_config.get("port", 8080),
+                    dashboard_config.get("max-points", 1000),
+                    dashboard_config.get("dt", 1000),
+                )
+                self.dashboard.start()
+            except OSError:
+                logger.exception("Could not start dashboard.")
+                self.dashboard = None
+
         # run
         for thread in self.threads:
             thread.start()      
-        self.timer_update_main.start()
-        self.timer_update_camera.start()
-        self.main_window.show()
+        if headless:
+            # stop with Ctrl+C / kill, the timer gives the python
+            # interpreter the chance to handle the signals
+            signal.signal(signal.SIGINT, lambda *args: self.exit())
+            signal.signal(signal.SIGTERM, lambda *args: self.exit())
+            self.timer_signals = QTimer()
+            self.timer_signals.timeout.connect(lambda: None)
+            self.timer_signals.start(500)
+            self.update_main()  # for the checks in start
+            QTimer.singleShot(0, self.start)
+        else:
+            self.main_window.tab_widget.currentChanged.connect(
+                lambda index: self.refresh_view()
+            )
+            self.timer_update_main.start()
+            self.timer_update_camera.start()
+            self.timer_update_view.start()
+            self.main_window.show()
         sys.exit(app.exec())
 
     def update_view(self, device_sampling):
-        """Update the view for selected devices. This is called by the
-        Sampler class's update function (using a signal).
+        """Store new data of selected devices for the next refresh of the
+        view. This is called by the Sampler class's update function
+        (using a signal). Cameras are shown immediately, the other
+        devices with the next tick of timer_update_view.
 
         Args:
             device_sampling (dict): {device-name: sampling}
         """
-        try:
-            for device in device_sampling:
-                logger.debug(f"updating view {device}")
-                if not self.sampling_started:
-                    self.tabs[device].set_initialization_data(device_sampling[device])
+        if self.live is not None and self.sampling_started:
+            self.publish(device_sampling)
+        if self.headless:
+            return
+        for device in device_sampling:
+            self.pending_view[device] = (
+                self.sampling_started,
+                device_sampling[device],
+            )
+        if not self.camera_refresh_pending and any(
+            device in self.cameras for device in device_sampling
+        ):
+            # images that arrive while the GUI is busy replace each other
+            # in pending_view and only the latest one is shown
+            self.camera_refresh_pending = True
+            QTimer.singleShot(0, self.refresh_cameras)
+
+    def publish(self, device_sampling):
+        """Publish new measurement data for viewer processes.
+
+        Args:
+            device_sampling (dict): {device-name: measurement data}
+        """
+        for device in device_sampling:
+            try:
+                if device in self.cameras:
+                    image = device_sampling[device]
+                    if hasattr(self.devices[device], "to_temperature"):  # raw IR image
+                        image = self.devices[device].to_temperature(image).astype(
+                            np.float32
+                        )
+                    self.live.publish_frame(device, image)
                 else:
-                    self.tabs[device].set_measurement_data(
-                        self.rel_time, device_sampling[device]
-                    )
-                logger.debug(f"updated view {device}")
+                    for name, history in device_histories(
+                        {device: self.devices[device]}
+                    ):
+                        self.live.publish(name, history)
+            except Exception:
+                logger.exception(f"Error in publishing data of {device}")
+
+    def refresh_cameras(self):
+        """Show the latest images of the cameras."""
+        self.camera_refresh_pending = False
+        self.refresh_view(self.cameras)
+
+    def refresh_view(self, devices=None):
+        """Update the view of the devices with new data. Only visible tabs
+        are updated, hidden tabs keep their data pending until they are
+        shown. Called by timer_update_view and if the tab is changed.
+
+        Args:
+            devices (list, optional): devices to be updated. Defaults to
+                all devices with pending data.
+        """
+        if devices is None:
+            devices = list(self.pending_view)
+        for device in devices:
+            if self.tabs[device].isVisible():
+                self.update_tab(device)
+
+    def update_tab(self, device):
+        """Show the pending data of a device in its tab. The tab's widget
+        is created if it was not shown before.
+
+        Args:
+            device (str): device name
+        """
+        if device not in self.pending_view:
+            return
+        sampling_started, data = self.pending_view.pop(device)
+        try:
+            logger.debug(f"updating view {device}")
+            if not sampling_started:
+                self.tabs[device].widget.set_initialization_data(data)
+            else:
+                self.tabs[device].widget.set_measurement_data(self.time.time, data)
+            logger.debug(f"updated view {device}")
         except Exception as e:
             logger.exception(f"Error in updating view of {device}")
 
@@ -327,7 +462,9 @@ class Controller(QObject):
         if "IFM-flowmeter" in self.devices:
             logger.info("Checking if water flow greater zero.")
             for sensor, flow in self.devices["IFM-flowmeter"].last_sampling["Flow"].items():
-                if flow == 0:
+                if flow == 0 and self.headless:
+                    logger.warning(f"No cooling water flow at sensor {sensor}.")
+                elif flow == 0:
                     QMessageBox.warning(
                         self.main_window,
                         "Warning!",
@@ -337,7 +474,13 @@ class Controller(QObject):
         logger.info("Start sampling.")
         self.init_output_files()
         self.start_time = datetime.datetime.now(datetime.timezone.utc).astimezone()
-        self.main_window.set_start_time(self.start_time.strftime("%d.%m.%Y, %H:%M:%S"))
+        if not self.headless:
+            self.main_window.set_start_time(self.start_time.strftime("%d.%m.%Y, %H:%M:%S"))
+        if self.dashboard is not None:
+            self.dashboard.set_info(
+                start=self.start_time.strftime("%d.%m.%Y, %H:%M:%S"),
+                directory=self.directory,
+            )
         self.sampling_started = True
         self.timer_measurement_main.start()
         self.sample_main()
@@ -361,12 +504,16 @@ class Controller(QObject):
         logger.debug("Stopped timer_measurement_main")
         self.timer_measurement_camera.stop()
         logger.debug("Stopped timer_measurement_camera")
+        self.timer_update_view.stop()
+        if self.dashboard is not None:
+            self.dashboard.stop()
         logger.debug("Waiting 1s for threads to finish")
         time.sleep(1)  # to finish last sampling jobs (running in separate threads)
         for thread in self.threads:
             logger.debug(f"Quitting thread {thread}")
             thread.quit()
         logger.info("Stopped sampling")
+        notification.stop()
         exit()
 
     def init_output_files(self):
@@ -388,7 +535,18 @@ class Controller(QObject):
             "./multilog/nomad/base_classes.schema.archive.yaml",
             f"{self.directory}/base_classes.schema.archive.yaml",
         )
-        self.main_window.set_output_directory(self.directory)
+        if not self.headless:
+            self.main_window.set_output_directory(self.directory)
+        if self.headless or self.config["settings"].get("live-store", False):
+            from .live import LiveWriter
+
+            self.live = LiveWriter(f"{self.directory}/live")
+            logger.info(f"Live data for viewers in {self.live.directory}")
+        if "history-memory-limit" in self.config["settings"]:
+            limit_memory(
+                self.config["settings"]["history-memory-limit"] * 1e6,
+                f"{self.directory}/history",
+            )
 
     def write_nomad_file(self):
         """Write main multilog.archive.yaml including an overview of all devices."""
@@ -474,11 +632,9 @@ class Controller(QObject):
         update function of the Sampler objects (running in their
         respective threads)."""
         logger.info("update main")
-        self.main_window.set_current_time(datetime.datetime.now().strftime("%H:%M:%S"))
+        if not self.headless:
+            self.main_window.set_current_time(datetime.datetime.now().strftime("%H:%M:%S"))
         self.signal_update_main.emit()
-        if "IFM-flowmeter" in self.devices:
-            flowmeter = self.devices["IFM-flowmeter"]
-            flowmeter.check_leakage()
 
     def update_camera(self):
         """Function that triggers graphics update for cameras (without saving).
@@ -496,13 +652,10 @@ class Controller(QObject):
         logger.info("sample main")
         time_abs = datetime.datetime.now(datetime.timezone.utc).astimezone()
         time_rel = round((time_abs - self.start_time).total_seconds(), 3)
-        self.abs_time.append(time_abs)
-        self.rel_time.append(time_rel)
-        self.main_window.set_current_time(f"{time_abs:%H:%M:%S}")
+        self.time.append({}, time_abs, time_rel)
+        if not self.headless:
+            self.main_window.set_current_time(f"{time_abs:%H:%M:%S}")
         self.signal_sample_main.emit({"time_abs": time_abs, "time_rel": time_rel})
-        if "IFM-flowmeter" in self.devices:
-            flowmeter = self.devices["IFM-flowmeter"]
-            flowmeter.check_leakage()
 
     def sample_camera(self):
         """Function that triggers sampling & saving of data for cameras.
@@ -519,60 +672,63 @@ class Controller(QObject):
         except: logging.error(f"Resetting the zoom of {plotName} was not possible.")
 
     def saveScreenshot(self):
-        if self.sampling_started == True: # only taking screenshots if sampling has started
+        if self.headless:
+            logger.debug("No screenshots were saved, running headless.")
+        elif self.sampling_started == True: # only taking screenshots if sampling has started
             errors = 0
             
             for tab in self.tabs:                                      # iterate over all device tabs
-                if "tab_widget" in dir(self.tabs[tab]):                # check if sub tabs exist
+                self.update_tab(tab)                                   # also creates the widget if the tab was never shown
+                if "tab_widget" in dir(self.tabs[tab].widget):                # check if sub tabs exist
                     
                     if "DAQ-6510" in tab:
                         try:
-                            for plot_widget in self.tabs[tab].plot_widgets:
-                                self.tabs[tab].plot_widgets[plot_widget].plot.autoRange()
+                            for plot_widget in self.tabs[tab].widget.plot_widgets:
+                                self.tabs[tab].widget.plot_widgets[plot_widget].widget.plot.autoRange()
                         except: logging.error(f"Resetting the zoom of {tab} was not possible.")
 
                     if "Eurotherm" in tab:
-                        self.resetZoom(self.tabs[tab].temperature_widget)
-                        self.resetZoom(self.tabs[tab].op_widget)
+                        self.resetZoom(self.tabs[tab].widget.temperature_widget)
+                        self.resetZoom(self.tabs[tab].widget.op_widget)
 
                     if "IFM-flowmeter" in tab:
-                        self.resetZoom(self.tabs[tab].flow_widget)
-                        self.resetZoom(self.tabs[tab].temperature_widget)
+                        self.resetZoom(self.tabs[tab].widget.flow_widget)
+                        self.resetZoom(self.tabs[tab].widget.temperature_widget)
 
                     if "Keysight" in tab:
-                        self.resetZoom(self.tabs[tab].voltage_widget)
-                        self.resetZoom(self.tabs[tab].frequency_widget)
+                        self.resetZoom(self.tabs[tab].widget.voltage_widget)
+                        self.resetZoom(self.tabs[tab].widget.frequency_widget)
 
                     if "Vifcon_achsen" in tab:
-                        self.resetZoom(self.tabs[tab].distance_widget)
-                        self.resetZoom(self.tabs[tab].velocity_widget)
+                        self.resetZoom(self.tabs[tab].widget.distance_widget)
+                        self.resetZoom(self.tabs[tab].widget.velocity_widget)
 
                     if "Vifcon_gase" in tab:
-                        self.resetZoom(self.tabs[tab].flow_widget)
-                        self.resetZoom(self.tabs[tab].pressure_widget)
-                        self.resetZoom(self.tabs[tab].freq_widget)
+                        self.resetZoom(self.tabs[tab].widget.flow_widget)
+                        self.resetZoom(self.tabs[tab].widget.pressure_widget)
+                        self.resetZoom(self.tabs[tab].widget.freq_widget)
 
                     if "Vifcon_generator" in tab:
-                        self.resetZoom(self.tabs[tab].percantage_widget)
-                        self.resetZoom(self.tabs[tab].freq_widget)
+                        self.resetZoom(self.tabs[tab].widget.percantage_widget)
+                        self.resetZoom(self.tabs[tab].widget.freq_widget)
 
                     ### ### ### ### ### ### ### 
                     ## Add new device here!  ##
                     ### ### ### ### ### ### ###
 
-                    for i in range(self.tabs[tab].tab_widget.count()): # iterate over all tabs of the current device
+                    for i in range(self.tabs[tab].widget.tab_widget.count()): # iterate over all tabs of the current device
                         try:
-                            self.main_window.setCentralWidget(self.tabs[tab].tab_widget.setCurrentIndex(i)) # this line brings the selected tab to the foreground
-                            screenshot = self.tabs[tab].grab()                    # taking screenshot
+                            self.main_window.setCentralWidget(self.tabs[tab].widget.tab_widget.setCurrentIndex(i)) # this line brings the selected tab to the foreground
+                            screenshot = self.tabs[tab].widget.grab()                    # taking screenshot
                             screenshot.save(f'{self.directory}/screenshot-{tab}-{i}.png', 'png') # saving screenshot
                         except Exception as e:
                             errors = errors + 1
                             logger.error(f"Screenshot of tab {tab}-{i}, can not be saved: {e}")
                 else: # if no sub tabs exist
                     try:
-                        if tab != "Process-Condition-Logger": self.resetZoom(self.tabs[tab]) # "Process-Condition-Logger" has no plot, and can therefore not reset the zoom
-                        self.main_window.setCentralWidget(self.tabs[tab]) # this line brings the selected tab to the foreground
-                        screenshot = self.tabs[tab].grab()                # taking screenshot
+                        if tab != "Process-Condition-Logger": self.resetZoom(self.tabs[tab].widget) # "Process-Condition-Logger" has no plot, and can therefore not reset the zoom
+                        self.main_window.setCentralWidget(self.tabs[tab].widget) # this line brings the selected tab to the foreground
+                        screenshot = self.tabs[tab].widget.grab()                # taking screenshot
                         screenshot.save(f'{self.directory}/screenshot-{tab}.png', 'png') # saving screenshot
                     except Exception as e:
                         errors = errors + 1
@@ -582,11 +738,12 @@ class Controller(QObject):
         else:
             logger.debug("No screenshots were saved, sampling was not started.")
 
-def main(config, output_dir):
+def main(config, output_dir, headless=False):
     """Execute this function to run multilog.
 
     Args:
         config (str): File path of configuration file.
         output_dir (str): Directory where to put the output.
+        headless (bool, optional): run without GUI. Defaults to False.
     """
-    ctrl = Controller(config, output_dir)
+    ctrl = Controller(config, output_dir, headless)
@@ -0,0 +1,412 @@
+"""Notifications about alerts, e.g., a possible cooling water leakage.
+
+Devices report the state of an alert with alert(), which only puts it
+into a queue and returns immediately, so that sampling and GUI are never
+blocked by sending messages. A background thread decides which messages
+are sent and sends them with the configured backends (Discord, e-mail,
+webhook, file, socket). The backends connect on their first message and
+keep the connection open afterwards.
+
+Each alert is identified by a key and is either active or inactive:
+
+- hysteresis: an alert is raised after raise-count consecutive active
+  reports and resolved after clear-count consecutive inactive reports.
+- deduplication: only the changes of the state are sent, while an
+  alert stays active a reminder is sent every repeat seconds.
+- rate limit: at most max-messages messages are sent within
+  rate-period seconds, further messages are dropped and counted.
+
+The notifications are configured with setup() (settings section
+notifications of the config-file):
+
+    setup({"file": {"path": "alerts.log"}, "repeat": 600})
+    alert("leakage", "There may be a cooling water leakage.")
+    alert("leakage", "Flow balance ok.", active=False)
+"""
+import asyncio
+import collections
+import datetime
+from email.message import EmailMessage
+import logging
+import os
+from os.path import expanduser
+import queue
+import smtplib
+import socket
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# required for webhook
+try:
+    import requests
+except Exception as e:
+    logger.warning("Could not import requests.", exc_info=True)
+# required for discord bot
+try:
+    from dotenv import load_dotenv
+except Exception as e:
+    logger.warning("Could not import dotenv.", exc_info=True)
+try:
+    import discord
+except Exception as e:
+    logger.warning("Could not import discord.", exc_info=True)
+
+_notifier = None  # Notifier, set by setup
+
+
+class FileBackend:
+    """Append the messages to a text file (e.g. for testing)."""
+
+    def __init__(self, config):
+        """Args:
+        config (dict): path (default: alerts.log).
+        """
+        self.path = config.get("path", "alerts.log")
+        self.file = None
+
+    def send(self, text):
+        if self.file is None:
+            self.file = open(self.path, "a", encoding="utf-8")
+        self.file.write(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} {text}\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class SocketBackend:
+    """Send the messages as lines of text over a TCP connection (e.g. for
+    testing with netcat: nc -lk 9999)."""
+
+    def __init__(self, config):
+        """Args:
+        config (dict): host (default: localhost), port (default: 9999),
+            timeout in s (default: 5).
+        """
+        self.address = (config.get("host", "localhost"), config.get("port", 9999))
+        self.timeout = config.get("timeout", 5)
+        self.socket = None
+
+    def send(self, text):
+        if self.socket is None:
+            self.socket = socket.create_connection(self.address, self.timeout)
+        self.socket.sendall(f"{text}\n".encode("utf-8"))
+
+    def close(self):
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+
+
+class WebhookBackend:
+    """Post the messages as JSON to a webhook (e.g. Discord, Slack,
+    Mattermost, Teams) using a persistent HTTP connection."""
+
+    def __init__(self, config):
+        """Args:
+        config (dict): url, field of the message in the JSON data
+            (default: content, Slack / Mattermost: text), timeout in s
+            (default: 10).
+        """
+        self.url = config["url"]
+        self.field = config.get("field", "content")
+        self.timeout = config.get("timeout", 10)
+        self.session = None
+
+    def send(self, text):
+        if self.session is None:
+            self.session = requests.Session()
+        r = self.session.post(self.url, json={self.field: text}, timeout=self.timeout)
+        r.raise_for_status()
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+
+class SmtpBackend:
+    """Send the messages by e-mail, the connection to the server is kept
+    open (and reestablished if it was closed by the server)."""
+
+    def __init__(self, config):
+        """Args:
+        config (dict): host, port (default: 587), user, password (or
+            environment variable SMTP_PASSWORD), from, to (address or
+            list of addresses), starttls (default: True), subject
+            (default: multilog notification), timeout in s (default: 30).
+        """
+        self.host = config["host"]
+        self.port = config.get("port", 587)
+        self.user = config.get("user")
+        self.password = config.get("password", os.getenv("SMTP_PASSWORD"))
+        self.sender = config.get("from", self.user)
+        self.recipients = config["to"]
+        if isinstance(self.recipients, str):
+            self.recipients = [self.recipients]
+        self.starttls = config.get("starttls", True)
+        self.subject = config.get("subject", "multilog notification")
+        self.timeout = config.get("timeout", 30)
+        self.smtp = None
+
+    def connect(self):
+        self.smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            self.smtp.starttls()
+        if self.user is not None:
+            self.smtp.login(self.user, self.password)
+
+    def send(self, text):
+        if self.smtp is not None:
+            try:
+                self.smtp.noop()
+            except smtplib.SMTPException:
+                self.smtp = None  # closed by the server
+        if self.smtp is None:
+            self.connect()
+        message = EmailMessage()
+        message["Subject"] = self.subject
+        message["From"] = self.sender
+        message["To"] = ", ".join(self.recipients)
+        message.set_content(text)
+        self.smtp.send_message(message)
+
+    def close(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except smtplib.SMTPException:
+                pass
+            self.smtp = None
+
+
+class DiscordBackend:
+    """Discord bot on a pre-configured computer, the token and channel id
+    are read from an env file (DISCORD_TOKEN, DISCORD_CHANNEL). The bot
+    logs in once and stays connected, running its event loop in a
+    separate thread. Refer to the discord docs for additional
+    information."""
+
+    def __init__(self, config):
+        """Args:
+        config (dict): env-file (default: ~/discord.env), timeout in s
+            (default: 30).
+        """
+        self.env_file = expanduser(config.get("env-file", "~/discord.env"))
+        self.timeout = config.get("timeout", 30)
+        self.thread = None
+        self.client = None
+        self.loop = None
+        self.ready = threading.Event()
+
+    def connect(self):
+        load_dotenv(self.env_file)
+        token = os.getenv("DISCORD_TOKEN")
+        self.channel_id = int(os.getenv("DISCORD_CHANNEL"))
+        self.ready.clear()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self._run, args=(token,), name="discord", daemon=True
+        )
+        self.thread.start()
+        if not self.ready.wait(self.timeout):
+            raise TimeoutError("Discord bot could not log in.")
+
+    def _run(self, token):
+        asyncio.set_event_loop(self.loop)
+        kwargs = {}
+        if hasattr(discord, "Intents"):
+            kwargs["intents"] = discord.Intents.default()
+        self.client = discord.Client(**kwargs)
+
+        @self.client.event
+        async def on_ready():
+            self.ready.set()
+
+        try:
+            self.loop.run_until_complete(self.client.start(token))
+        except Exception:
+            logger.exception("Discord bot stopped.")
+        finally:
+            self.ready.clear()
+
+    def send(self, text):
+        if self.thread is None or not self.thread.is_alive():
+            self.connect()
+        channel = self.client.get_channel(self.channel_id)
+        future = asyncio.run_coroutine_threadsafe(channel.send(text), self.loop)
+        future.result(self.timeout)
+
+    def close(self):
+        if self.thread is not None and self.thread.is_alive():
+            future = asyncio.run_coroutine_threadsafe(self.client.close(), self.loop)
+            try:
+                future.result(self.timeout)
+            except Exception:
+                logger.exception("Could not close discord bot.")
+            self.thread.join(self.timeout)
+        self.thread = None
+
+
+BACKENDS = {
+    "discord": DiscordBackend,
+    "smtp": SmtpBackend,
+    "webhook": WebhookBackend,
+    "file": FileBackend,
+    "socket": SocketBackend,
+}
+
+
+class Notifier:
+    """Queue and background thread evaluating and sending the alerts."""
+
+    def __init__(self, config):
+        """Create the backends.
+
+        Args:
+            config (dict): backends ({name: backend config}, see BACKENDS)
+                and the optional settings raise-count (default: 1),
+                clear-count (default: 3), repeat in s (default: 3600,
+                0: no reminders), max-messages (default: 10) and
+                rate-period in s (default: 3600).
+        """
+        self.raise_count = config.get("raise-count", 1)
+        self.clear_count = config.get("clear-count", 3)
+        self.repeat = config.get("repeat", 3600)
+        self.max_messages = config.get("max-messages", 10)
+        self.rate_period = config.get("rate-period", 3600)
+        self.backends = {}
+        for name in BACKENDS:
+            if name in config:
+                try:
+                    self.backends[name] = BACKENDS[name](config[name] or {})
+                except Exception:
+                    logger.exception(f"Could not set up {name} notifications.")
+        self.alerts = {}  # key : {active, count, message, sent}
+        self.sent = collections.deque()  # times of the sent messages
+        self.suppressed = 0
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="notifier", daemon=True)
+
+    def start(self):
+        logger.info(f"Sending notifications with {', '.join(self.backends)}.")
+        self.thread.start()
+
+    def stop(self, timeout=5):
+        """Send the remaining messages and close the connections.
+
+        Args:
+            timeout (float, optional): maximum time to wait in s.
+                Defaults to 5.
+        """
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+    def alert(self, key, message, active=True):
+        """Report the state of an alert (non-blocking)."""
+        self.queue.put((time.monotonic(), key, message, active))
+
+    def run(self):
+        """Process the reported alerts until stopped."""
+        while True:
+            try:
+                item = self.queue.get(timeout=1)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                self.update(*item)
+            self.remind(time.monotonic())
+        for backend in self.backends.values():
+            backend.close()
+
+    def update(self, now, key, message, active):
+        """Apply the hysteresis to a reported state, send a message if
+        the alert was raised or resolved."""
+        if key not in self.alerts:
+            self.alerts[key] = {"active": False, "count": 0, "message": "", "sent": 0}
+        alert = self.alerts[key]
+        if active == alert["active"]:
+            alert["count"] = 0
+            if active:
+                alert["message"] = message  # latest values for reminders
+            return
+        alert["count"] += 1
+        if alert["count"] < (self.raise_count if active else self.clear_count):
+            return
+        alert.update({"active": active, "count": 0, "message": message, "sent": now})
+        self.send(now, f"ALERT: {message}" if active else f"RESOLVED: {message}")
+
+    def remind(self, now):
+        """Send reminders for alerts that are still active."""
+        if not self.repeat:
+            return
+        for alert in self.alerts.values():
+            if alert["active"] and now - alert["sent"] >= self.repeat:
+                alert["sent"] = now
+                self.send(now, f"STILL ACTIVE: {alert['message']}")
+
+    def send(self, now, text):
+        """Send a message with all backends, if the rate limit allows it."""
+        while self.sent and now - self.sent[0] > self.rate_period:
+            self.sent.popleft()
+        if len(self.sent) >= self.max_messages:
+            self.suppressed += 1
+            logger.warning(f"Notification rate limit reached, dropped '{text}'")
+            return
+        self.sent.append(now)
+        if self.suppressed:
+            text += f"\n({self.suppressed} notifications dropped due to rate limit)"
+            self.suppressed = 0
+        logger.info(f"Sending notification '{text}'")
+        for name, backend in self.backends.items():
+            try:
+                backend.send(text)
+            except Exception:
+                logger.exception(f"Could not send {name} notification.")
+                try:
+                    backend.close()  # reconnect with next message
+                except Exception:
+                    pass
+
+
+def setup(config=None):
+    """Start sending notifications.
+
+    Args:
+        config (dict, optional): notification settings, see Notifier.
+            Defaults to None (discord bot).
+    """
+    global _notifier
+    if _notifier is not None:
+        _notifier.stop()
+    _notifier = Notifier(config or {"discord": {}})
+    _notifier.start()
+
+
+def alert(key, message, active=True):
+    """Report the state of an alert. Returns immediately, the message is
+    sent in the background if required. Does nothing if notifications
+    were not set up.
+
+    Args:
+        key (str): identifier of the alert.
+        message (str): message describing the current state.
+        active (bool, optional): alert condition fulfilled. Defaults to
+            True.
+    """
+    if _notifier is not None:
+        _notifier.alert(key, message, active)
+
+
+def stop():
+    """Send the remaining messages and close the connections."""
+    global _notifier
+    if _notifier is not None:
+        _notifier.stop()
+        _notifier = None
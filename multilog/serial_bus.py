@@ -0,0 +1,327 @@
+"""Shared serial ports for several devices on one RS485 bus, e.g.,
+daisy-chained pyrometers and controllers on a single converter.
+
+The devices get the bus of their port with get_bus(); the port is
+opened once with the settings of the first device. All communication
+is done in transactions: a device waiting for the bus gets it after the
+running transaction, devices with a higher priority first (same
+priority: first come, first served).
+
+    with self.bus.transaction(self.bus_priority, self.name) as serial:
+        serial.write(request)
+        response = serial.readline()
+
+Simple request-response exchanges (CR / LF terminated) can be sent with
+query(). If several devices query at the same time and allow it, their
+requests are written at once and the responses are read in order, which
+takes about one round trip instead of one per device. If a response is
+missing, the requests of the batch are repeated one by one, as the
+responses cannot be assigned to the devices otherwise.
+
+The utilization of the bus (share of time with running transactions) is
+logged every REPORT_INTERVAL seconds and available with statistics()."""
+import contextlib
+import functools
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from serial import Serial
+
+logger = logging.getLogger(__name__)
+
+REPORT_INTERVAL = 600  # s
+_buses = {}  # port : SerialBus
+
+
+def get_bus(config, exclusive=False):
+    """Get the bus of a serial port, open the port if it is not used by
+    another device yet.
+
+    Args:
+        config (dict): configuration of the serial interface (pyserial).
+        exclusive (bool, optional): the device requires the port on its
+            own (e.g. continuous output). Defaults to False.
+
+    Returns:
+        SerialBus: bus of the port.
+    """
+    port = config["port"]
+    if port in _buses:
+        bus = _buses[port]
+        if exclusive or bus.exclusive:
+            raise ValueError(
+                f"Serial port {port} is used by several devices, one of them requires it exclusively."
+            )
+        if config != bus.config:
+            raise ValueError(
+                f"Serial port {port} is used by several devices with different settings."
+            )
+        return bus
+    bus = SerialBus(Serial(**config), port)
+    bus.config = config
+    bus.exclusive = exclusive
+    _buses[port] = bus
+    return bus
+
+
+def transaction(method):
+    """Decorator for methods of devices with a bus: the method is
+    executed as one transaction, using the attributes bus, bus_priority
+    and name of the device."""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.bus.transaction(self.bus_priority, self.name):
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class SerialBus:
+    """Serial port shared by several devices."""
+
+    def __init__(self, serial, name="serial"):
+        """Create bus (not registered for other devices, see get_bus).
+
+        Args:
+            serial (Serial): serial interface (or mock).
+            name (str, optional): name for logging, e.g. the port.
+        """
+        self.serial = serial
+        self.name = name
+        self.config = None
+        self.exclusive = False
+        self.timeout = getattr(serial, "timeout", None) or 0.1  # s
+        self.condition = threading.Condition()
+        self.waiting = []  # heap of (-priority, sequence number)
+        self.sequence = itertools.count()
+        self.owner = None  # thread running the transaction
+        self.depth = 0  # nesting of transactions of the owner
+        self.pending = []  # queries to be sent
+        self.buffer = bytearray()
+        # statistics
+        self.clients = {}  # client : {transactions, busy, wait-max}
+        self.busy = 0.0  # s, since last report
+        self.last_report = time.perf_counter()
+
+    @contextlib.contextmanager
+    def transaction(self, priority=0, client=""):
+        """Get exclusive access to the bus (nestable).
+
+        Args:
+            priority (int, optional): higher values first. Defaults to 0.
+            client (str, optional): device name for the statistics.
+
+        Yields:
+            Serial: serial interface.
+        """
+        thread = threading.get_ident()
+        if self.owner == thread:
+            self.depth += 1
+            try:
+                yield self.serial
+            finally:
+                self.depth -= 1
+            return
+        requested = time.perf_counter()
+        with self.condition:
+            entry = (-priority, next(self.sequence))
+            heapq.heappush(self.waiting, entry)
+            while self.owner is not None or self.waiting[0] != entry:
+                self.condition.wait()
+            heapq.heappop(self.waiting)
+            self.owner = thread
+        start = time.perf_counter()
+        try:
+            yield self.serial
+        finally:
+            end = time.perf_counter()
+            with self.condition:
+                self.owner = None
+                self.condition.notify_all()
+                self.busy += end - start
+                stats = self.clients.setdefault(
+                    client, {"transactions": 0, "busy": 0.0, "wait-max": 0.0}
+                )
+                stats["transactions"] += 1
+                stats["busy"] += end - start
+                stats["wait-max"] = max(stats["wait-max"], start - requested)
+                report = end - self.last_report > REPORT_INTERVAL
+            if report:
+                self.report()
+
+    def statistics(self):
+        """Get the bus usage since the last report.
+
+        Returns:
+            dict: {"utilization": share of time used, "clients": {client:
+                {"transactions": number, "busy": s, "wait-max": s}}}
+        """
+        with self.condition:
+            elapsed = time.perf_counter() - self.last_report
+            return {
+                "utilization": self.busy / elapsed if elapsed > 0 else 0.0,
+                "clients": {
+                    client: dict(stats) for client, stats in self.clients.items()
+                },
+            }
+
+    def report(self):
+        """Log the bus usage and reset the statistics."""
+        statistics = self.statistics()
+        clients = ", ".join(
+            f"{client}: {stats['transactions']} transactions, "
+            f"{stats['busy']:.3f} s, max. wait {stats['wait-max']:.3f} s"
+            for client, stats in statistics["clients"].items()
+        )
+        logger.info(
+            f"Serial bus {self.name}: utilization {statistics['utilization']:.0%} ({clients})"
+        )
+        if statistics["utilization"] > 0.8:
+            logger.warning(
+                f"Serial bus {self.name} is used {statistics['utilization']:.0%} of the time, consider increasing the sampling time step."
+            )
+        with self.condition:
+            self.clients = {}
+            self.busy = 0.0
+            self.last_report = time.perf_counter()
+
+    def read_line(self, deadline):
+        """Read the next response (terminated by CR or LF), reading all
+        bytes available at once (within a transaction).
+
+        Args:
+            deadline (float): time.perf_counter() value after which the
+                response is considered missing.
+
+        Returns:
+            bytes: response, None if not received in time.
+        """
+        while True:
+            while self.buffer[:1] in (b"\r", b"\n"):
+                del self.buffer[:1]
+            ends = [
+                i for i in (self.buffer.find(b"\r"), self.buffer.find(b"\n")) if i >= 0
+            ]
+            if ends:
+                response = bytes(self.buffer[: min(ends)])
+                del self.buffer[: min(ends) + 1]
+                return response
+            if time.perf_counter() > deadline:
+                return None
+            self._receive()
+
+    def read_until(self, end, deadline, trailer=0):
+        """Read the next response terminated by end and a fixed number of
+        trailing bytes, e.g. a checksum (within a transaction).
+
+        Args:
+            end (bytes): terminator.
+            deadline (float): time.perf_counter() value after which the
+                response is considered missing.
+            trailer (int, optional): number of bytes following the
+                terminator. Defaults to 0.
+
+        Returns:
+            bytes: response including terminator and trailer, None if not
+                received in time.
+        """
+        while True:
+            i = self.buffer.find(end)
+            if i >= 0 and len(self.buffer) >= i + len(end) + trailer:
+                response = bytes(self.buffer[: i + len(end) + trailer])
+                del self.buffer[: i + len(end) + trailer]
+                return response
+            if time.perf_counter() > deadline:
+                return None
+            self._receive()
+
+    def _receive(self):
+        """Append all available bytes to the buffer, blocks for the serial
+        timeout at most if nothing is available."""
+        data = self.serial.read(self.serial.in_waiting or 1)
+        if not data:
+            time.sleep(0.001)
+        self.buffer += data
+
+    def resync(self, timeout):
+        """Discard late responses (within a transaction)."""
+        time.sleep(timeout)
+        self.serial.reset_input_buffer()
+        self.buffer.clear()
+
+    def query(self, request, priority=0, client="", timeout=None, batch=False):
+        """Send a request and read its response (CR / LF terminated).
+
+        Args:
+            request (bytes): request.
+            priority (int, optional): see transaction. Defaults to 0.
+            client (str, optional): device name for the statistics.
+            timeout (float, optional): time to wait for the response in
+                s. Defaults to the timeout of the serial interface.
+            batch (bool, optional): the request may be written together
+                with the requests of other devices. Defaults to False.
+
+        Returns:
+            bytes: response, None if no response was received.
+        """
+        item = {
+            "request": request,
+            "timeout": timeout or self.timeout,
+            "batch": batch,
+            "response": None,
+            "done": False,
+        }
+        with self.condition:
+            self.pending.append(item)
+        with self.transaction(priority, client):
+            if not item["done"]:  # not sent with the requests of another device
+                # requests that are not batchable are sent in their own
+                # transactions, in the order of their priorities
+                with self.condition:
+                    items = [
+                        other
+                        for other in self.pending
+                        if other is item or (item["batch"] and other["batch"])
+                    ]
+                    self.pending = [
+                        other
+                        for other in self.pending
+                        if all(other is not taken for taken in items)
+                    ]
+                try:
+                    self._send(items)
+                finally:
+                    for other in items:
+                        other["done"] = True
+        return item["response"]
+
+    def _send(self, items):
+        """Send queries, the batchable ones at once."""
+        self.serial.reset_input_buffer()
+        self.buffer.clear()
+        batch = [item for item in items if item["batch"]]
+        single = [item for item in items if not item["batch"]]
+        if len(batch) > 1:
+            self.serial.write(b"".join(item["request"] for item in batch))
+            last = time.perf_counter()
+            for item in batch:
+                item["response"] = self.read_line(last + item["timeout"])
+                if item["response"] is None:
+                    logger.warning(
+                        f"Serial bus {self.name}: response missing in batch, sending requests one by one."
+                    )
+                    self.resync(max(item["timeout"] for item in batch))
+                    single += batch
+                    break
+                last = time.perf_counter()
+        else:
+            single += batch
+        for item in single:
+            self.serial.write(item["request"])
+            item["response"] = self.read_line(time.perf_counter() + item["timeout"])
+            if item["response"] is None:
+                self.resync(item["timeout"])
@@ -0,0 +1,233 @@
+"""Thermocouple linearization according to the NIST ITS-90 thermocouple
+database (NIST Monograph 175), vectorized with NumPy.
+
+Used to convert raw thermocouple voltages into temperatures on the
+host, e.g. for the DAQ6510 (setting tc-raw). As the raw voltages are
+saved, the temperatures can be recomputed afterwards, e.g. with a
+corrected cold junction temperature:
+
+    temperature = linearize("K", voltage, cold_junction=23.5)
+"""
+import numpy as np
+
+# reference functions E(t), t in °C, E in mV: [(t_max, coefficients)]
+_EMF = {
+    "K": [
+        (
+            0,
+            [
+                0.0,
+                0.394501280250e-01,
+                0.236223735980e-04,
+                -0.328589067840e-06,
+                -0.499048287770e-08,
+                -0.675090591730e-10,
+                -0.574103274280e-12,
+                -0.310888728940e-14,
+                -0.104516093650e-16,
+                -0.198892668780e-19,
+                -0.163226974860e-22,
+            ],
+        ),
+        (
+            1372,
+            [
+                -0.176004136860e-01,
+                0.389212049750e-01,
+                0.185587700320e-04,
+                -0.994575928740e-07,
+                0.318409457190e-09,
+                -0.560728448890e-12,
+                0.560750590590e-15,
+                -0.320207200030e-18,
+                0.971511471520e-22,
+                -0.121047212750e-25,
+            ],
+        ),
+    ],
+    "J": [
+        (
+            760,
+            [
+                0.0,
+                0.503811878150e-01,
+                0.304758369300e-04,
+                -0.856810657200e-07,
+                0.132281952950e-09,
+                -0.170529583370e-12,
+                0.209480906970e-15,
+                -0.125383953360e-18,
+                0.156317256970e-22,
+            ],
+        ),
+        (
+            1200,
+            [
+                0.296456256810e03,
+                -0.149761277860e01,
+                0.317871039240e-02,
+                -0.318476867010e-05,
+                0.157208190040e-08,
+                -0.306913690560e-12,
+            ],
+        ),
+    ],
+}
+_EMF_MIN = {"K": -270, "J": -210}  # °C
+_K_EXPONENTIAL = (0.118597600000, -0.118343200000e-03, 0.126968600000e03)
+
+# inverse functions t(E), E in mV, t in °C: [(E_max, coefficients)]
+_INVERSE = {
+    "K": [
+        (
+            0,
+            [
+                0.0,
+                2.5173462e01,
+                -1.1662878,
+                -1.0833638,
+                -8.9773540e-01,
+                -3.7342377e-01,
+                -8.6632643e-02,
+                -1.0450598e-02,
+                -5.1920577e-04,
+            ],
+        ),
+        (
+            20.644,
+            [
+                0.0,
+                2.508355e01,
+                7.860106e-02,
+                -2.503131e-01,
+                8.315270e-02,
+                -1.228034e-02,
+                9.804036e-04,
+                -4.413030e-05,
+                1.057734e-06,
+                -1.052755e-08,
+            ],
+        ),
+        (
+            54.886,
+            [
+                -1.318058e02,
+                4.830222e01,
+                -1.646031,
+                5.464731e-02,
+                -9.650715e-04,
+                8.802193e-06,
+                -3.110810e-08,
+            ],
+        ),
+    ],
+    "J": [
+        (
+            0,
+            [
+                0.0,
+                1.9528268e01,
+                -1.2286185,
+                -1.0752178,
+                -5.9086933e-01,
+                -1.7256713e-01,
+                -2.8131513e-02,
+                -2.3963370e-03,
+                -8.3823321e-05,
+            ],
+        ),
+        (
+            42.919,
+            [
+                0.0,
+                1.978425e01,
+                -2.001204e-01,
+                1.036969e-02,
+                -2.549687e-04,
+                3.585153e-06,
+                -5.344285e-08,
+                5.099890e-10,
+            ],
+        ),
+        (
+            69.553,
+            [
+                -3.11358187e03,
+                3.00543684e02,
+                -9.94773230,
+                1.70276630e-01,
+                -1.43033468e-03,
+                4.73886084e-06,
+            ],
+        ),
+    ],
+}
+_INVERSE_MIN = {"K": -5.891, "J": -8.095}  # mV
+
+TYPES = tuple(_EMF)
+
+
+def _piecewise(x, x_min, ranges):
+    """Evaluate a piecewise polynomial, NaN outside of its range."""
+    x = np.asarray(x, dtype=np.float64)
+    result = np.full(x.shape, np.nan)
+    lower = x_min
+    for upper, coefficients in ranges:
+        mask = (x >= lower) & (x <= upper)
+        result[mask] = np.polynomial.polynomial.polyval(x[mask], coefficients)
+        lower = upper
+    return result
+
+
+def emf(tc_type, temperature):
+    """Thermoelectric voltage of a thermocouple with the reference
+    junction at 0 °C.
+
+    Args:
+        tc_type (str): thermocouple type (K, J).
+        temperature (float/numpy.array): temperature in °C.
+
+    Returns:
+        numpy.array: voltage in mV, NaN outside of the valid range.
+    """
+    tc_type = tc_type.upper()
+    temperature = np.asarray(temperature, dtype=np.float64)
+    result = _piecewise(temperature, _EMF_MIN[tc_type], _EMF[tc_type])
+    if tc_type == "K":
+        a0, a1, a2 = _K_EXPONENTIAL
+        positive = temperature >= 0
+        result[positive] += a0 * np.exp(a1 * (temperature[positive] - a2) ** 2)
+    return result
+
+
+def temperature(tc_type, voltage):
+    """Temperature of a thermocouple with the reference junction at 0 °C
+    (inverse function, error below 0.1 °C).
+
+    Args:
+        tc_type (str): thermocouple type (K, J).
+        voltage (float/numpy.array): voltage in mV.
+
+    Returns:
+        numpy.array: temperature in °C, NaN outside of the valid range.
+    """
+    tc_type = tc_type.upper()
+    return _piecewise(voltage, _INVERSE_MIN[tc_type], _INVERSE[tc_type])
+
+
+def linearize(tc_type, voltage, cold_junction=0.0):
+    """Convert measured thermocouple voltages into temperatures with cold
+    junction compensation.
+
+    Args:
+        tc_type (str): thermocouple type (K, J).
+        voltage (float/numpy.array): measured voltage in V.
+        cold_junction (float/numpy.array, optional): temperature of the
+            cold junction in °C. Defaults to 0.0.
+
+    Returns:
+        numpy.array: temperature in °C.
+    """
+    return temperature(
+        tc_type, np.asarray(voltage) * 1e3 + emf(tc_type, cold_junction)
+    )
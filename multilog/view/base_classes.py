@@ -1,10 +1,15 @@
 import logging
 from matplotlib.colors import cnames
 import numpy as np
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont
+import time
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from PyQt5.QtGui import QColor, QFont
 from PyQt5.QtWidgets import (
     QWidget,
+    QAbstractItemView,
+    QComboBox,
+    QHeaderView,
+    QTableView,
     QVBoxLayout,
     QGridLayout,
     QFrame,
@@ -16,6 +21,8 @@ from PyQt5.QtWidgets import (
 )
 import pyqtgraph as pg
 
+from ..history import Column, GrowableArray, Pyramid, Series
+
 logger = logging.getLogger(__name__)
 COLORS = [
     #"red",
@@ -39,6 +46,25 @@ COLORS = [
     "grey",
     "white",
 ]
+BATCH_SENSORS = 20  # plot widgets with more sensors are drawn in batched mode
+BATCH_COLOR = "#a0a0a0"  # color of the not highlighted lines in batched mode
+
+
+def sensor_color(index):
+    """Get the color of a sensor. The first sensors get the colors in
+    COLORS, further colors are generated with hues distributed by the
+    golden ratio.
+
+    Args:
+        index (int): index of the sensor
+
+    Returns:
+        str: color as hex string
+    """
+    if index < len(COLORS):
+        return cnames[COLORS[index]]
+    hue = (index - len(COLORS)) * 0.618033988749895 % 1
+    return QColor.fromHsvF(hue, 0.8, 0.95).name()
 
 
 class LineEdit(QLineEdit):
@@ -57,6 +83,44 @@ class LineEdit(QLineEdit):
         self.selectAll()
 
 
+class LazyWidget(QWidget):
+    """Placeholder for a widget (e.g. a tab) that is created when it is
+    shown for the first time or when it is accessed with the widget
+    property."""
+
+    def __init__(self, factory, parent=None):
+        """Create placeholder.
+
+        Args:
+            factory (callable): function creating the widget.
+        """
+        super().__init__(parent)
+        self.factory = factory
+        self._widget = None
+        self.widget_layout = QVBoxLayout()
+        self.widget_layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(self.widget_layout)
+
+    @property
+    def created(self):
+        """True if the widget has been created."""
+        return self._widget is not None
+
+    @property
+    def widget(self):
+        """The widget, created if necessary."""
+        if self._widget is None:
+            self._widget = self.factory()
+            self.factory = None
+            self.widget_layout.addWidget(self._widget)
+        return self._widget
+
+    def showEvent(self, event):
+        """Create the widget when it is shown the first time."""
+        self.widget
+        super().showEvent(event)
+
+
 class ImageWidget(QSplitter):
     """Base class for devices displaying an image."""
 
@@ -80,13 +144,92 @@ class ImageWidget(QSplitter):
         self.image_view = pg.ImageView()
         self.graphics_layout.addWidget(self.image_view)
 
-    def set_image(self, data):
-        """Set an image to be displayed.
+        self.levels = None  # color levels, updated every levels_interval seconds
+        self.levels_interval = 1
+        self.levels_time = 0
+        self.render_start = 0  # start of the last image update
+        self.render_time = 0  # duration of the last image update
+
+    def set_image(self, data, lut=None):
+        """Set an image to be displayed. The image is reduced to the
+        resolution of the screen (strided view, no copy) and the color
+        levels are calculated on a subsample once per levels_interval.
+        Images arriving faster than they can be displayed are skipped.
 
         Args:
             data (numpy.array): image
+            lut (numpy.array, optional): RGBA lookup table (uint8, shape
+                (n, 4)) for integer images. If given, the image is
+                colored with data as index into the table. Defaults to
+                None.
         """
-        self.image_view.setImage(data, autoRange=False)
+        start = time.perf_counter()
+        if start - self.render_start < self.render_time:
+            return  # GUI busy with the previous image
+        step = self.display_step(data.shape)
+        if lut is not None:
+            data = lut[data[::step, ::step]]
+        else:
+            data = data[::step, ::step]
+        if data.ndim == 3:  # color image
+            levels = (0, 255)
+        else:
+            if self.levels is None or start - self.levels_time > self.levels_interval:
+                self.levels = self.calc_levels(data)
+                self.levels_time = start
+            levels = self.levels
+        self.image_view.setImage(
+            data,
+            autoRange=False,
+            autoLevels=False,
+            levels=levels,
+            autoHistogramRange=False,
+            scale=(step, step),  # keep the coordinates of the full image
+        )
+        self.render_start = start
+        self.render_time = time.perf_counter() - start
+
+    def display_step(self, shape):
+        """Get the largest stride that does not reduce the visible part
+        of the image below the resolution of the screen.
+
+        Args:
+            shape (tuple): shape of the image
+
+        Returns:
+            int: stride in both directions
+        """
+        view_box = self.image_view.getView()
+        if not isinstance(view_box, pg.ViewBox):
+            view_box = view_box.getViewBox()
+        width, height = view_box.width(), view_box.height()
+        if width < 1 or height < 1:  # not shown yet
+            return 1
+        (x_min, x_max), (y_min, y_max) = view_box.viewRange()
+        visible_x = min(x_max, shape[0]) - max(x_min, 0)
+        visible_y = min(y_max, shape[1]) - max(y_min, 0)
+        return max(int(min(visible_x / width, visible_y / height)), 1)
+
+    @staticmethod
+    def calc_levels(data):
+        """Calculate color levels (min, max) on a subsample of about
+        256 x 256 pixels.
+
+        Args:
+            data (numpy.array): image
+
+        Returns:
+            tuple(float, float): min, max
+        """
+        step = max(int(np.sqrt(data.shape[0] * data.shape[1] / 65536)), 1)
+        subsample = data[::step, ::step]
+        finite = subsample[np.isfinite(subsample)]
+        if len(finite) == 0:
+            return 0, 1
+        minimum, maximum = float(finite.min()), float(finite.max())
+        if minimum == maximum:
+            maximum = minimum + 1
+        return minimum, maximum
 
     def set_cmap(self, cmap_name="turbo"):
         """Set color map for the image (if data is 2D heatmap)"""
@@ -94,10 +237,280 @@ class ImageWidget(QSplitter):
         self.image_view.setColorMap(self.cmap)
 
 
+class LineBuffer:
+    """Points of a line drawn from raw samples, kept in preallocated
+    arrays that are extended with the new samples only. NaN values are
+    left out and the line is interrupted there."""
+
+    def __init__(self):
+        self.x = GrowableArray()
+        self.y = GrowableArray()
+        self.connect = GrowableArray(dtype=bool)  # connect point i and i+1
+        self.reset()
+
+    def reset(self, start=None):
+        """Remove all points.
+
+        Args:
+            start (int, optional): index of the first sample that will
+                be appended. Defaults to None (buffer not in use).
+        """
+        self.start = start
+        self.stop = start  # index after the last appended sample
+        self.last = None  # sample index of the last point
+        self.x.clear()
+        self.y.clear()
+        self.connect.clear()
+
+    def extend(self, x, y):
+        """Append the next samples.
+
+        Args:
+            x (numpy.array): x values
+            y (numpy.array): y values
+        """
+        finite = np.isfinite(y)
+        indices = np.flatnonzero(finite) + self.stop
+        self.stop += len(y)
+        if len(indices) == 0:
+            return
+        if self.last is not None:
+            self.connect[-1] = indices[0] == self.last + 1
+        connect = np.zeros(len(indices), dtype=bool)
+        connect[:-1] = np.diff(indices) == 1
+        self.x.extend(x[finite])
+        self.y.extend(y[finite])
+        self.connect.extend(connect)
+        self.last = indices[-1]
+
+
+class StreamFilter:
+    """Base class of the filters for smoothed lines in PlotWidget. The
+    input series is processed incrementally, only the samples added
+    since the last update are filtered. The output is kept in a Column
+    with min/max pyramid, so that it can be drawn like a history."""
+
+    def __init__(self, window):
+        """Create filter.
+
+        Args:
+            window (int): window size in samples.
+        """
+        self.window = window
+        self.values = Column()
+        self.pyramid = Pyramid()
+        self.count = 0  # number of processed input samples
+        self.last_finite = np.nan
+
+    def update(self, y, length):
+        """Filter the input samples added since the last update.
+
+        Args:
+            y (Series): input values.
+            length (int): number of valid input values.
+        """
+        if length <= self.count:
+            return
+        values = y.slice(self.count, length)
+        self.count = length
+        # hold the last finite value for NaN from instrument
+        con = np.isfinite(values)
+        if not con.all():
+            index = np.where(con, np.arange(len(values)), -1)
+            np.maximum.accumulate(index, out=index)
+            values = np.where(index >= 0, values[np.maximum(index, 0)], self.last_finite)
+        if len(values):
+            self.last_finite = values[-1]
+        self.values.extend(self.process(values))
+        self.pyramid.update(self.values, len(self.values))
+
+    def process(self, values):
+        """Filter the next input values, to be implemented by the
+        subclasses.
+
+        Args:
+            values (numpy.array): input values.
+
+        Returns:
+            numpy.array: output values.
+        """
+        raise NotImplementedError
+
+    def series(self):
+        """Get the output as Series."""
+        return Series(self.values, self.pyramid, len(self.values))
+
+
+class MovingAverage(StreamFilter):
+    """Moving average over window samples. Output value i is the mean of
+    input values i, ..., i + window - 1."""
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.previous = np.empty(0)  # last window - 1 input values
+
+    def process(self, values):
+        values = np.concatenate((self.previous, values))
+        self.previous = values[max(len(values) - self.window + 1, 0) :]
+        if len(values) < self.window:
+            return np.empty(0)
+        # running sum, restarted with every update to avoid accumulating
+        # rounding errors; NaN values (e.g. leading ones that could not be
+        # held) are left out of the mean of their windows
+        finite = np.isfinite(values)
+        sums = np.concatenate(([0], np.cumsum(np.where(finite, values, 0))))
+        counts = np.concatenate(([0], np.cumsum(finite)))
+        counts = counts[self.window :] - counts[: -self.window]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(
+                counts > 0, (sums[self.window :] - sums[: -self.window]) / counts, np.nan
+            )
+
+
+class MovingMedian(MovingAverage):
+    """Moving median over window samples. Output value i is the median
+    of input values i, ..., i + window - 1."""
+
+    def process(self, values):
+        values = np.concatenate((self.previous, values))
+        self.previous = values[max(len(values) - self.window + 1, 0) :]
+        if len(values) < self.window:
+            return np.empty(0)
+        windows = np.lib.stride_tricks.sliding_window_view(values, self.window)
+        medians = np.empty(len(windows))
+        for start in range(0, len(windows), 65536):  # limit temporary memory
+            medians[start : start + 65536] = np.median(
+                windows[start : start + 65536], axis=1
+            )
+        return medians
+
+
+class ExponentialAverage(StreamFilter):
+    """Exponential moving average with smoothing factor 2 / (window + 1).
+    Output value i belongs to input value i."""
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.alpha = 2 / (window + 1)
+        self.last = np.nan
+
+    def process(self, values):
+        averages = np.empty(len(values))
+        last = self.last
+        for i, value in enumerate(values.tolist()):
+            last = value if last != last else last + self.alpha * (value - last)
+            averages[i] = last
+        self.last = last
+        return averages
+
+
+FILTERS = {
+    "Moving average": MovingAverage,
+    "Exponential average": ExponentialAverage,
+    "Moving median": MovingMedian,
+}
+
+
+class SensorTableModel(QAbstractTableModel):
+    """Table of the sensors of a PlotWidget in batched mode, replacing the
+    grid of labels, check boxes and line edits. The QTableView only
+    renders the visible rows, also for hundreds of sensors."""
+
+    columns = ["Sensor", "Value", "Highlight", "Avg.", "Window"]
+
+    def __init__(self, plot_widget):
+        """Create table for the sensors of a plot widget.
+
+        Args:
+            plot_widget (PlotWidget): widget providing the sensor
+                settings (enableLine, highlighted, enableMas, windowSize)
+        """
+        super().__init__(plot_widget)
+        self.plot_widget = plot_widget
+        self.sensors = plot_widget.sensors
+        self.rows = {sensor: i for i, sensor in enumerate(self.sensors)}
+        self.values = {sensor: "XXX.XXX" for sensor in self.sensors}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.sensors)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.columns[section]
+        return None
+
+    def flags(self, index):
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() in (0, 2, 3):
+            flags |= Qt.ItemIsUserCheckable
+        elif index.column() == 4:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        sensor = self.sensors[index.row()]
+        column = index.column()
+        widget = self.plot_widget
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            if column == 0:
+                return sensor
+            if column == 1:
+                return self.values[sensor]
+            if column == 4:
+                return widget.windowSize[sensor]
+        elif role == Qt.CheckStateRole:
+            if column == 0:
+                checked = widget.enableLine[sensor]
+            elif column == 2:
+                checked = sensor in widget.highlighted
+            elif column == 3:
+                checked = widget.enableMas[sensor]
+            else:
+                return None
+            return Qt.Checked if checked else Qt.Unchecked
+        elif role == Qt.ForegroundRole and column in (0, 1):
+            return QColor(widget.colors[sensor])
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        sensor = self.sensors[index.row()]
+        column = index.column()
+        if role == Qt.CheckStateRole:
+            state = value == Qt.Checked
+            if column == 0:
+                self.plot_widget.update_line(sensor, state)
+            elif column == 2:
+                self.plot_widget.update_highlight(sensor, state)
+            elif column == 3:
+                self.plot_widget.update_mavg(sensor, state)
+        elif role == Qt.EditRole and column == 4:
+            self.plot_widget.edit_mavg_changed(sensor, str(value))
+        else:
+            return False
+        self.dataChanged.emit(index, index)
+        return True
+
+    def set_value(self, sensor, text):
+        """Update the displayed value of a sensor.
+
+        Args:
+            sensor (str): name of the sensor
+            text (str): formatted value
+        """
+        self.values[sensor] = text
+        index = self.index(self.rows[sensor], 1)
+        self.dataChanged.emit(index, index)
+
+
 class PlotWidget(QSplitter):
     """Base class for devices displaying a 2D plot."""
 
-    def __init__(self, sensors, parameter="Temperature", unit="°C", parent=None):
+    def __init__(
+        self, sensors, parameter="Temperature", unit="°C", parent=None, batched=None
+    ):
         """Setup plot widget tab.
 
         Args:
@@ -106,6 +519,11 @@ class PlotWidget(QSplitter):
                 Defaults to "Temperature".
             unit (str, optional): unit of visualized parameter.
                 Defaults to "°C".
+            batched (bool, optional): draw all sensors in a single line
+                item (only highlighted sensors and moving averages are
+                drawn individually) and show the sensors in a table.
+                Defaults to None (used for more than BATCH_SENSORS
+                sensors).
         """
         super().__init__(Qt.Horizontal, frameShape=QFrame.StyledPanel, parent=parent)
         self.unit = unit
@@ -137,17 +555,45 @@ class PlotWidget(QSplitter):
         # self.plot.getAxis('top').setTicks([x2_ticks,[]])  # TODO set that!
         self.plot.enableAutoRange(axis="x")
         self.plot.enableAutoRange(axis="y")
-        self.pens   = []
-        self.maPens = []
-
-        for color in COLORS:
-            self.pens.append(pg.mkPen(color=cnames[color]))
-            self.maPens.append(pg.mkPen(color=cnames[color], style=Qt.DashLine))
 
-        self.lines = {}
-        for i in range(len(sensors)):
-            line = self.plot.plot([], [], pen=self.pens[i])
-            self.lines.update({sensors[i]: line})
+        # overview of the complete history below the plot, the visible
+        # x-range of the plot is marked and can be moved with the mouse
+        self.graphics_widget.nextRow()
+        self.overview = self.graphics_widget.addPlot()
+        self.overview.setMaximumHeight(100)
+        self.overview.showGrid(x=True)
+        self.overview.setMouseEnabled(x=False, y=False)
+        self.overview.setMenuEnabled(False)
+        self.overview.hideButtons()
+        self.overview_region = pg.LinearRegionItem()
+        self.overview.addItem(self.overview_region, ignoreBounds=True)
+        self.overview_region.sigRegionChanged.connect(self.overview_region_changed)
+        self.overview_interval = 1  # s, update interval of the overview
+        self.overview_times = {}  # sensor name : time of the last update
+        self.updating_region = False  # region moved by program, not by user
+
+        self.sensors = list(sensors)
+        if batched is None:
+            batched = len(sensors) > BATCH_SENSORS
+        self.batched = batched
+        self.colors = {sensor: sensor_color(i) for i, sensor in enumerate(sensors)}
+        self.highlighted = set()  # sensors drawn individually in batched mode
+        self.batch_pending = False  # redraw of the batched lines scheduled
+        self.batch_overview_time = 0  # last update of the batched overview
+
+        self.lines = {}  # created on demand in batched mode
+        self.overview_lines = {}
+        if self.batched:
+            self.batch_line = self.plot.plot([], [], pen=pg.mkPen(color=BATCH_COLOR))
+            self.batch_overview_line = self.overview.plot(
+                [], [], pen=pg.mkPen(color=BATCH_COLOR)
+            )
+        else:
+            for sensor in sensors:
+                self.add_line(sensor)
+                line = self.overview.plot([], [], pen=pg.mkPen(color=self.colors[sensor]))
+                self.overview_lines.update({sensor: line})
+        self.line_buffers = {sensor: LineBuffer() for sensor in sensors}
         
         # Enable / Disable "standard" line
         self.enableLine = {}
@@ -160,9 +606,17 @@ class PlotWidget(QSplitter):
         self.x_max = 60
         self.y_min = 0
         self.y_max = 1
+        self.follow_window = 600  # s, x-range in follow mode
+        self.follow_end = None  # end of the x-range in follow mode
+        self.following = False  # x-range set by follow mode, not by user
 
         self.plot.scene().sigMouseMoved.connect(self.mouseMovedEvent) # Update data if cursor is moved
 
+        # data of the lines, required to redraw with another level of detail if zoomed
+        self.plot_data = {}  # sensor name : (x Series, y Series, length)
+        self.appended_data = {}  # sensor name : (x Column, y Column, Pyramid)
+        self.plot.sigXRangeChanged.connect(self.x_range_changed)
+
         # setup controls for figure scaling
         self.group_box_plot = QGroupBox("Plot configuration")
         # self.group_box_plot.setObjectName('Group')
@@ -227,6 +681,32 @@ class PlotWidget(QSplitter):
         self.group_box_plot_layout.addWidget(self.edit_y_max, 1, 2, 1, 1)
         self.group_box_plot_layout.addWidget(self.cb_autoscale_y, 1, 3, 1, 3)
 
+        self.lbl_filter = QLabel("Averaging : ")
+        self.lbl_filter.setFont(QFont("Times", 12))
+        self.lbl_filter.setAlignment(Qt.AlignRight)
+        self.cb_filter = QComboBox()
+        self.cb_filter.addItems(list(FILTERS))
+        self.cb_filter.setFont(QFont("Times", 12))
+        self.group_box_plot_layout.addWidget(self.lbl_filter, 2, 0, 1, 1)
+        self.group_box_plot_layout.addWidget(self.cb_filter, 2, 1, 1, 2)
+        self.cb_filter.currentTextChanged.connect(self.filter_changed)
+
+        self.lbl_follow = QLabel("Last [min] : ")
+        self.lbl_follow.setFont(QFont("Times", 12))
+        self.lbl_follow.setAlignment(Qt.AlignRight)
+        self.edit_follow = LineEdit()
+        self.edit_follow.setFixedWidth(90)
+        self.edit_follow.setFont(QFont("Times", 14, QFont.Bold))
+        self.edit_follow.setText(str(self.follow_window / 60))
+        self.cb_follow = QCheckBox("Follow")
+        self.cb_follow.setChecked(False)
+        self.cb_follow.setFont(QFont("Times", 12))
+        self.group_box_plot_layout.addWidget(self.lbl_follow, 3, 0, 1, 1)
+        self.group_box_plot_layout.addWidget(self.edit_follow, 3, 1, 1, 1)
+        self.group_box_plot_layout.addWidget(self.cb_follow, 3, 3, 1, 3)
+        self.cb_follow.clicked.connect(self.update_follow)
+        self.edit_follow.editingFinished.connect(self.edit_follow_changed)
+
         self.cb_autoscale_x.clicked.connect(self.update_autoscale_x)
         self.cb_autoscale_y.clicked.connect(self.update_autoscale_y)
         self.edit_x_min.editingFinished.connect(self.edit_x_min_changed)
@@ -245,11 +725,12 @@ class PlotWidget(QSplitter):
         self.sensor_value_labels = {}
 
         # moving average
-        self.mas = {}
-        for i in range(len(sensors)):
-            maPen = self.maPens[i]
-            ma    = self.plot.plot([], [], pen=maPen)
-            self.mas.update({sensors[i]: ma})
+        self.mas = {}  # created on demand in batched mode
+        if not self.batched:
+            for sensor in sensors:
+                self.add_average(sensor)
+        self.mas_buffers = {sensor: LineBuffer() for sensor in sensors}
+        self.filters = {}  # sensor name : StreamFilter, created when needed
 
         # Enable / Disable moving average
         self.enableMas = {}
@@ -262,50 +743,53 @@ class PlotWidget(QSplitter):
             self.windowSize.update({sensors[i]: 5}) # all windows get inited with a size of 5
         
         self.edit_mavg_dict = {}
-        for i in range(len(sensors)):
-            self.cb_line = QCheckBox(f"{sensors[i]}:")
-            self.cb_line.setChecked(True)
-            self.cb_line.setFont(QFont("Times", 12, QFont.Bold))
-            self.cb_line.setStyleSheet(f"color: {COLORS[i]}")
-            self.cb_line.setEnabled(True)
-            self.cb_line.clicked.connect(lambda state, x=sensors[i]: self.update_line(x, state))
-            self.group_box_sensors_layout.addWidget(self.cb_line, i, 0, 1, 1)
-            """
-            lbl_name = QLabel()
-            lbl_name.setText(f"{sensors[i]}:")
-            lbl_name.setFont(QFont("Times", 12, QFont.Bold))
-            lbl_name.setStyleSheet(f"color: {COLORS[i]}")
-            self.group_box_sensors_layout.addWidget(lbl_name, i, 1, 1, 1)
-            """
-            #self.sensor_name_labels.update({sensors[i]: lbl_name})
-            lbl_value = QLabel()
-            if self.unit == "-":
-                lbl_value.setText(f"XXX.XXX")
-            else:
-                lbl_value.setText(f"XXX.XXX {self.unit}")
-            lbl_value.setFont(QFont("Times", 12, QFont.Bold))
-            lbl_value.setStyleSheet(f"color: {COLORS[i]}")
-            self.group_box_sensors_layout.addWidget(lbl_value, i, 1, 1, 1)
-
-            self.cb_mavg = QCheckBox("Avr. window [points]: ")
-            self.cb_mavg.setChecked(False)
-            self.cb_mavg.setFont(QFont("Times", 12, QFont.Bold))
-            self.cb_mavg.setStyleSheet(f"color: {COLORS[i]}")
-            self.cb_mavg.setEnabled(True)
-            self.cb_mavg.clicked.connect(lambda state, x=sensors[i]: self.update_mavg(x, state))
-            self.group_box_sensors_layout.addWidget(self.cb_mavg, i, 2, 1, 1)
-
-            self.edit_mavg = LineEdit()
-            self.edit_mavg.setFixedWidth(50)
-            self.edit_mavg.setFont(QFont("Times", 14, QFont.Bold))
-            self.edit_mavg.setStyleSheet(f"color: black")
-            self.edit_mavg.setText(str(self.windowSize[sensors[i]]))
-            self.edit_mavg.setEnabled(True)
-            self.edit_mavg.editingFinished.connect(lambda e=self.edit_mavg, x=sensors[i]: self.edit_mavg_changed(x, e.text()))
-            self.edit_mavg_dict.update({sensors[i]: self.edit_mavg})
-            self.group_box_sensors_layout.addWidget(self.edit_mavg, i, 3, 1, 1)
-
-            self.sensor_value_labels.update({sensors[i]: lbl_value})
+        if self.batched:
+            self.setup_sensor_table()
+        else:
+            for i in range(len(sensors)):
+                self.cb_line = QCheckBox(f"{sensors[i]}:")
+                self.cb_line.setChecked(True)
+                self.cb_line.setFont(QFont("Times", 12, QFont.Bold))
+                self.cb_line.setStyleSheet(f"color: {self.colors[sensors[i]]}")
+                self.cb_line.setEnabled(True)
+                self.cb_line.clicked.connect(lambda state, x=sensors[i]: self.update_line(x, state))
+                self.group_box_sensors_layout.addWidget(self.cb_line, i, 0, 1, 1)
+                """
+                lbl_name = QLabel()
+                lbl_name.setText(f"{sensors[i]}:")
+                lbl_name.setFont(QFont("Times", 12, QFont.Bold))
+                lbl_name.setStyleSheet(f"color: {self.colors[sensors[i]]}")
+                self.group_box_sensors_layout.addWidget(lbl_name, i, 1, 1, 1)
+                """
+                #self.sensor_name_labels.update({sensors[i]: lbl_name})
+                lbl_value = QLabel()
+                if self.unit == "-":
+                    lbl_value.setText(f"XXX.XXX")
+                else:
+                    lbl_value.setText(f"XXX.XXX {self.unit}")
+                lbl_value.setFont(QFont("Times", 12, QFont.Bold))
+                lbl_value.setStyleSheet(f"color: {self.colors[sensors[i]]}")
+                self.group_box_sensors_layout.addWidget(lbl_value, i, 1, 1, 1)
+
+                self.cb_mavg = QCheckBox("Avr. window [points]: ")
+                self.cb_mavg.setChecked(False)
+                self.cb_mavg.setFont(QFont("Times", 12, QFont.Bold))
+                self.cb_mavg.setStyleSheet(f"color: {self.colors[sensors[i]]}")
+                self.cb_mavg.setEnabled(True)
+                self.cb_mavg.clicked.connect(lambda state, x=sensors[i]: self.update_mavg(x, state))
+                self.group_box_sensors_layout.addWidget(self.cb_mavg, i, 2, 1, 1)
+
+                self.edit_mavg = LineEdit()
+                self.edit_mavg.setFixedWidth(50)
+                self.edit_mavg.setFont(QFont("Times", 14, QFont.Bold))
+                self.edit_mavg.setStyleSheet(f"color: black")
+                self.edit_mavg.setText(str(self.windowSize[sensors[i]]))
+                self.edit_mavg.setEnabled(True)
+                self.edit_mavg.editingFinished.connect(lambda e=self.edit_mavg, x=sensors[i]: self.edit_mavg_changed(x, e.text()))
+                self.edit_mavg_dict.update({sensors[i]: self.edit_mavg})
+                self.group_box_sensors_layout.addWidget(self.edit_mavg, i, 3, 1, 1)
+
+                self.sensor_value_labels.update({sensors[i]: lbl_value})
 
         # Init data at Cursor Tip
         self.lbl_cursorPos = pg.TextItem("")
@@ -313,6 +797,48 @@ class PlotWidget(QSplitter):
         self.plot.addItem(self.lbl_cursorPos, ignoreBounds=True)
         self.lbl_cursorPos.setPos(0,0)
 
+    def add_line(self, sensor):
+        """Create the line of a sensor.
+
+        Args:
+            sensor (str): name of the sensor
+        """
+        line = self.plot.plot(
+            [],
+            [],
+            pen=pg.mkPen(color=self.colors[sensor]),
+            clipToView=True,
+            autoDownsample=True,
+            downsampleMethod="peak",
+        )
+        self.lines.update({sensor: line})
+
+    def add_average(self, sensor):
+        """Create the moving average line of a sensor.
+
+        Args:
+            sensor (str): name of the sensor
+        """
+        maPen = pg.mkPen(color=self.colors[sensor], style=Qt.DashLine)
+        ma    = self.plot.plot([], [], pen=maPen, clipToView=True, autoDownsample=True, downsampleMethod="peak")
+        self.mas.update({sensor: ma})
+
+    def setup_sensor_table(self):
+        """Show the sensors in a table instead of a grid of widgets
+        (batched mode)."""
+        self.sensor_table = SensorTableModel(self)
+        self.table_sensors = QTableView()
+        self.table_sensors.setModel(self.sensor_table)
+        self.table_sensors.setFont(QFont("Times", 12))
+        self.table_sensors.setSelectionMode(QAbstractItemView.NoSelection)
+        self.table_sensors.verticalHeader().hide()
+        self.table_sensors.verticalHeader().setDefaultSectionSize(24)
+        self.table_sensors.horizontalHeader().setSectionResizeMode(
+            0, QHeaderView.Stretch
+        )
+        self.table_sensors.setMinimumHeight(400)
+        self.group_box_sensors_layout.addWidget(self.table_sensors, 0, 0, 1, 1)
+
     # change Data at Cursor Tip
     def mouseMovedEvent(self, pos):
         """updates x and y value of cursor."""
@@ -334,6 +860,9 @@ class PlotWidget(QSplitter):
             else:                self.lbl_cursorPos.setText(f"{x_i} s, {y_i}")
 
     def update_autoscale_x(self):
+        if self.cb_autoscale_x.isChecked() and self.cb_follow.isChecked():
+            self.cb_follow.setChecked(False)
+            self.update_follow()
         if self.cb_autoscale_x.isChecked():
             self.edit_x_min.setEnabled(False)
             self.edit_x_max.setEnabled(False)
@@ -343,6 +872,51 @@ class PlotWidget(QSplitter):
             self.edit_x_max.setEnabled(True)
             self.plot.disableAutoRange(axis="x")
 
+    def update_follow(self):
+        """Switch the follow mode (x-range showing the last minutes) on or
+        off."""
+        self.follow_end = None
+        if self.cb_follow.isChecked():
+            self.cb_autoscale_x.setChecked(False)
+            self.edit_x_min.setEnabled(False)
+            self.edit_x_max.setEnabled(False)
+            self.plot.disableAutoRange(axis="x")
+            self.plot.setAutoVisible(y=True)  # autoscale y to visible data
+            ends = [x[length - 1] for x, y, length in self.plot_data.values()]
+            if ends:
+                self.follow(max(ends))
+            for sensor in self.plot_data:
+                self.draw_sensor(sensor)
+        else:
+            self.plot.setAutoVisible(y=False)
+            self.update_autoscale_x()
+
+    def follow(self, end):
+        """Move the x-range in follow mode to end at the given time.
+
+        Args:
+            end (float): time of the latest sample
+        """
+        if self.follow_end is not None and end <= self.follow_end:
+            return
+        self.follow_end = end
+        self.following = True
+        self.plot.setXRange(end - self.follow_window, end, padding=0)
+        self.following = False
+
+    def edit_follow_changed(self):
+        try:
+            minutes = float(self.edit_follow.text().replace(",", "."))
+        except ValueError:
+            minutes = self.follow_window / 60
+        if minutes > 0:
+            self.follow_window = minutes * 60
+        self.edit_follow.setText(str(self.follow_window / 60))
+        self.edit_follow.setStyleSheet("color: black")
+        self.edit_follow.clearFocus()
+        if self.cb_follow.isChecked():
+            self.update_follow()
+
     def update_autoscale_y(self):
         if self.cb_autoscale_y.isChecked():
             self.edit_y_min.setEnabled(False)
@@ -388,6 +962,21 @@ class PlotWidget(QSplitter):
             self.enableLine[index] = True
         else:
             self.enableLine[index] = False
+        if self.batched:
+            self.schedule_batch()
+
+    def update_highlight(self, index, state):
+        """Draw a sensor individually in its color (batched mode only)."""
+        if state:
+            self.highlighted.add(index)
+        else:
+            self.highlighted.discard(index)
+            if index in self.lines:
+                self.plot.removeItem(self.lines.pop(index))
+                self.line_buffers[index].reset()
+        if index in self.plot_data and self.isVisible():
+            self.draw_sensor(index)
+        self.schedule_batch()
 
     def update_mavg(self, index, state):
         if state == 1:
@@ -401,10 +990,16 @@ class PlotWidget(QSplitter):
 
         if tempNr < 2: tempNr = 2 # a value below 2 does not make any sense.
 
+        if tempNr != self.windowSize[index]:
+            self.filters.pop(index, None)  # recompute with new window
         self.windowSize[index] = tempNr
 
-        self.edit_mavg_dict[index].setText(str(tempNr))
-        self.edit_mavg_dict[index].setStyleSheet("color: black")
+        if index in self.edit_mavg_dict:  # not in batched mode
+            self.edit_mavg_dict[index].setText(str(tempNr))
+            self.edit_mavg_dict[index].setStyleSheet("color: black")
+
+    def filter_changed(self, text):
+        self.filters = {}  # recompute with new filter
 
     def calc_x2_ticks(self):  # TODO
         """Not implemented. Intended to be used for a datetime axis."""
@@ -425,43 +1020,339 @@ class PlotWidget(QSplitter):
 
         Args:
             sensor (str): name of the sensor
-            x (list): x values
-            y (list): y values
+            x (Series/list/numpy.array): x values, not used if y is a
+                Series with its own time
+            y (Series/list/numpy.array): y values
         """
-        # PyQtGraph workaround for NaN from instrument
-        
-        try: # normal method
-            x   = np.array(x)
-            y   = np.array(y)
-            con = np.isfinite(y)
-        except: # method to catch error for X.XXE+YY notation
-            x   = np.array(x)
-            y   = np.array(y, dtype=float)
-            con = np.isfinite(y)
-
-        if len(y) >= 2 and y[-2:-1] != np.nan:
-            y_ok = y[-2:-1]
-            y[~con] = y_ok
-
-        if self.enableLine[sensor] == True: self.lines[sensor].setData(x, y, connect=np.logical_and(con, np.roll(con, -1)))
-        else: self.lines[sensor].clear()
+        if isinstance(y, Series) and y.time is not None:
+            x = y.time  # the device's own time, independent of missed samplings
+        if not isinstance(x, Series):
+            x = Series.from_values(x)
+        if not isinstance(y, Series):
+            y = Series.from_values(y)
+        # the history may have been extended by the sampler thread in the
+        # meantime, use a common length of x and y
+        length = min(len(x), len(y))
+        if length == 0:
+            return
+        self.plot_data[sensor] = (x, y, length)
+        if self.isVisible():  # hidden plots are drawn in showEvent
+            if self.cb_follow.isChecked():
+                self.follow(x[length - 1])
+            self.draw_sensor(sensor)
+            now = time.perf_counter()
+            if (
+                not self.batched  # overview drawn with the batched lines
+                and now - self.overview_times.get(sensor, 0) > self.overview_interval
+            ):
+                self.draw_overview(sensor)
+                self.overview_times[sensor] = now
+
+        value = y[length - 1]
+        if not np.isfinite(value) and length >= 2:
+            value = y[length - 2]
+        self.set_label(sensor, value)
+
+    def replace_data(self, sensor, x, y):
+        """Set data for selected sensor in plot that replaces the previous
+        data instead of extending it (e.g. the latest waveform), so that
+        the line is redrawn completely.
+
+        Args:
+            sensor (str): name of the sensor
+            x (Series/list/numpy.array): x values
+            y (Series/list/numpy.array): y values
+        """
+        self.line_buffers[sensor].reset()
+        self.mas_buffers[sensor].reset()
+        self.filters.pop(sensor, None)
+        self.set_data(sensor, x, y)
+
+    def visible_samples(self, x, length):
+        """Get the range of samples to be drawn and the number of points
+        that can reasonably be displayed. If the x-axis is not scaled
+        automatically, the visible range is extended by its width on
+        both sides to allow for panning.
+
+        Args:
+            x (Series): x values (sorted)
+            length (int): number of samples
+
+        Returns:
+            tuple(int, int, int): start index, stop index, max. points
+        """
+        view_box = self.plot.getViewBox()
+        width = max(int(view_box.width()), 500)  # hidden widgets have width 0
+        if view_box.autoRangeEnabled()[0]:
+            return 0, length, 2 * width
+        x_min, x_max = view_box.viewRange()[0]
+        span = x_max - x_min
+        if self.cb_follow.isChecked():  # no panning, the range moves forward
+            start = max(min(x.searchsorted(x_min), length) - 1, 0)
+            return start, length, 2 * width
+        start = max(min(x.searchsorted(x_min - span), length) - 1, 0)
+        stop = min(x.searchsorted(x_max + span) + 1, length)
+        return start, stop, 6 * width
+
+    def append_data(self, sensor, x, y):
+        """Append new samples for selected sensor in plot. Alternative to
+        set_data for data that is not kept in a History; only the new
+        samples are passed.
+
+        Args:
+            sensor (str): name of the sensor
+            x (list/numpy.array): new x values
+            y (list/numpy.array): new y values
+        """
+        if sensor not in self.appended_data:
+            self.appended_data[sensor] = (Column(), Column(), Pyramid())
+        x_column, y_column, pyramid = self.appended_data[sensor]
+        x_column.extend(x)
+        y_column.extend(y)
+        length = min(len(x_column), len(y_column))
+        pyramid.update(y_column, length)
+        self.set_data(
+            sensor, Series(x_column, None, length), Series(y_column, pyramid, length)
+        )
+
+    def showEvent(self, event):
+        """Draw the data that was set while the widget was hidden."""
+        super().showEvent(event)
+        if self.cb_follow.isChecked() and self.plot_data:
+            self.follow(max(x[length - 1] for x, y, length in self.plot_data.values()))
+        self.batch_overview_time = 0
+        for sensor in self.plot_data:
+            self.draw_sensor(sensor)
+            if not self.batched:
+                self.draw_overview(sensor)
+                self.overview_times[sensor] = time.perf_counter()
+
+    def draw_sensor(self, sensor):
+        """Draw line and moving average of a sensor (if enabled).
+
+        Args:
+            sensor (str): name of the sensor
+        """
+        length = self.plot_data[sensor][2]
+        if self.batched and sensor not in self.highlighted:
+            self.schedule_batch()  # part of the batched line
+        elif self.enableLine[sensor] == True: self.draw_line(sensor)
+        elif sensor in self.lines:
+            self.lines[sensor].clear()
+            self.line_buffers[sensor].reset()
 
         # plot moving average
-        if self.windowSize[sensor] <= len(y):
-            yAvg = self.movingAvg(data=y, sensor=sensor)
-            xAvgMinus = self.windowSize[sensor] - 1
-            xAvg = np.array(x[:-xAvgMinus])
-            if self.enableMas[sensor] == True:
-                try: self.mas[sensor].setData(xAvg, yAvg)
-                except: logging.debug("Displaying moving average not possible")
-            else: self.mas[sensor].clear()
-
-        if self.unit == "-":
-            self.sensor_value_labels[sensor].setText(f"{y[-1]:.3f}")
-        elif self.unit == "mbar": 
-            self.sensor_value_labels[sensor].setText(f"{y[-1]:.3E} {self.unit}") # exeption for vifcon_gase to show the scientific format
-        else:
-            self.sensor_value_labels[sensor].setText(f"{y[-1]:.3f} {self.unit}")
+        if self.enableMas[sensor] == True and self.windowSize[sensor] <= length:
+            self.draw_average(sensor)
+        elif sensor in self.mas:
+            if self.batched:
+                self.plot.removeItem(self.mas.pop(sensor))
+            else:
+                self.mas[sensor].clear()
+            self.mas_buffers[sensor].reset()
+
+    def draw_line(self, sensor):
+        """Draw the line of a sensor.
+
+        Args:
+            sensor (str): name of the sensor
+        """
+        x, y, length = self.plot_data[sensor]
+        if sensor not in self.lines:
+            self.add_line(sensor)
+        self.draw(self.lines[sensor], self.line_buffers[sensor], x, y, length)
+
+    def draw_average(self, sensor):
+        """Update the filter of a sensor with the new samples and draw
+        the averaged line.
+
+        Args:
+            sensor (str): name of the sensor
+        """
+        x, y, length = self.plot_data[sensor]
+        if sensor not in self.filters:
+            self.filters[sensor] = FILTERS[self.cb_filter.currentText()](
+                self.windowSize[sensor]
+            )
+            self.mas_buffers[sensor].reset()
+        average = self.filters[sensor]
+        average.update(y, length)
+        if sensor not in self.mas:
+            self.add_average(sensor)
+        self.draw(
+            self.mas[sensor],
+            self.mas_buffers[sensor],
+            x,
+            average.series(),
+            len(average.values),
+        )
+
+    def draw(self, line, buffer, x, y, length):
+        """Draw a line. If all visible samples can be displayed, only the
+        samples added since the last call are appended to the line. Long
+        time series are reduced to the resolution of the screen using
+        the min/max pyramid of the history.
+
+        Args:
+            line (pyqtgraph.PlotDataItem): line to be drawn
+            buffer (LineBuffer): points of the line
+            x (Series): x values
+            y (Series): y values
+            length (int): number of samples
+        """
+        start, stop, max_points = self.visible_samples(x, length)
+        if stop - start <= max_points:
+            # points left of the visible range are kept (and clipped by
+            # pyqtgraph) until they are as many as the visible ones, so
+            # that the buffer is not rebuilt each time the range moves
+            if (
+                buffer.start is None
+                or buffer.start > start
+                or buffer.start < start - (stop - start)
+                or buffer.stop > stop
+            ):
+                buffer.reset(start)
+            elif buffer.stop == stop:
+                return  # nothing new
+            buffer.extend(x.slice(buffer.stop, stop), y.slice(buffer.stop, stop))
+            if len(buffer.x) == 0:
+                line.clear()
+            else:
+                line.setData(
+                    buffer.x.view(), buffer.y.view(), connect=buffer.connect.view()
+                )
+            return
+
+        buffer.reset()
+        indices, y = y.decimate(start, stop, max_points)
+        self.set_line_data(line, x.take(indices), y)
+
+    @staticmethod
+    def set_line_data(line, x, y):
+        """Set the points of a line, with gaps at NaN values.
+
+        Args:
+            line (pyqtgraph.PlotDataItem): line to be drawn
+            x (numpy.array): x values
+            y (numpy.array): y values
+        """
+        con = np.isfinite(y)
+        if not con.any():
+            line.clear()
+            return
+        # PyQtGraph workaround for NaN from instrument
+        if not con.all():
+            y = np.where(con, y, y[con][-1])
+        line.setData(x, y, connect=np.logical_and(con, np.roll(con, -1)))
+
+    def schedule_batch(self):
+        """Redraw the batched line after the current event, i.e., once
+        for all sensors updated in a refresh of the view."""
+        if self.batched and not self.batch_pending:
+            self.batch_pending = True
+            QTimer.singleShot(0, self.draw_batch)
+
+    def draw_batch(self):
+        """Draw all sensors that are not highlighted in a single line
+        (and the overview, once per overview_interval). Each sensor is
+        reduced to the resolution of the screen with the min/max
+        pyramid."""
+        self.batch_pending = False
+        sensors = [
+            sensor
+            for sensor in self.plot_data
+            if self.enableLine[sensor] == True and sensor not in self.highlighted
+        ]
+        points = []
+        for sensor in sensors:
+            x, y, length = self.plot_data[sensor]
+            start, stop, max_points = self.visible_samples(x, length)
+            indices, values = y.decimate(start, stop, max_points)
+            points.append((x.take(indices), values))
+        self.set_batch_data(self.batch_line, points)
+
+        now = time.perf_counter()
+        if now - self.batch_overview_time > self.overview_interval:
+            width = max(int(self.overview.getViewBox().width()), 500)
+            points = []
+            for sensor in sensors:
+                x, y, length = self.plot_data[sensor]
+                indices, values = y.decimate(0, length, 2 * width)
+                points.append((x.take(indices), values))
+            self.set_batch_data(self.batch_overview_line, points)
+            self.batch_overview_time = now
+
+    @staticmethod
+    def set_batch_data(line, points):
+        """Set the points of several series as a single line, which is
+        interrupted between the series and at NaN values.
+
+        Args:
+            line (pyqtgraph.PlotDataItem): line to be drawn
+            points (list): (x, y) numpy arrays of each series
+        """
+        if not points:
+            line.clear()
+            return
+        x = np.concatenate([series[0] for series in points])
+        y = np.concatenate([series[1] for series in points])
+        finite = np.isfinite(y)
+        if not finite.any():
+            line.clear()
+            return
+        connect = finite & np.roll(finite, -1)
+        connect[np.cumsum([len(series[0]) for series in points]) - 1] = False
+        line.setData(x[finite], y[finite], connect=connect[finite])
+
+    def draw_overview(self, sensor):
+        """Draw the complete history of a sensor in the overview, reduced
+        to the resolution of the screen.
+
+        Args:
+            sensor (str): name of the sensor
+        """
+        if self.enableLine[sensor] != True:
+            self.overview_lines[sensor].clear()
+            return
+        x, y, length = self.plot_data[sensor]
+        width = max(int(self.overview.getViewBox().width()), 500)
+        indices, y = y.decimate(0, length, 2 * width)
+        self.set_line_data(self.overview_lines[sensor], x.take(indices), y)
+
+    def overview_region_changed(self):
+        """Show the x-range selected in the overview in the plot."""
+        if self.updating_region:
+            return
+        x_min, x_max = self.overview_region.getRegion()
+        if self.cb_follow.isChecked():
+            self.cb_follow.setChecked(False)
+            self.update_follow()
+        self.cb_autoscale_x.setChecked(False)
+        self.update_autoscale_x()
+        self.x_min, self.x_max = round(x_min, 1), round(x_max, 1)
+        self.edit_x_min.setText(str(self.x_min))
+        self.edit_x_max.setText(str(self.x_max))
+        self.plot.setXRange(x_min, x_max, padding=0)
+
+    def x_range_changed(self):
+        """Redraw the lines with a level of detail matching the new
+        x-range (zooming / panning)."""
+        self.updating_region = True
+        self.overview_region.setRegion(self.plot.getViewBox().viewRange()[0])
+        self.updating_region = False
+        if self.following:
+            return  # the lines are drawn by set_data
+        if self.cb_follow.isChecked():  # moved by user, stop following
+            self.cb_follow.setChecked(False)
+            self.update_follow()
+        if self.plot.getViewBox().autoRangeEnabled()[0]:
+            return  # the complete data is drawn anyway
+        for sensor in self.plot_data:
+            if self.enableLine[sensor] == True and sensor in self.lines:
+                self.draw_line(sensor)
+            if sensor in self.filters and self.enableMas[sensor] == True:
+                self.draw_average(sensor)
+        self.schedule_batch()
 
     def set_label(self, sensor, val):
         """Set the label with current measurement value
@@ -471,12 +1362,12 @@ class PlotWidget(QSplitter):
             val (str/float): measurement value
         """
         if self.unit == "-" or self.unit == "":
-            self.sensor_value_labels[sensor].setText(f"{val:.3f}")
+            text = f"{val:.3f}"
         elif self.unit == "mbar": 
-            self.sensor_value_labels[sensor].setText(f"{val:.3E} {self.unit}") # exeption for vifcon_gase to show the scientific format
+            text = f"{val:.3E} {self.unit}" # exeption for vifcon_gase to show the scientific format
         else:
-            self.sensor_value_labels[sensor].setText(f"{val:.3f} {self.unit}")
-
-    def movingAvg(self, data, sensor):
-        weights = np.ones(self.windowSize[sensor]) / self.windowSize[sensor]
-        return np.convolve(data, weights, mode='valid')
\ No newline at end of file
+            text = f"{val:.3f} {self.unit}"
+        if self.batched:
+            self.sensor_table.set_value(sensor, text)
+        else:
+            self.sensor_value_labels[sensor].setText(text)
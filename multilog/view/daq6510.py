@@ -1,11 +1,13 @@
+from functools import partial
 import logging
+import numpy as np
 from PyQt5.QtWidgets import (
     QWidget,
     QGridLayout,
     QTabWidget,
 )
 
-from .base_classes import PlotWidget
+from .base_classes import LazyWidget, PlotWidget
 from ..devices.daq6510 import Daq6510
 
 logger = logging.getLogger(__name__)
@@ -31,9 +33,22 @@ class Daq6510Widget(QWidget):
         self.tabs_sensors = {}  # tab name : sensor name
         self.sensors_tabs = {}  # sensor name : tab name
         self.tabs_units = {}  # tab name : unit name
+        self.daq = daq
         for channel in daq.config["channels"]:
             sensor_type = daq.config["channels"][channel]["type"].lower()
             sensor_name = daq.channel_id_names[channel]
+            if sensor_type == "digitize":  # summary values of the bursts
+                tab_name = daq.config["channels"][channel].get("tab-name", "Digitize")
+                unit = daq.unit[sensor_name]
+                if not tab_name in self.tabs_sensors:
+                    self.tabs_sensors.update({tab_name: []})
+                    self.tabs_units.update({tab_name: unit})
+                elif unit != self.tabs_units[tab_name]:
+                    raise ValueError(f"Different units given for tab {tab_name}.")
+                for name in daq.burst_names[channel]:
+                    self.tabs_sensors[tab_name].append(name)
+                    self.sensors_tabs.update({name: tab_name})
+                continue
             if sensor_type == "temperature":
                 unit = "°C"
             else:
@@ -81,15 +96,67 @@ class Daq6510Widget(QWidget):
                                 f"Different units given for tab {tab_name}."
                             )
             self.sensors_tabs.update({sensor_name: tab_name})
+        for sensor_name in daq.raw_names.values():  # tc-raw
+            tab_name = "Thermocouple voltage"
+            if not tab_name in self.tabs_sensors:
+                self.tabs_sensors.update({tab_name: [sensor_name]})
+                self.tabs_units.update({tab_name: "V"})
+            else:
+                self.tabs_sensors[tab_name].append(sensor_name)
+            self.sensors_tabs.update({sensor_name: tab_name})
+        if daq.ch_list_dig:  # latest burst of each digitize channel
+            units = {daq.unit[daq.channel_id_names[c]] for c in daq.ch_list_dig}
+            self.tabs_sensors.update(
+                {"Burst": [daq.channel_id_names[c] for c in daq.ch_list_dig]}
+            )
+            self.tabs_units.update({"Burst": units.pop() if len(units) == 1 else "-"})
 
-        # create widgets for each tab
+        # create widgets for each tab, the plot widgets are created when
+        # the tab is shown the first time and then get the latest data
+        self.latest_data = None  # (recording started, data)
         self.plot_widgets = {}
         for tab_name in self.tabs_sensors:
-            plot_widget = PlotWidget(
-                self.tabs_sensors[tab_name], tab_name, self.tabs_units[tab_name]
+            plot_widget = LazyWidget(
+                partial(
+                    PlotWidget,
+                    self.tabs_sensors[tab_name],
+                    tab_name,
+                    self.tabs_units[tab_name],
+                )
             )
             self.tab_widget.addTab(plot_widget, tab_name)
             self.plot_widgets.update({tab_name: plot_widget})
+        self.tab_widget.currentChanged.connect(self.tab_changed)
+
+    def tab_changed(self, index):
+        """Show the latest data in a tab that was selected."""
+        self.update_tab(self.tab_widget.tabText(index))
+
+    def update_tab(self, tab_name):
+        """Show the latest data in a tab, its plot widget is created if
+        necessary.
+
+        Args:
+            tab_name (str): name of the tab
+        """
+        if tab_name == "Burst":
+            plot_widget = self.plot_widgets[tab_name].widget
+            for sensor, (sample_rate, waveform) in list(self.daq.latest_bursts.items()):
+                plot_widget.replace_data(
+                    sensor, np.arange(len(waveform)) / sample_rate, waveform
+                )
+            return
+        if self.latest_data is None:
+            return
+        recording, data = self.latest_data
+        plot_widget = self.plot_widgets[tab_name].widget
+        for sensor in self.tabs_sensors[tab_name]:
+            if recording:
+                rel_time, meas_data = data
+                if sensor in meas_data:
+                    plot_widget.set_data(sensor, rel_time, meas_data[sensor])
+            elif sensor in data:
+                plot_widget.set_label(sensor, data[sensor])
 
     def set_measurement_data(self, rel_time, meas_data):
         """Update plot and labels with measurement data (used after
@@ -99,10 +166,10 @@ class Daq6510Widget(QWidget):
             rel_time (list): relative time of measurement data.
             meas_data (dict): {sensor name: measurement time series}
         """
-        for sensor in meas_data:
-            self.plot_widgets[self.sensors_tabs[sensor]].set_data(
-                sensor, rel_time, meas_data[sensor]
-            )
+        self.latest_data = (True, (rel_time, meas_data))
+        for tab_name in self.plot_widgets:
+            if self.plot_widgets[tab_name].created:
+                self.update_tab(tab_name)
 
     def set_initialization_data(self, sampling):
         """Update labels with sampling data (used before recording is
@@ -111,7 +178,7 @@ class Daq6510Widget(QWidget):
         Args:
             sampling (dict): {sensor name: value}
         """
-        for sensor in sampling:
-            self.plot_widgets[self.sensors_tabs[sensor]].set_label(
-                sensor, sampling[sensor]
-            )
+        self.latest_data = (False, sampling)
+        for tab_name in self.plot_widgets:
+            if self.plot_widgets[tab_name].created:
+                self.update_tab(tab_name)
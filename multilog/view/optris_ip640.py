@@ -1,4 +1,8 @@
 import logging
+import time
+import numpy as np
+import pyqtgraph as pg
+from PyQt5.QtWidgets import QLabel
 
 from .base_classes import ImageWidget
 from ..devices.optris_ip640 import OptrisIP640
@@ -10,21 +14,91 @@ class OptrisIP640Widget(ImageWidget):
     def __init__(self, optris_ip_640: OptrisIP640, parent=None):
         """GUI widget of Optirs Ip640 IR camera.
 
+        The raw images (uint16 counts) are colored with a lookup table
+        indexed by the counts. The table is rebuilt if the colormap or
+        the range of the counts changes, i.e., there is no per-pixel
+        floating point computation for display.
+
         Args:
             optris_ip_640 (OptrisIP640): OptrisIP640 device including
                 configuration information.
         """
         logger.info(f"Setting up OptrisIP640Widget for device {optris_ip_640.name}")
         super().__init__(parent)
+        self.device = optris_ip_640
+        self.cmaps = {}  # colormap name: 256 x 4 RGBA table
+        self.lut = None  # 65536 x 4 RGBA table indexed by raw counts
+        self.lut_key = None  # (colormap, min count, max count)
+        self.image_view.ui.histogram.hide()  # levels are given by the lut
+        self.image_view.ui.roiBtn.hide()
+        self.image_view.ui.menuBtn.hide()
+
+        self.lbl_range = QLabel("Temperature range:")
+        self.parameter_layout.addWidget(self.lbl_range, 0, 0)
+        self.lbl_range_value = QLabel("-")
+        self.parameter_layout.addWidget(self.lbl_range_value, 0, 1)
+        self.parameter_layout.setRowStretch(1, 1)
+
+    def get_cmap(self, cmap_name):
+        """Get the RGBA table of a colormap (computed once per colormap).
+
+        Args:
+            cmap_name (str): name of the matplotlib colormap.
+
+        Returns:
+            numpy.array: 256 x 4 uint8 table.
+        """
+        if cmap_name not in self.cmaps:
+            cmap = pg.colormap.getFromMatplotlib(cmap_name)
+            self.cmaps[cmap_name] = cmap.getLookupTable(nPts=256, alpha=True)
+        return self.cmaps[cmap_name]
+
+    def update_lut(self, raw_image, cmap_name):
+        """Recalculate the range of the counts once per levels_interval
+        and rebuild the lookup table if it changed.
+
+        Args:
+            raw_image (numpy.array): raw IR image.
+            cmap_name (str): name of the matplotlib colormap.
+        """
+        now = time.perf_counter()
+        if self.lut is None or now - self.levels_time > self.levels_interval:
+            self.levels = self.calc_levels(raw_image)
+            self.levels_time = now
+        key = (cmap_name, *self.levels)
+        if key == self.lut_key:
+            return
+        cmin, cmax = self.levels
+        counts = np.arange(65536, dtype=np.float64)
+        index = np.clip((counts - cmin) / (cmax - cmin) * 255, 0, 255)
+        self.lut = self.get_cmap(cmap_name)[index.astype(np.uint8)]
+        self.lut_key = key
+        tmin, tmax = self.device.to_temperature(np.array(self.levels))
+        self.lbl_range_value.setText(f"{tmin:.1f} - {tmax:.1f} °C")
+
+    def show_image(self, raw_image, cmap_name):
+        """Display a raw IR image, or the false color image of the SDK
+        if sdk-palette is configured.
+
+        Args:
+            raw_image (np.array): raw IR image.
+            cmap_name (str): name of the matplotlib colormap.
+        """
+        palette_image = self.device.palette_image
+        if palette_image is not None:
+            self.set_image(np.swapaxes(palette_image, 0, 1))
+            return
+        self.update_lut(raw_image, cmap_name)
+        self.set_image(raw_image.T, lut=self.lut)
 
     def set_initialization_data(self, sampling):
         """Update image with sampling data (used before recording is
         started) using a grayscale colormap.
 
         Args:
-            sampling (np.array): IR image.
+            sampling (np.array): raw IR image.
         """
-        self.set_image(sampling.T)
+        self.show_image(sampling, "gray")
 
     def set_measurement_data(self, rel_time, meas_data):
         """Update plot and labels with measurement data (used after
@@ -32,7 +106,6 @@ class OptrisIP640Widget(ImageWidget):
 
         Args:
             rel_time (list): relative time of measurement data. Unused.
-            meas_data (np.array): IR image.
+            meas_data (np.array): raw IR image.
         """
-        self.set_cmap("turbo")  # TODO only do that once
-        self.set_image(meas_data.T)
+        self.show_image(meas_data, "turbo")
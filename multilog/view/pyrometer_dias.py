@@ -137,6 +137,6 @@ class PyrometerDiasWidget(PlotWidget):
 
         Args:
             rel_time (list): relative time of measurement data.
-            meas_data (list): measurement time series
+            meas_data (History): {"Temperature": measurement time series}
         """
-        self.set_data(self.sensor_name, rel_time, meas_data)
+        self.set_data(self.sensor_name, rel_time, meas_data["Temperature"])
@@ -146,6 +146,6 @@ class PyrometerLumasenseWidget(PlotWidget):
 
         Args:
             rel_time (list): relative time of measurement data.
-            meas_data (list): measurement time series
+            meas_data (History): {"Temperature": measurement time series}
         """
-        self.set_data(self.sensor_name, rel_time, meas_data)
\ No newline at end of file
+        self.set_data(self.sensor_name, rel_time, meas_data["Temperature"])
\ No newline at end of file
@@ -0,0 +1,129 @@
+"""Read-only GUI for a multilog run in headless mode, running in its own
+process. It reads the histories and the latest camera images published
+by the acquisition process (see live module) and can be closed and
+restarted at any time without affecting the recording."""
+import logging
+import sys
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtGui import QIcon
+from PyQt5.QtWidgets import (
+    QApplication,
+    QLabel,
+    QMainWindow,
+    QTabWidget,
+    QVBoxLayout,
+    QWidget,
+)
+import numpy as np
+
+from .live import LiveReader
+from .view.base_classes import ImageWidget, LazyWidget, PlotWidget
+
+logger = logging.getLogger(__name__)
+
+
+class LiveViewer(QMainWindow):
+    """Main window of the viewer with one tab per history / camera."""
+
+    def __init__(self, directory, dt=500, parent=None):
+        """Attach to a run.
+
+        Args:
+            directory (str): output directory of the run or its live
+                subdirectory.
+            dt (int, optional): refresh interval in ms. Defaults to 500.
+        """
+        super().__init__(parent)
+        self.reader = LiveReader(directory)
+        self.setWindowTitle(f"multilog 2 - {self.reader.directory}")
+        self.setWindowIcon(QIcon("./multilog/icons/nemocrys.png"))
+        self.resize(1400, 900)
+
+        self.central_widget = QWidget()
+        self.setCentralWidget(self.central_widget)
+        self.main_layout = QVBoxLayout()
+        self.central_widget.setLayout(self.main_layout)
+        self.tab_widget = QTabWidget()
+        self.tab_widget.setStyleSheet("QTabBar {font-size: 14pt; color: blue;}")
+        self.tab_widget.currentChanged.connect(lambda index: self.refresh())
+        self.main_layout.addWidget(self.tab_widget)
+        self.lbl_status = QLabel("Waiting for data...")
+        self.main_layout.addWidget(self.lbl_status)
+        self.tabs = {}  # name : LazyWidget
+
+        self.timer = QTimer()
+        self.timer.setInterval(dt)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+        self.refresh()
+
+    def add_tabs(self, names):
+        """Add tabs for new histories / cameras."""
+        for name in names:
+            if name in self.reader.histories:
+                history = self.reader.histories[name]
+                factory = lambda history=history, name=name: PlotWidget(
+                    list(history), name, "-"
+                )
+            else:
+                factory = self.create_image_widget
+            self.tabs[name] = LazyWidget(factory)
+            self.tab_widget.addTab(self.tabs[name], name)
+
+    @staticmethod
+    def create_image_widget():
+        widget = ImageWidget()
+        widget.set_cmap("turbo")  # used for 2D (IR) images only
+        return widget
+
+    def refresh(self):
+        """Read new data and update the visible tab."""
+        try:
+            self.add_tabs(self.reader.update())
+        except OSError:
+            logger.exception("Could not read live data.")
+            return
+        time = max(
+            (
+                history.time[history.length - 1]
+                for history in self.reader.histories.values()
+                if history.length > 0
+            ),
+            default=None,
+        )
+        if time is not None:
+            self.lbl_status.setText(f"Time: {time:.1f} s")
+        for name, tab in self.tabs.items():
+            if tab.isVisible():
+                self.update_tab(name)
+
+    def update_tab(self, name):
+        """Show the latest data of a history / camera.
+
+        Args:
+            name (str): name of the history / camera.
+        """
+        widget = self.tabs[name].widget
+        if name in self.reader.histories:
+            history = self.reader.histories[name]
+            for channel in history:
+                widget.set_data(channel, None, history[channel])
+        else:
+            image = self.reader.frame(name)
+            if image is None:
+                return
+            widget.set_image(np.swapaxes(image, 0, 1))
+
+
+def main(directory):
+    """Execute this function to run the viewer.
+
+    Args:
+        directory (str): output directory of the run.
+    """
+    logging.basicConfig(level=logging.INFO)
+    app = QApplication(sys.argv)
+    viewer = LiveViewer(directory)
+    viewer.show()
+    sys.exit(app.exec())
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from multilog import compression
+
+
+def assert_bitwise_equal(a, b):
+    a = np.asarray(a)
+    b = np.asarray(b)
+    assert a.dtype == b.dtype
+    assert np.array_equal(a.view(np.uint64), b.view(np.uint64))
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        np.cumsum(np.random.default_rng(0).normal(size=1000)),  # random walk
+        np.full(100, 21.5),  # constant
+        np.array([1.0]),
+        np.array([0.0, -0.0, np.nan, np.inf, -np.inf, 1e-300, -1e300, 5e-324]),
+        np.random.default_rng(1).uniform(-1e6, 1e6, 1000).round(1),
+    ],
+)
+def test_float_round_trip(values):
+    header, payload = compression.encode(values)
+    decoded = compression.decode(header, payload, len(values))
+    assert_bitwise_equal(decoded, values)
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        1_700_000_000_000_000_000 + np.arange(1000, dtype=np.int64) * 1_000_000_000,
+        1_700_000_000_000_000_000
+        + np.cumsum(np.random.default_rng(2).integers(0, 10**9, 1000)),
+        np.array([5, 3, -7, 0, 2**62, -(2**62)], dtype=np.int64),  # not sorted
+        np.array([42], dtype=np.int64),
+    ],
+)
+def test_int_round_trip(values):
+    header, payload = compression.encode(values)
+    decoded = compression.decode(header, payload, len(values), np.int64)
+    assert decoded.dtype == np.int64
+    assert np.array_equal(decoded, values)
+
+
+def test_constant_block_single_header_byte():
+    header, payload = compression.encode(np.full(1024, 3.25))
+    assert len(header) == 1
+    assert np.array_equal(compression.decode(header, payload, 1024), np.full(1024, 3.25))
+    # regular timestamps: constant delta of delta after the first two
+    times = 10**18 + np.arange(1024, dtype=np.int64) * 10**9
+    header, payload = compression.encode(times)
+    assert len(payload) <= 16
+    assert np.array_equal(compression.decode(header, payload, 1024, np.int64), times)
+
+
+def test_slowly_changing_values_are_compressed():
+    values = np.repeat(np.linspace(20, 25, 64), 16)
+    header, payload = compression.encode(values)
+    assert len(header) + len(payload) < values.nbytes / 4
+
+
+def test_unsupported_dtype():
+    with pytest.raises(ValueError):
+        compression.encode(np.arange(10, dtype=np.int32))
+
+
+def test_compressed_block():
+    values = np.cumsum(np.random.default_rng(3).normal(size=500))
+    block = compression.CompressedBlock(values)
+    assert len(block) == 500
+    assert block[0] == values[0]
+    assert block[-1] == values[-1]
+    assert block[-500] == values[0]
+    assert block[499] == values[-1]
+    assert block[123] == values[123]
+    assert np.array_equal(block[10:20], values[10:20])
+    assert np.array_equal(np.asarray(block), values)
+    assert np.asarray(block, dtype=np.float32).dtype == np.float32
+    assert not block.decode().flags.writeable
+    assert block.nbytes == len(block.tobytes())
+
+
+def test_compressed_block_remap():
+    blocks = [
+        compression.CompressedBlock(np.arange(100, dtype=np.float64) * 0.5),
+        compression.CompressedBlock(10**18 + np.arange(100, dtype=np.int64) * 7),
+    ]
+    padding = b"\x00" * 3
+    buffer = np.frombuffer(
+        padding + b"".join(block.tobytes() for block in blocks), np.uint8
+    )
+    position = len(padding)
+    for block in blocks:
+        mapped = block.remap(buffer, position)
+        position += block.nbytes
+        assert mapped.mapped and not block.mapped
+        assert mapped.dtype == block.dtype
+        assert np.array_equal(np.asarray(mapped), np.asarray(block))
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from multilog.devices.ifm_flowmeter import FlowBalance
+
+SENSORS = ["in", "out 1", "out 2", "other"]
+GROUPS = {
+    "crucible": {"inflow": ["in"], "outflow": ["out 1", "out 2"], "tolerance": 1},
+    "coil": {"inflow": ["other"], "outflow": [], "tolerance": [50, 10], "window": [1, 10]},
+}
+
+
+def balance(samplings, groups=GROUPS, capacity=256):
+    flow_balance = FlowBalance(groups, SENSORS, capacity)
+    for now, flow in samplings:
+        flow_balance.add(now, np.array(flow, dtype=float))
+    return flow_balance
+
+
+def test_balance():
+    flow_balance = balance([(t, [20, 10, 5, 30]) for t in range(10)])
+    loss, leakage = flow_balance.evaluate(9)
+    assert flow_balance.check_group.tolist() == [0, 1, 1]
+    np.testing.assert_allclose(loss, [5, 30, 30])
+    assert leakage.tolist() == [True, False, True]
+
+
+def test_window_average():
+    # 2 samplings without leak and 1 with a leak of 3 l/min in the window
+    samplings = [(0, [20, 10, 10, 0]), (4, [20, 10, 10, 0]), (8, [23, 10, 10, 0])]
+    loss, _ = balance(samplings).evaluate(8)
+    assert loss[0] == pytest.approx(1)
+    loss, _ = balance(samplings).evaluate(12)  # first sampling out of window
+    assert loss[0] == pytest.approx(1.5)
+
+
+def test_nan_port_outside_group():
+    flow_balance = balance([(t, [20, 10, 5, np.nan]) for t in range(10)])
+    loss, leakage = flow_balance.evaluate(9)
+    assert loss[0] == pytest.approx(5)
+    assert leakage[0]
+    assert np.isnan(loss[1:]).all() and not leakage[1:].any()
+
+
+def test_nan_port_inside_group():
+    flow_balance = balance([(t, [20, np.nan, 5, 30]) for t in range(10)])
+    loss, leakage = flow_balance.evaluate(9)
+    assert np.isnan(loss[0]) and not leakage[0]
+    np.testing.assert_allclose(loss[1:], [30, 30])
+
+
+def test_nan_samplings_within_window():
+    # single failed samplings are ignored if there are valid values
+    samplings = [(t, [20, 10, 5, 30]) for t in range(10)]
+    samplings[5] = (5, [np.nan, np.nan, np.nan, np.nan])
+    samplings[9] = (9, [20, np.nan, 5, 30])
+    loss, leakage = balance(samplings).evaluate(9)
+    np.testing.assert_allclose(loss, [5, 30, 30])
+    # only failed samplings in the short window
+    loss, _ = balance(samplings[:6]).evaluate(5.5)
+    assert np.isnan(loss[1]) and loss[2] == pytest.approx(30)
+
+
+def test_capacity_grows_for_longest_window():
+    samplings = [(t * 0.01, [20, 10, 5, 30]) for t in range(1001)]
+    flow_balance = balance(samplings, capacity=4)
+    assert len(flow_balance.time) >= 1000
+    loss, _ = flow_balance.evaluate(10)
+    np.testing.assert_allclose(loss, [5, 30, 30])
+
+
+def test_window_tolerance_length_mismatch():
+    groups = {"g": {"inflow": ["in"], "outflow": ["out 1"], "tolerance": [1, 2, 3], "window": [1, 2]}}
+    with pytest.raises(ValueError):
+        FlowBalance(groups, SENSORS)
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from multilog.compression import CompressedBlock
+from multilog.history import Column
+
+
+def filled_column(values, block_size=None, chunk=37):
+    column = Column(capacity=16, dtype=values.dtype, block_size=block_size)
+    for start in range(0, len(values), chunk):
+        if start % 2:
+            for value in values[start : start + chunk]:
+                column.append(value)
+        else:
+            column.extend(values[start : start + chunk])
+    return column
+
+
+RANGES = [(0, 0), (0, 1), (5, 5), (0, 1000), (1000, 3000), (1023, 1025), (2047, 2049),
+          (100, 4000), (3990, 4321), (4320, 4321), (7, 3)]
+
+
+@pytest.mark.parametrize("block_size", [None, 256])
+def test_append_extend_slice(block_size):
+    values = np.cumsum(np.random.default_rng(0).normal(size=4321))
+    column = filled_column(values, block_size)
+    assert len(column) == len(values)
+    if block_size:
+        segments = column._state[0]
+        assert segments and all(isinstance(s, CompressedBlock) for s in segments)
+    for start, stop in RANGES:
+        assert np.array_equal(column.slice(start, stop), values[start:max(start, stop)])
+
+
+@pytest.mark.parametrize("block_size", [None, 256])
+def test_take(block_size):
+    values = np.arange(3000, dtype=np.float64) * 0.25
+    column = filled_column(values, block_size)
+    indices = np.array([0, 255, 256, 257, 1999, 2999, 5, 5])
+    assert np.array_equal(column.take(indices, len(values)), values[indices])
+    assert len(column.take([], len(values))) == 0
+
+
+@pytest.mark.parametrize("block_size", [None, 64])
+@pytest.mark.parametrize("side", ["left", "right"])
+def test_searchsorted(block_size, side):
+    # duplicates across block boundaries, as for repeated timestamps
+    times = np.repeat(np.arange(0, 1000, dtype=np.int64) * 10, 3)[:2000]
+    column = filled_column(times, block_size)
+    queries = [-5, 0, 10, 15, 630, 640, 1280, 6650, 6660, 6670, 10**6]
+    for value in queries:
+        expected = int(np.searchsorted(times, value, side))
+        assert column.searchsorted(value, len(times), side) == expected
+    # only the committed length is searched
+    assert column.searchsorted(10**6, 1000, side) == 1000
+
+
+def test_spill_uncompressed(tmp_path):
+    values = np.arange(5000, dtype=np.float64)
+    column = filled_column(values[:3000])
+    column.spill(str(tmp_path / "column"), keep=100)
+    segments, starts, offset, tail = column._state
+    assert offset == 2900 and len(tail) == 100
+    assert isinstance(segments[0], np.memmap)
+    column.extend(values[3000:])
+    column.spill(str(tmp_path / "column"), keep=100)
+    assert len(column._state[0]) == 2
+    assert len(list(tmp_path.iterdir())) == 2
+    assert column.in_memory == 100 * 8
+    for start, stop in RANGES + [(2800, 3000), (2899, 2901), (4899, 5000)]:
+        assert np.array_equal(column.slice(start, stop), values[start:max(start, stop)])
+    assert column.searchsorted(2900.5, len(values)) == 2901
+    # nothing to spill
+    column.spill(str(tmp_path / "column"), keep=100)
+    assert len(column._state[0]) == 2
+
+
+def test_spill_compressed(tmp_path):
+    values = np.cumsum(np.random.default_rng(1).normal(size=3000))
+    column = filled_column(values, block_size=256)
+    in_memory = column.in_memory
+    column.spill(str(tmp_path / "column"), keep=100)
+    assert column.in_memory < in_memory
+    assert all(segment.mapped for segment in column._state[0])
+    column.extend(values[:1000])
+    column.spill(str(tmp_path / "column"), keep=100)
+    assert len(list(tmp_path.iterdir())) == 2
+    expected = np.concatenate([values, values[:1000]])
+    assert np.array_equal(column.slice(0, len(expected)), expected)
+    assert np.array_equal(column.slice(250, 2600), expected[250:2600])
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from multilog import thermocouple
+
+# NIST ITS-90 thermocouple tables (NIST Monograph 175): °C, mV
+NIST = {
+    "K": [
+        (-200, -5.891), (-100, -3.554), (-10, -0.392), (0, 0.0), (25, 1.000),
+        (100, 4.096), (200, 8.138), (500, 20.644), (1000, 41.276), (1372, 54.886),
+    ],
+    "J": [
+        (-210, -8.095), (-100, -4.633), (-10, -0.501), (0, 0.0), (25, 1.277),
+        (100, 5.269), (500, 27.393), (760, 42.919), (1000, 57.953), (1200, 69.553),
+    ],
+}
+
+
+@pytest.mark.parametrize("tc_type", thermocouple.TYPES)
+def test_emf(tc_type):
+    temperatures, voltages = np.array(NIST[tc_type]).T
+    np.testing.assert_allclose(
+        thermocouple.emf(tc_type, temperatures), voltages, rtol=0, atol=0.001
+    )
+
+
+@pytest.mark.parametrize("tc_type", thermocouple.TYPES)
+def test_temperature(tc_type):
+    temperatures, voltages = np.array(NIST[tc_type]).T
+    np.testing.assert_allclose(
+        thermocouple.temperature(tc_type, voltages), temperatures, rtol=0, atol=0.1
+    )
+
+
+@pytest.mark.parametrize("tc_type", thermocouple.TYPES)
+@pytest.mark.parametrize("cold_junction", [0.0, 23.4])
+def test_linearize(tc_type, cold_junction):
+    temperatures, voltages = np.array(NIST[tc_type][2:-1]).T
+    measured = (voltages - thermocouple.emf(tc_type, cold_junction)) * 1e-3  # V
+    np.testing.assert_allclose(
+        thermocouple.linearize(tc_type.lower(), measured, cold_junction),
+        temperatures,
+        rtol=0,
+        atol=0.1,
+    )
+
+
+def test_linearize_per_scan_cold_junction():
+    # scans x channels, one cold junction temperature per scan
+    cold_junction = np.array([[20.0], [30.0]])
+    measured = (np.array([[20.644, 41.276]]) - thermocouple.emf("K", cold_junction)) * 1e-3
+    np.testing.assert_allclose(
+        thermocouple.linearize("K", measured, cold_junction),
+        [[500, 1000], [500, 1000]],
+        atol=0.1,
+    )
+
+
+def test_out_of_range():
+    assert np.isnan(thermocouple.emf("K", [-300, 1400])).all()
+    assert np.isnan(thermocouple.temperature("J", [-9.0, 70.0])).all()
+    assert np.isnan(thermocouple.linearize("K", [np.nan, 0.1]).astype(float)).all()